@@ -2,4 +2,28 @@ from . import functions
 from . import load
 from . import plots_format
 from . import plots
-from . import world
\ No newline at end of file
+from . import world
+from . import timeline
+from . import synth
+from . import methods
+from . import playback
+from . import spectra
+from . import tuning
+from . import similarity
+from . import indexes
+from . import regions
+from . import founders
+from . import frames
+from . import names
+from . import postcodes
+from . import gridref
+from . import routes
+from . import graph
+from . import flags
+from . import guilds
+from . import changes
+from . import diff
+from . import validate
+from . import merge
+from . import strings
+from . import cache
\ No newline at end of file
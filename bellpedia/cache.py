@@ -0,0 +1,111 @@
+from collections import OrderedDict
+import pandas as pd
+
+class ResultCache:
+    def __init__(
+        self,
+        maxsize=128,
+    ):
+        """ 
+        Bounded cache of query results, evicting the least recently used result when full.
+
+        Parameters
+        ----------
+            maxsize: int
+                maximum number of results kept, nothing is cached if 0
+
+        """
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        """ 
+        Cached result of a query, marked as most recently used.
+
+        Parameters
+        ----------
+            key: tuple
+                normalised query
+
+        Returns
+        -------
+            result: object
+                cached result, None on a miss
+        """
+        if key not in self.results:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return self.results[key]
+
+    def put(self, key, result):
+        """ 
+        Cache the result of a query.
+
+        Parameters
+        ----------
+            key: tuple
+                normalised query
+            result: object
+                result
+
+        Returns
+        -------
+
+        """
+        if self.maxsize <= 0:
+            return
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+            self.evictions += 1
+        return
+
+    def clear(self):
+        """ 
+        Drop every cached result, e.g. when the world they came from changes.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        if len(self.results) > 0:
+            self.invalidations += 1
+        self.results.clear()
+        return
+
+    @property
+    def stats(self):
+        """ 
+        Hit and miss statistics.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            stats: pd.series
+                "hits", "misses", "hit_rate", "evictions", "invalidations", "size" and "maxsize"
+        """
+        lookups = self.hits + self.misses
+        return pd.Series({
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "hit_rate" : self.hits/lookups if lookups > 0 else 0.0,
+            "evictions" : self.evictions,
+            "invalidations" : self.invalidations,
+            "size" : len(self.results),
+            "maxsize" : self.maxsize,
+        })
@@ -0,0 +1,255 @@
+import numpy as np
+import pandas as pd
+
+#Event kinds of change descriptions, first match wins so work not yet completed is a project
+kinds = {
+    "project" : r"\bproject\b|\bplans?\b|\bplanned\b|\bfuture\b|\bproposed\b|\bto be\b|\bunderway\b"
+        r"|\bbeing\b|\bwill\b|\bto augment|\bin progress\b|\bintended\b",
+    "augmented" : r"\baugment",
+    "recast" : r"\brecast",
+    "rehung" : r"\brehung\b|\brehang",
+    "removed" : r"\bremoved from the tower\b|\bbells? removed\b",
+    "unringable" : r"\bunringable\b|\bu/r\b",
+    "bells" : r"\bbells? added\b|\bnew bells?\b",
+    "frame" : r"\bfr\s?\d|\bframe",
+}
+#Augmentations reported as done even with project wording, e.g. "Project completed to augment to 8"
+completed = r"^\s*augmented\b|\bcompleted?\b"
+numbers = {"three" : 3, "four" : 4, "five" : 5, "six" : 6, "eight" : 8, "ten" : 10, "twelve" : 12, "fourteen" : 14, "sixteen" : 16}
+count_pattern = r"(\d+|" + "|".join(numbers) + r")"
+
+def to_days(dates):
+    """ 
+    Days since 1970-01-01 of a whole column of dates.
+
+    Parameters
+    ----------
+        dates: np.array
+            dates, e.g. "2023-10-17"
+
+    Returns
+    -------
+        days: np.array
+            int days, -1 where unparsable
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce")
+    days = dates.values.astype("datetime64[D]").astype(np.int64)
+    return np.where(dates.notna().values, days, -1)
+
+def ring_count(value):
+    """ 
+    Number of bells of a count such as "8" or "eight".
+
+    Parameters
+    ----------
+        value: str
+            count
+
+    Returns
+    -------
+        count: float
+            number of bells, nan if missing
+    """
+    if not isinstance(value, str):
+        return np.nan
+    value = value.lower()
+    return float(numbers[value]) if value in numbers else float(value)
+
+def parse_changes(changes):
+    """ 
+    Parse the Dove changes data in one vectorized pass. Each change is given an event kind and
+    completed augmentations, e.g. "rehung and augmented to 10", their new number of bells.
+
+    Parameters
+    ----------
+        changes: pd.dataframe
+            Dove changes data with Date, TowerID, Place, Region, Description of change, Source and Route columns
+
+    Returns
+    -------
+        events: pd.dataframe
+            one row per change with "day", "date", "tower_id", "place", "region", "description", "source",
+            "route", "kind", "bells_from" and "bells_to"
+    """
+    description = changes["Description of change"].astype("string")
+    events = pd.DataFrame({
+        "day" : to_days(changes["Date"].values),
+        "date" : pd.to_datetime(changes["Date"], errors="coerce").values,
+        "tower_id" : pd.to_numeric(changes["TowerID"], errors="coerce").fillna(-1).astype(int).values,
+        "place" : changes["Place"].values,
+        "region" : changes["Region"].values,
+        "description" : changes["Description of change"].values,
+        "source" : changes["Source"].values,
+        "route" : changes["Route"].values,
+    })
+
+    kind = np.full(len(events), "other", dtype=object)
+    done = (description.str.contains(kinds["augmented"], case=False, regex=True)
+        & description.str.contains(completed, case=False, regex=True)).fillna(False).values.astype(bool)
+    kind[done] = "augmented"
+    unset = ~done
+    for name, pattern in kinds.items():
+        found = description.str.contains(pattern, case=False, regex=True).fillna(False).values.astype(bool) & unset
+        kind[found] = name
+        unset &= ~found
+    events["kind"] = kind
+
+    counts = description.str.lower().str.extract(rf"augment\w*\s+(?:from\s+{count_pattern}\s+)?to\s+{count_pattern}")
+    augmented = kind == "augmented"
+    events["bells_from"] = np.where(augmented, [ring_count(c) for c in counts[0]], np.nan)
+    events["bells_to"] = np.where(augmented, [ring_count(c) for c in counts[1]], np.nan)
+    return events
+
+class ChangeLog:
+    def __init__(
+        self,
+        events,
+    ):
+        """ 
+        Time sorted index of tower change events. Events are kept sorted by tower then day,
+        with a second ordering by day, so both are searched in O(log n).
+
+        Parameters
+        ----------
+            events: pd.dataframe
+                output of parse_changes
+
+        """
+        events = events[events["day"] >= 0]
+        order = np.lexsort((events["day"].values, events["tower_id"].values))
+        self.events = events.iloc[order].reset_index(drop=True)
+        self.tower_keys = self.events["tower_id"].values
+        self.day_keys = self.events["day"].values
+        self.by_day = np.argsort(self.day_keys, kind="stable")
+        self.sorted_days = self.day_keys[self.by_day]
+
+    def __len__(self):
+        return len(self.events)
+
+    def append(self, events):
+        """ 
+        Stream new change events in, merging them into both orderings without a full sort.
+
+        Parameters
+        ----------
+            events: pd.dataframe
+                output of parse_changes for the new rows
+
+        Returns
+        -------
+
+        """
+        events = events[events["day"] >= 0]
+        if len(events) == 0:
+            return
+        order = np.lexsort((events["day"].values, events["tower_id"].values))
+        events = events.iloc[order].reset_index(drop=True)
+        N = len(self.events)
+
+        #Insert positions in the tower then day order, new rows after existing rows of the same key
+        key = self.tower_keys.astype(np.int64)*100000 + self.day_keys
+        new_key = events["tower_id"].values.astype(np.int64)*100000 + events["day"].values
+        merged = np.insert(np.arange(N), np.searchsorted(key, new_key, side="right"), np.arange(N, N+len(events)))
+        self.events = pd.concat([self.events, events], ignore_index=True).iloc[merged].reset_index(drop=True)
+
+        #Day order of the merged rows, old rows keep their relative order
+        rank = np.empty(len(merged), dtype=int)
+        rank[merged] = np.arange(len(merged))
+        new_days = events["day"].values
+        new_order = np.argsort(new_days, kind="stable")
+        positions = np.searchsorted(self.sorted_days, new_days[new_order], side="right")
+        by_day = np.insert(self.by_day, positions, N + new_order)
+        self.by_day = rank[by_day]
+        self.tower_keys = self.events["tower_id"].values
+        self.day_keys = self.events["day"].values
+        self.sorted_days = self.day_keys[self.by_day]
+        return
+
+    def history(self, tower_id):
+        """ 
+        Change history of a tower.
+
+        Parameters
+        ----------
+            tower_id: int
+                dove tower id number
+
+        Returns
+        -------
+            events: pd.dataframe
+                events of the tower, oldest first
+        """
+        start = int(np.searchsorted(self.tower_keys, tower_id, side="left"))
+        end = int(np.searchsorted(self.tower_keys, tower_id, side="right"))
+        return self.events.iloc[start:end]
+
+    def between(self, start=None, end=None):
+        """ 
+        Changes between two dates inclusive.
+
+        Parameters
+        ----------
+            start: str
+                first date, e.g. "2023-01-01", unbounded if None
+            end: str
+                last date, unbounded if None
+
+        Returns
+        -------
+            events: pd.dataframe
+                matching events, oldest first
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.sorted_days, to_days([start])[0], side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.sorted_days, to_days([end])[0], side="right"))
+        return self.events.iloc[self.by_day[lo:max(lo, hi)]]
+
+    def since(self, days, today=None):
+        """ 
+        Changes in the last number of days.
+
+        Parameters
+        ----------
+            days: int
+                number of days
+            today: str
+                date counted back from, the latest change if None
+
+        Returns
+        -------
+            events: pd.dataframe
+                matching events, oldest first
+        """
+        if len(self) == 0:
+            return self.events
+        today = self.sorted_days[-1] if today is None else to_days([today])[0]
+        start = np.datetime64(int(today - days), "D")
+        return self.between(str(start), None)
+
+    def ring_counts(self, date, current):
+        """ 
+        Number of bells of towers as of a date, undoing the completed augmentations after it.
+        Towers augmented after the date without a known earlier count are missing.
+
+        Parameters
+        ----------
+            date: str
+                date, e.g. "2020-01-01"
+            current: pd.series
+                current number of bells indexed by tower id
+
+        Returns
+        -------
+            counts: pd.series
+                number of bells indexed by tower id
+        """
+        day = to_days([date])[0]
+        counts = current.astype(float).copy()
+        augmented = self.events[(self.events["kind"] == "augmented") & self.events["bells_to"].notna()]
+        after = augmented[augmented["day"] > day]
+        before = augmented[augmented["day"] <= day]
+        #Earliest augmentation after the date, tower then day order
+        first = after.drop_duplicates("tower_id", keep="first").set_index("tower_id")
+        last = before.drop_duplicates("tower_id", keep="last").set_index("tower_id")
+        ids = first.index[first.index.isin(counts.index)]
+        counts.loc[ids] = first.loc[ids, "bells_from"].fillna(last["bells_to"].reindex(ids)).values
+        return counts
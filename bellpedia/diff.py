@@ -0,0 +1,205 @@
+import os
+import numpy as np
+import pandas as pd
+
+#Columns read at ingest, a change in any of them changes the world
+tower_columns = [
+    "TowerID", "RingType", "Place", "Dedicn", "Lat", "Long", "Postcode", "NG", "Country", "County", "Region",
+    "Diocese", "Affiliations", "Practice", "LGrade", "GF", "Toilet", "Simulator", "UR",
+]
+bell_columns = [
+    "Tower ID", "Bell Role", "Note", "Nominal (Hz)", "Weight (lbs)", "Diameter (in)", "Caster", "Founder",
+    "Cast Date", "Collection Type", "Listed", "Canons", "Turnings", "Cracked", "Frame ID",
+]
+frame_columns = [
+    "Tower ID", "Frame Number", "Frame Date", "Listed", "Materials", "Maker", "Maker Uncertain", "Trusses",
+    "Layout", "Resultant Layout", "Num Extensions",
+]
+#Table of each export file, its row key and the ingest columns
+tables = {
+    "towers" : ("towers.csv", "RingID", tower_columns),
+    "bells" : ("bells.csv", "Bell ID", bell_columns),
+    "frames" : ("frames.csv", "Frame ID", frame_columns),
+}
+
+def normalise_column(column):
+    """ 
+    Values of a column as comparable strings. Numbers are formatted as floats first so that
+    e.g. 6 read from an int column and 6.0 from a column with missing values compare equal.
+
+    Parameters
+    ----------
+        column: pd.series
+            column
+
+    Returns
+    -------
+        text: pd.series
+            string values, "" where missing
+    """
+    text = column.astype("string")
+    numbers = pd.to_numeric(column, errors="coerce")
+    is_number = numbers.notna()
+    if is_number.any():
+        text = text.where(~is_number, numbers.astype(float).astype("string"))
+    return text.fillna("")
+
+def row_hashes(df, columns):
+    """ 
+    64 bit content hash of each row over some columns, in one vectorized pass.
+
+    Parameters
+    ----------
+        df: pd.dataframe
+            table
+        columns: list
+            columns hashed, missing columns are skipped
+
+    Returns
+    -------
+        hashes: np.array
+            uint64 hash of each row
+    """
+    columns = [c for c in columns if c in df]
+    values = pd.DataFrame({c : normalise_column(df[c]) for c in columns}, index=df.index)
+    return pd.util.hash_pandas_object(values, index=False).values
+
+def diff_table(old, new, key, columns):
+    """ 
+    Rows added, removed and modified between two versions of a table, by a hash join on the row key.
+
+    Parameters
+    ----------
+        old: pd.dataframe
+            old table
+        new: pd.dataframe
+            new table
+        key: str
+            row key column
+        columns: list
+            ingest columns compared
+
+    Returns
+    -------
+        diff: pd.dataframe
+            "key", "change" ("added", "removed" or "modified") and "columns", the list of modified columns
+    """
+    old = old.drop_duplicates(key, keep="last")
+    new = new.drop_duplicates(key, keep="last")
+    joined = pd.merge(
+        pd.DataFrame({"key" : old[key].values, "old_hash" : row_hashes(old, columns), "old_row" : np.arange(len(old))}),
+        pd.DataFrame({"key" : new[key].values, "new_hash" : row_hashes(new, columns), "new_row" : np.arange(len(new))}),
+        on="key", how="outer",
+    )
+    added = joined["old_hash"].isna().values
+    removed = joined["new_hash"].isna().values
+    modified = ~added & ~removed & (joined["old_hash"].values != joined["new_hash"].values)
+
+    #Column level differences only for the modified rows
+    changed = [[] for _ in range(modified.sum())]
+    rows = joined[modified]
+    o = old.iloc[rows["old_row"].astype(int).values].reset_index(drop=True)
+    n = new.iloc[rows["new_row"].astype(int).values].reset_index(drop=True)
+    for column in columns:
+        if column not in o or column not in n:
+            continue
+        a = normalise_column(o[column])
+        b = normalise_column(n[column])
+        for i in np.flatnonzero((a != b).values):
+            changed[i].append(column)
+
+    change = np.full(len(joined), None, dtype=object)
+    change[added] = "added"
+    change[removed] = "removed"
+    change[modified] = "modified"
+    columns_changed = np.full(len(joined), None, dtype=object)
+    columns_changed[np.flatnonzero(modified)] = changed
+    keep = added | removed | modified
+    return pd.DataFrame({
+        "key" : joined["key"].values[keep],
+        "change" : change[keep],
+        "columns" : columns_changed[keep],
+    })
+
+class Changeset:
+    def __init__(
+        self,
+        old,
+        new,
+    ):
+        """ 
+        Changes between two Dove exports, by per row content hashes of the ingest columns.
+
+        Parameters
+        ----------
+            old: dict
+                old tables by name ("towers", "bells", "frames")
+            new: dict
+                new tables by name
+
+        """
+        self.diffs = {}
+        tower_ids = []
+        for name, (_, key, columns) in tables.items():
+            if name not in old or name not in new:
+                continue
+            diff = diff_table(old[name], new[name], key, columns)
+            #Tower of each changed row in either export
+            tower = "TowerID" if name == "towers" else "Tower ID"
+            ids = pd.concat([
+                old[name][[key, tower]], new[name][[key, tower]]
+            ]).drop_duplicates(key, keep="last").set_index(key)[tower]
+            diff["tower_id"] = ids.reindex(diff["key"].values).values
+            self.diffs[name] = diff
+            tower_ids.append(diff["tower_id"].values)
+
+        #Towers to rebuild from the new export and towers gone from it
+        ids = pd.unique(np.concatenate(tower_ids)) if len(tower_ids) > 0 else np.array([])
+        ids = ids[pd.notna(ids)].astype(int)
+        in_new = new["towers"]["TowerID"].values if "towers" in new else ids
+        self.towers = ids[np.isin(ids, in_new)]
+        self.removed = ids[~np.isin(ids, in_new)]
+
+    @classmethod
+    def from_dirs(cls, old_dir, new_dir):
+        """ 
+        Changeset between two Dove export directories.
+
+        Parameters
+        ----------
+            old_dir: str
+                directory of the old export
+            new_dir: str
+                directory of the new export
+
+        Returns
+        -------
+            changeset: Changeset class instance
+                changes from the old to the new export
+        """
+        old, new = {}, {}
+        for name, (filename, _, _) in tables.items():
+            if os.path.exists(os.path.join(old_dir, filename)) and os.path.exists(os.path.join(new_dir, filename)):
+                old[name] = pd.read_csv(os.path.join(old_dir, filename), low_memory=False)
+                new[name] = pd.read_csv(os.path.join(new_dir, filename), low_memory=False)
+            else:
+                print(f"No {filename} in both exports")
+        return cls(old, new)
+
+    @property
+    def summary(self):
+        """ 
+        Number of rows added, removed and modified in each table.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            summary: pd.dataframe
+                counts indexed by table
+        """
+        return pd.DataFrame({
+            name : diff["change"].value_counts().reindex(["added", "removed", "modified"], fill_value=0)
+            for name, diff in self.diffs.items()
+        }).T
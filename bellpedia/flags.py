@@ -0,0 +1,219 @@
+import re
+import numpy as np
+import pandas as pd
+from bellpedia.gridref import earth_radius
+
+#Weekday bits of the practice mask, Mon = 1 ... Sun = 64
+weekdays = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+#Facility bits and the Dove towers.csv column flagging each
+facilities = {
+    "ground_floor" : (1, "GF"),
+    "toilet" : (2, "Toilet"),
+    "simulator" : (4, "Simulator"),
+    "unringable" : (8, "UR"),
+}
+day_pattern = re.compile(r"\b(" + "|".join(weekdays) + r")")
+#Bracketed notes, e.g. "Tue (following 1st and 3rd Sunday)", whose weekdays are not practice days
+note_pattern = re.compile(r"\([^)]*\)")
+
+def day_bits(days):
+    """ 
+    Weekday mask of a day or list of days.
+
+    Parameters
+    ----------
+        days: str or list
+            weekdays, e.g. "Wed" or ["Tue", "Thursday"]
+
+    Returns
+    -------
+        mask: int
+            weekday bits
+    """
+    if isinstance(days, str):
+        days = [days]
+    mask = 0
+    for day in days:
+        day = day[:3].title()
+        if day not in weekdays:
+            print(f"Unknown weekday {day}, choose from {weekdays}")
+            continue
+        mask |= 1 << weekdays.index(day)
+    return mask
+
+def facility_bits(names):
+    """ 
+    Facility mask of a facility or list of facilities.
+
+    Parameters
+    ----------
+        names: str or list
+            facilities, e.g. "ground_floor" or ["toilet", "simulator"]
+
+    Returns
+    -------
+        mask: int
+            facility bits
+    """
+    if isinstance(names, str):
+        names = [names]
+    mask = 0
+    for name in names:
+        if name not in facilities:
+            print(f"Unknown facility {name}, choose from {list(facilities)}")
+            continue
+        mask |= facilities[name][0]
+    return mask
+
+def practice_mask(practice):
+    """ 
+    Weekday mask of a Dove practice string, e.g. "Wed", "Thu 1st" or "Tue & Thu". Weekdays in
+    bracketed notes are ignored.
+
+    Parameters
+    ----------
+        practice: str
+            Tower.practice
+
+    Returns
+    -------
+        mask: int
+            weekday bits, 0 without a practice
+    """
+    if not isinstance(practice, str):
+        return 0
+    mask = 0
+    for day in day_pattern.findall(note_pattern.sub(" ", practice)):
+        mask |= 1 << weekdays.index(day)
+    return mask
+
+def practice_masks(practices):
+    """ 
+    Weekday masks of a whole column of Dove practice strings. Weekdays in bracketed notes are ignored.
+
+    Parameters
+    ----------
+        practices: np.array
+            Tower.practice of each tower
+
+    Returns
+    -------
+        masks: np.array
+            uint8 weekday bits
+    """
+    practices = pd.Series(practices, dtype="string").str.replace(note_pattern.pattern, " ", regex=True)
+    masks = np.zeros(len(practices), dtype=np.uint8)
+    for i, day in enumerate(weekdays):
+        masks |= np.where(practices.str.contains(rf"\b{day}", regex=True).fillna(False).values, 1 << i, 0).astype(np.uint8)
+    return masks
+
+def facility_mask(row):
+    """ 
+    Facility mask of a Dove towers row.
+
+    Parameters
+    ----------
+        row: pd.series
+            Dove tower data with GF, Toilet, Simulator and UR values
+
+    Returns
+    -------
+        mask: int
+            facility bits
+    """
+    mask = 0
+    for bit, column in facilities.values():
+        if column in row and pd.notna(row[column]):
+            mask |= bit
+    return mask
+
+def facility_masks(towers):
+    """ 
+    Facility masks of a whole Dove towers table.
+
+    Parameters
+    ----------
+        towers: pd.dataframe
+            Dove towers data with GF, Toilet, Simulator and UR columns
+
+    Returns
+    -------
+        masks: np.array
+            uint8 facility bits
+    """
+    masks = np.zeros(len(towers), dtype=np.uint8)
+    for bit, column in facilities.values():
+        if column in towers:
+            masks |= np.where(towers[column].notna().values, bit, 0).astype(np.uint8)
+    return masks
+
+class FlagIndex:
+    def __init__(
+        self,
+        practice_days,
+        facility_flags,
+        lat,
+        long,
+    ):
+        """ 
+        Bitwise index of tower practice nights and facilities.
+
+        Parameters
+        ----------
+            practice_days: np.array
+                weekday bits of each tower
+            facility_flags: np.array
+                facility bits of each tower
+            lat: np.array
+                latitude of each tower
+            long: np.array
+                longitude of each tower
+
+        """
+        self.practice_days = np.asarray(practice_days, dtype=np.uint8)
+        self.facility_flags = np.asarray(facility_flags, dtype=np.uint8)
+        self.lat = np.radians(np.asarray(lat, dtype=float))
+        self.long = np.radians(np.asarray(long, dtype=float))
+        self.cos_lat = np.cos(self.lat)
+
+    def __len__(self):
+        return len(self.practice_days)
+
+    def mask(self, days=None, has=None, lacks=None, near=None, radius=None):
+        """ 
+        Towers practising on any of some weekdays, with and without some facilities and within a radius.
+
+        Parameters
+        ----------
+            days: str or list
+                weekdays, any if None
+            has: str or list
+                facilities the towers must all have
+            lacks: str or list
+                facilities the towers must not have, e.g. "unringable"
+            near: tuple
+                (lat, long) of the centre
+            radius: float
+                distance from near in km
+
+        Returns
+        -------
+            mask: np.array
+                bool per tower
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if days is not None:
+            mask &= (self.practice_days & day_bits(days)) != 0
+        if has is not None:
+            bits = facility_bits(has)
+            mask &= (self.facility_flags & bits) == bits
+        if lacks is not None:
+            mask &= (self.facility_flags & facility_bits(lacks)) == 0
+        if near is not None and radius is not None:
+            lat, long = np.radians(near[0]), np.radians(near[1])
+            #Haversine only for the towers left after the bitwise tests
+            rows = np.flatnonzero(mask)
+            a = np.sin((self.lat[rows]-lat)/2)**2 + np.cos(lat)*self.cos_lat[rows]*np.sin((self.long[rows]-long)/2)**2
+            distance = 2*earth_radius*np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+            mask[rows] = distance <= radius
+        return mask
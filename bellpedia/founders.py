@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+from bellpedia.indexes import IntervalIndex
+
+def founder_key(name):
+    """ 
+    Normalised founder name used for interning.
+
+    Parameters
+    ----------
+        name: str
+            founder or caster name
+
+    Returns
+    -------
+        key: str
+            lower case name with collapsed whitespace, None if missing
+    """
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return None
+    key = " ".join(str(name).lower().split())
+    return key if key != "" else None
+
+class FounderTable:
+    def __init__(
+        self,
+        founders,
+    ):
+        """ 
+        Founders from the Dove founders.csv with interned ids. Names not in the table are given
+        new ids above the largest Dove founder ID when first seen.
+
+        Parameters
+        ----------
+            founders: pd.dataframe
+                Dove founders data with ID, Name, From, To, Group, Location, Bells,
+                Extant From, Extant To and Rings columns
+
+        """
+        founders = founders[founders["ID"].notna() & founders["Name"].notna()].copy()
+        founders["ID"] = founders["ID"].astype(int)
+        #Active years fall back to the dates of the surviving bells
+        founders["active_from"] = founders["From"].fillna(founders["Extant From"])
+        founders["active_to"] = founders["To"].fillna(founders["Extant To"]).fillna(founders["active_from"])
+        self.founders = founders.set_index("ID")
+
+        self.ids = {}
+        for i, name in zip(self.founders.index, self.founders["Name"]):
+            key = founder_key(name)
+            if key not in self.ids:
+                self.ids[key] = int(i)
+        self.names = {int(i) : name for i, name in zip(self.founders.index, self.founders["Name"])}
+        self.next_id = int(self.founders.index.max()) + 1 if len(self.founders) > 0 else 1
+
+        self.active = IntervalIndex(
+            self.founders["active_from"].values,
+            self.founders["active_to"].values,
+            self.founders.index.values,
+        )
+
+    def intern(self, name):
+        """ 
+        Founder id of a name, allocating a new id for unknown names.
+
+        Parameters
+        ----------
+            name: str
+                founder or caster name
+
+        Returns
+        -------
+            id: int
+                founder id, -1 if name is missing
+        """
+        key = founder_key(name)
+        if key is None:
+            return -1
+        if key not in self.ids:
+            self.ids[key] = self.next_id
+            self.names[self.next_id] = name
+            self.next_id += 1
+        return self.ids[key]
+
+    def find(self, name):
+        """ 
+        Founder id of a name or id without allocating.
+
+        Parameters
+        ----------
+            name: str or int
+                founder name or id
+
+        Returns
+        -------
+            id: int
+                founder id, None if not found
+        """
+        if isinstance(name, (int, np.integer)):
+            return int(name) if int(name) in self.names else None
+        return self.ids.get(founder_key(name))
+
+    def active_in(self, start, end=None):
+        """ 
+        Founders active in a year or a period, from the interval index.
+
+        Parameters
+        ----------
+            start: int
+                year
+            end: int
+                end year of the period, a single year if None
+
+        Returns
+        -------
+            founders: pd.dataframe
+                matching rows of the founders table in order of the start of their activity
+        """
+        return self.founders.loc[self.active.overlap(start, end)]
+
+class FounderIndex:
+    def __init__(
+        self,
+        table,
+        bells,
+    ):
+        """ 
+        Inverted index from founder id to bells and towers. Each bell is joined to the founders table
+        by its founder, or its caster when no founder is recorded.
+
+        Parameters
+        ----------
+            table: FounderTable class instance
+                founders table
+            bells: pd.dataframe
+                world.bellcolumns
+
+        """
+        self.table = table
+        self.bells = bells
+
+        #Intern each distinct name once
+        founder = bells["founder"].astype(object)
+        names = founder.where(founder.notna(), bells["caster"].astype(object))
+        codes, uniques = pd.factorize(names)
+        ids = np.array([table.intern(u) for u in uniques] + [-1], dtype=int)
+        self.founder_id = ids[codes]
+
+        order = np.argsort(self.founder_id, kind="stable")
+        keys, starts, counts = np.unique(self.founder_id[order], return_index=True, return_counts=True)
+        self.order = order
+        self.spans = {int(k) : (int(s), int(s+c)) for k, s, c in zip(keys, starts, counts)}
+
+        tower = bells["tower"].values.astype(int)
+        pairs = np.unique(np.stack([self.founder_id, tower]), axis=1)
+        split = np.flatnonzero(np.diff(pairs[0])) + 1
+        self.towers = {
+            int(group[0,0]) : group[1]
+            for group in np.split(pairs, split, axis=1) if group.shape[1] > 0
+        }
+
+    def bell_rows(self, founder):
+        """ 
+        Rows of world.bellcolumns cast by a founder.
+
+        Parameters
+        ----------
+            founder: str or int
+                founder name or id
+
+        Returns
+        -------
+            rows: np.array
+                bell rows
+        """
+        start, end = self.spans.get(self.table.find(founder), (0, 0))
+        return self.order[start:end]
+
+    def tower_rows(self, founder):
+        """ 
+        Positions in world.towers of the towers with a bell cast by a founder.
+
+        Parameters
+        ----------
+            founder: str or int
+                founder name or id
+
+        Returns
+        -------
+            towers: np.array
+                tower positions
+        """
+        return self.towers.get(self.table.find(founder), np.array([], dtype=int))
+
+    @property
+    def summary(self):
+        """ 
+        Bells and towers of every founder in the world.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            summary: pd.dataframe
+                indexed by founder id with "name", "active_from", "active_to", "bells" and "towers"
+        """
+        ids = [k for k in self.spans if k >= 0]
+        active = self.table.founders.reindex(ids)
+        return pd.DataFrame({
+            "name" : [self.table.names[i] for i in ids],
+            "active_from" : active["active_from"].values,
+            "active_to" : active["active_to"].values,
+            "bells" : [self.spans[i][1]-self.spans[i][0] for i in ids],
+            "towers" : [len(self.towers[i]) for i in ids],
+        }, index=pd.Index(ids, name="founder_id")).sort_values("bells", ascending=False)
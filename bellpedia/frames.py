@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+from bellpedia.indexes import SortedIndex
+
+def parse_frames(frames):
+    """ 
+    Parse the Dove frames data in one vectorized pass. Frame dates such as "c1699" or "<1552" are split
+    into a year and a flag, truss codes such as "8.3.A.h" into their group, subgroup, type and variant
+    and layout codes such as "6.1" into the number of pits and the arrangement. Uncertain codes ("~", "?")
+    are flagged and multiple codes separated by ";" keep the first.
+
+    Parameters
+    ----------
+        frames: pd.dataframe
+            Dove frames data with Frame ID, Tower ID, Frame Number, Frame Date, Listed, Materials, Maker,
+            Maker Uncertain, Trusses, Layout, Resultant Layout and Num Extensions columns
+
+    Returns
+    -------
+        frames: pd.dataframe
+            one row per frame indexed by "frame_id" with "tower_id", "number", "dated", "date_flag",
+            "materials" list, "material" (first listed), "maker", "maker_uncertain", "listed",
+            "trusses", "truss_group", "truss_subgroup", "truss_type", "truss_variant", "truss_uncertain",
+            "layout", "pits", "arrangement", "layout_uncertain", "resultant_layout" and "extensions"
+    """
+    out = pd.DataFrame({
+        "tower_id" : frames["Tower ID"].values,
+        "number" : frames["Frame Number"].astype("string").values,
+    }, index=pd.Index(frames["Frame ID"].values, name="frame_id"))
+
+    dates = frames["Frame Date"].astype("string").str.extract(r"^\s*([c<>~]?)\s*(\d{3,4})")
+    out["dated"] = pd.to_numeric(dates[1], errors="coerce").values
+    out["date_flag"] = dates[0].replace("", pd.NA).values
+
+    materials = frames["Materials"].astype("string").str.lower().str.split(";")
+    out["materials"] = materials.apply(lambda m: [s.strip() for s in m] if isinstance(m, list) else []).values
+    out["material"] = materials.str[0].str.strip().values
+    out["maker"] = frames["Maker"].values
+    out["maker_uncertain"] = (frames["Maker Uncertain"] == "Y").values
+    out["listed"] = (frames["Listed"] == "Y").values
+
+    trusses = frames["Trusses"].astype("string").str.replace(r"\s", "", regex=True)
+    out["trusses"] = trusses.values
+    out["truss_uncertain"] = trusses.str.contains(r"[~?]", regex=True).fillna(False).astype(bool).values
+    parts = trusses.str.split(";").str[0].str.extract(r"(\d+)(?:\.(\d+))?(?:\.([A-Z]))?(?:\.([a-z]+))?")
+    out["truss_group"] = pd.to_numeric(parts[0], errors="coerce").values
+    out["truss_subgroup"] = pd.to_numeric(parts[1], errors="coerce").values
+    out["truss_type"] = parts[2].values
+    out["truss_variant"] = parts[3].values
+
+    layout = frames["Layout"].astype("string")
+    out["layout"] = layout.values
+    out["layout_uncertain"] = layout.str.contains(r"[~?]", regex=True).fillna(False).astype(bool).values
+    parts = layout.str.extract(r"(\d+)\.?(\w*)")
+    out["pits"] = pd.to_numeric(parts[0], errors="coerce").values
+    out["arrangement"] = parts[1].replace("", pd.NA).values
+    out["resultant_layout"] = frames["Resultant Layout"].values
+    out["extensions"] = pd.to_numeric(frames["Num Extensions"], errors="coerce").values
+    return out
+
+class FrameIndex:
+    def __init__(
+        self,
+        frames,
+        bells,
+    ):
+        """ 
+        Indexes of the frames of the world by material, maker and date, linked to the bells they hang.
+
+        Parameters
+        ----------
+            frames: pd.dataframe
+                world.framecolumns
+            bells: pd.dataframe
+                world.bellcolumns with a "frame_id" column
+
+        """
+        self.frames = frames.reset_index(drop=True)
+
+        def groups(values):
+            values = pd.Series(values)
+            ok = values.notna()
+            return {k : v.values for k, v in values[ok].index.to_series().groupby(values[ok].values)}
+
+        materials = self.frames["materials"].explode()
+        self.material = {
+            k : np.unique(v.index.values)
+            for k, v in materials[materials.notna()].groupby(materials[materials.notna()].values)
+        }
+        self.maker = groups(self.frames["maker"].str.lower())
+        self.dated = SortedIndex(self.frames["dated"].values)
+
+        frame_ids = pd.to_numeric(bells["frame_id"], errors="coerce")
+        self.bells = groups(frame_ids.where(frame_ids.isin(self.frames["frame_id"])))
+
+        self.by_material = self.frames.groupby("material").agg(
+            frames=("frame_id", "size"),
+            towers=("tower_id", "nunique"),
+            first=("dated", "min"),
+            last=("dated", "max"),
+            median=("dated", "median"),
+        ).sort_values("frames", ascending=False)
+        self.by_maker = self.frames.groupby("maker").agg(
+            frames=("frame_id", "size"),
+            towers=("tower_id", "nunique"),
+            first=("dated", "min"),
+            last=("dated", "max"),
+        ).sort_values("frames", ascending=False)
+        self.by_truss = self.frames.groupby("truss_group").agg(
+            frames=("frame_id", "size"),
+            first=("dated", "min"),
+            last=("dated", "max"),
+        )
+        self.by_pits = self.frames.groupby("pits").size().rename("frames")
+
+    def rows(self, material=None, maker=None, lo=None, hi=None):
+        """ 
+        Frames matching all of the given filters, intersecting the index lookups.
+
+        Parameters
+        ----------
+            material: str
+                frame material, e.g. "cast iron" or "oak"
+            maker: str
+                frame maker, e.g. "John Taylor & Co"
+            lo: float
+                earliest frame date, unbounded if None
+            hi: float
+                latest frame date, unbounded if None
+
+        Returns
+        -------
+            rows: np.array
+                rows of the frames table
+        """
+        rows = None
+        if material is not None:
+            rows = self.material.get(material.lower(), np.array([], dtype=int))
+        if maker is not None:
+            found = self.maker.get(maker.lower(), np.array([], dtype=int))
+            rows = found if rows is None else np.intersect1d(rows, found)
+        if lo is not None or hi is not None:
+            found = self.dated.range(lo, hi)
+            rows = np.sort(found) if rows is None else np.intersect1d(rows, found)
+        if rows is None:
+            rows = np.arange(len(self.frames))
+        return rows
+
+    def bell_rows(self, frame_ids):
+        """ 
+        Rows of world.bellcolumns hung in the given frames.
+
+        Parameters
+        ----------
+            frame_ids: list
+                Dove frame ids
+
+        Returns
+        -------
+            rows: np.array
+                bell rows
+        """
+        found = [self.bells[f] for f in frame_ids if f in self.bells]
+        return np.concatenate(found) if len(found) > 0 else np.array([], dtype=int)
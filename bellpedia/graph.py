@@ -0,0 +1,348 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from bellpedia.gridref import haversine
+
+class TowerGraph:
+    def __init__(
+        self,
+        ids,
+        lat,
+        long,
+        k = 16,
+        radius = 16.0,
+        block = 1024,
+    ):
+        """ 
+        Neighbour graph of towers: each tower is linked to its k nearest towers and every tower within radius.
+        Stored as CSR arrays, the neighbours of row i are indices[indptr[i]:indptr[i+1]] at distances
+        distances[indptr[i]:indptr[i+1]] in km, sorted by distance.
+
+        Parameters
+        ----------
+            ids: np.array
+                dove_id of each tower
+            lat: np.array
+                latitude of each tower
+            long: np.array
+                longitude of each tower
+            k: int
+                nearest neighbours per tower
+            radius: float
+                radius in km within which all neighbours are kept
+            block: int
+                rows per block of the all pairs distance pass
+
+        """
+        self.k = k
+        self.radius = radius
+        self.block = block
+        self.ids = np.asarray(ids)
+        self.lat = np.asarray(lat, dtype=float)
+        self.long = np.asarray(long, dtype=float)
+        rows = self.neighbours(np.arange(len(self.ids)))
+        self.indptr, self.indices, self.distances = self.to_csr(rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def neighbours(self, rows):
+        """ 
+        Neighbours of some towers against all towers, a block of rows at a time.
+
+        Parameters
+        ----------
+            rows: np.array
+                rows to find neighbours of
+
+        Returns
+        -------
+            neighbours: list
+                (indices, distances) of each row sorted by distance
+        """
+        ok = np.isfinite(self.lat) & np.isfinite(self.long)
+        out = []
+        for b in range(0, len(rows), self.block):
+            chunk = rows[b:b+self.block]
+            D = haversine(self.lat[chunk][:,None], self.long[chunk][:,None], self.lat[None,:], self.long[None,:])
+            D[:, ~ok] = np.inf
+            D[np.arange(len(chunk)), chunk] = np.inf
+            kk = min(self.k, D.shape[1]-1)
+            if kk > 0:
+                nearest = np.argpartition(D, kk-1, axis=1)[:,:kk]
+                kth = np.take_along_axis(D, nearest, axis=1).max(axis=1)
+            else:
+                kth = np.full(len(chunk), -np.inf)
+            limit = np.maximum(kth, self.radius)
+            for i, r in enumerate(chunk):
+                if not ok[r]:
+                    out.append((np.array([], dtype=np.int32), np.array([], dtype=np.float32)))
+                    continue
+                idx = np.flatnonzero(D[i] <= limit[i])
+                order = np.argsort(D[i, idx], kind="stable")
+                out.append((idx[order].astype(np.int32), D[i, idx[order]].astype(np.float32)))
+        return out
+
+    @staticmethod
+    def to_csr(rows):
+        """ 
+        CSR arrays of per row neighbour lists.
+
+        Parameters
+        ----------
+            rows: list
+                (indices, distances) of each row
+
+        Returns
+        -------
+            indptr: np.array
+                row offsets
+            indices: np.array
+                neighbour rows
+            distances: np.array
+                neighbour distances in km
+        """
+        counts = np.array([len(r[0]) for r in rows], dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        if len(rows) == 0 or counts.sum() == 0:
+            return indptr, np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+        indices = np.concatenate([r[0] for r in rows]).astype(np.int32)
+        distances = np.concatenate([r[1] for r in rows]).astype(np.float32)
+        return indptr, indices, distances
+
+    def rows(self):
+        """ 
+        Per row neighbour lists of the CSR arrays.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            rows: list
+                (indices, distances) of each row
+        """
+        return [
+            (self.indices[self.indptr[i]:self.indptr[i+1]], self.distances[self.indptr[i]:self.indptr[i+1]])
+            for i in range(len(self.ids))
+        ]
+
+    def add(self, ids, lat, long):
+        """ 
+        Add towers, recomputing only the new rows and the rows the new towers enter.
+
+        Parameters
+        ----------
+            ids: np.array
+                dove_ids of the new towers
+            lat: np.array
+                latitudes of the new towers
+            long: np.array
+                longitudes of the new towers
+
+        Returns
+        -------
+
+        """
+        N = len(self.ids)
+        rows = self.rows()
+        #Distance limit of each existing row, its k-th nearest or the radius
+        counts = np.diff(self.indptr)
+        kth = np.full(N, np.inf)
+        full = counts >= self.k
+        kth[full] = self.distances[self.indptr[:-1][full] + self.k - 1]
+        limit = np.maximum(kth, self.radius)
+
+        self.ids = np.concatenate([self.ids, np.asarray(ids)])
+        self.lat = np.concatenate([self.lat, np.asarray(lat, dtype=float)])
+        self.long = np.concatenate([self.long, np.asarray(long, dtype=float)])
+        new = np.arange(N, len(self.ids))
+        found = self.neighbours(new)
+
+        #Existing rows change when a new tower is within their limit
+        D = haversine(self.lat[new][:,None], self.long[new][:,None], self.lat[None,:N], self.long[None,:N])
+        D[~np.isfinite(D)] = np.inf
+        affected = np.flatnonzero((D <= limit[None,:]).any(axis=0) & np.isfinite(self.lat[:N]))
+        for r, neighbours in zip(affected, self.neighbours(affected)):
+            rows[r] = neighbours
+        self.indptr, self.indices, self.distances = self.to_csr(rows + found)
+        return
+
+    def remove(self, ids):
+        """ 
+        Remove towers, recomputing only the rows that linked to them.
+
+        Parameters
+        ----------
+            ids: np.array
+                dove_ids of the towers to remove
+
+        Returns
+        -------
+
+        """
+        drop = np.isin(self.ids, np.asarray(ids))
+        if not drop.any():
+            return
+        rows = self.rows()
+        keep = np.flatnonzero(~drop)
+        remap = np.full(len(self.ids), -1)
+        remap[keep] = np.arange(len(keep))
+        self.ids = self.ids[keep]
+        self.lat = self.lat[keep]
+        self.long = self.long[keep]
+
+        new_rows = []
+        affected = []
+        for r in keep:
+            idx, dist = rows[r]
+            if drop[idx].any():
+                affected.append(remap[r])
+                new_rows.append(None)
+            else:
+                new_rows.append((remap[idx].astype(np.int32), dist))
+        affected = np.array(affected, dtype=int)
+        for r, neighbours in zip(affected, self.neighbours(affected)):
+            new_rows[r] = neighbours
+        self.indptr, self.indices, self.distances = self.to_csr(new_rows)
+        return
+
+    def adjacency(self, radius=None):
+        """ 
+        Symmetric sparse adjacency of the links within a radius.
+
+        Parameters
+        ----------
+            radius: float
+                link length limit in km, all links if None
+
+        Returns
+        -------
+            adjacency: scipy.sparse.csr_matrix
+                adjacency matrix
+        """
+        if radius is not None and radius > self.radius:
+            print(f"Radius {radius:.1f} km is beyond the {self.radius:.1f} km graph, longer links are from the {self.k} nearest only")
+        N = len(self.ids)
+        rows = np.repeat(np.arange(N), np.diff(self.indptr))
+        keep = np.ones(len(self.indices), dtype=bool) if radius is None else self.distances <= radius
+        A = csr_matrix((np.ones(keep.sum(), dtype=np.int8), (rows[keep], self.indices[keep])), shape=(N, N))
+        return ((A + A.T) > 0).astype(np.int8)
+
+    def components(self, radius):
+        """ 
+        Connected groups of towers linked by hops no longer than radius.
+
+        Parameters
+        ----------
+            radius: float
+                hop length in km
+
+        Returns
+        -------
+            labels: np.array
+                component of each row, largest first
+        """
+        _, labels = connected_components(self.adjacency(radius), directed=False)
+        return self.relabel(labels)
+
+    def clusters(self, eps, min_samples=3):
+        """ 
+        Density clusters of towers. Towers with at least min_samples neighbours within eps are cores,
+        linked cores form clusters and other towers join the cluster of a core within eps.
+
+        Parameters
+        ----------
+            eps: float
+                neighbourhood radius in km
+            min_samples: int
+                neighbours within eps for a core tower
+
+        Returns
+        -------
+            labels: np.array
+                cluster of each row, largest first, -1 for noise
+        """
+        A = self.adjacency(eps)
+        core = np.asarray(A.sum(axis=1)).ravel() >= min_samples
+        core_idx = np.flatnonzero(core)
+        labels = np.full(len(self.ids), -1)
+        if len(core_idx) == 0:
+            return labels
+        _, core_labels = connected_components(A[core_idx][:,core_idx], directed=False)
+        labels[core_idx] = core_labels
+
+        #Border towers join their nearest core
+        for r in np.flatnonzero(~core):
+            idx = self.indices[self.indptr[r]:self.indptr[r+1]]
+            dist = self.distances[self.indptr[r]:self.indptr[r+1]]
+            near = idx[(dist <= eps) & core[idx]]
+            if len(near) > 0:
+                labels[r] = labels[near[0]]
+        return self.relabel(labels)
+
+    @staticmethod
+    def relabel(labels):
+        """ 
+        Relabel groups from 0 in order of decreasing size, keeping -1.
+
+        Parameters
+        ----------
+            labels: np.array
+                group of each row
+
+        Returns
+        -------
+            labels: np.array
+                relabelled groups
+        """
+        ok = labels >= 0
+        if not ok.any():
+            return labels
+        groups, counts = np.unique(labels[ok], return_counts=True)
+        rank = np.empty(groups.max()+1, dtype=int)
+        rank[groups[np.argsort(-counts, kind="stable")]] = np.arange(len(groups))
+        out = np.full(len(labels), -1)
+        out[ok] = rank[labels[ok]]
+        return out
+
+    def save(self, filename):
+        """ 
+        Save the CSR arrays.
+
+        Parameters
+        ----------
+            filename: str
+                .npz filename
+
+        Returns
+        -------
+
+        """
+        np.savez_compressed(
+            filename, ids=self.ids, lat=self.lat, long=self.long, indptr=self.indptr, indices=self.indices,
+            distances=self.distances, settings=np.array([self.k, self.radius, self.block], dtype=float)
+        )
+        return
+
+    @classmethod
+    def load(cls, filename):
+        """ 
+        Load saved CSR arrays.
+
+        Parameters
+        ----------
+            filename: str
+                .npz filename
+
+        Returns
+        -------
+            graph: TowerGraph class instance
+                the saved graph
+        """
+        dat = np.load(filename, allow_pickle=True)
+        graph = cls.__new__(cls)
+        graph.k, graph.radius, graph.block = int(dat["settings"][0]), float(dat["settings"][1]), int(dat["settings"][2])
+        for name in ["ids", "lat", "long", "indptr", "indices", "distances"]:
+            setattr(graph, name, dat[name])
+        return graph
@@ -0,0 +1,265 @@
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+
+#Coordinate reference systems of the British (two letter) and Irish (one letter) grids
+grid_crs = {
+    "OSGB" : "EPSG:27700",
+    "Irish" : "EPSG:29903",
+}
+#Grid letters skip I
+letters = np.array(list("ABCDEFGHJKLMNOPQRSTUVWXYZ"))
+earth_radius = 6371.0088 #km
+
+def letter_index(codes):
+    """ 
+    Position of grid letters in the 5x5 letter square.
+
+    Parameters
+    ----------
+        codes: np.array
+            single upper case letters, "" where missing
+
+    Returns
+    -------
+        index: np.array
+            0 to 24, -1 where missing or I
+    """
+    codes = np.asarray(codes, dtype=str)
+    index = np.searchsorted(letters, codes)
+    index = np.clip(index, 0, len(letters)-1)
+    return np.where(letters[index] == codes, index, -1)
+
+def parse_grid_refs(refs):
+    """ 
+    Parse a whole column of British and Irish grid references in one vectorized pass,
+    e.g. "SK724228" (OSGB) or "T239734" (Irish grid). Any even number of digits is accepted.
+
+    Parameters
+    ----------
+        refs: np.array
+            grid references
+
+    Returns
+    -------
+        grid: pd.dataframe
+            "grid" name, "easting" and "northing" in metres of the centre of the referenced square
+            and "precision", the side of the square in metres. Missing where unparsable
+    """
+    refs = pd.Series(refs, dtype="string").str.upper().str.replace(r"\s+", "", regex=True)
+    parts = refs.str.extract(r"^([A-Z]{1,2})(\d*)$")
+    square = parts[0].fillna("")
+    digits = parts[1].fillna("")
+    ndigits = digits.str.len().values
+    ok = (square.str.len().values > 0) & (ndigits % 2 == 0) & (ndigits <= 10)
+
+    first = letter_index(square.str[0].fillna("").values)
+    second = letter_index(square.str[1].fillna("").values)
+    osgb = square.str.len().values == 2
+    ok &= (first >= 0) & (~osgb | (second >= 0))
+
+    #100 km square offsets. OSGB squares start from S at the false origin, Irish from V
+    e100 = np.where(osgb, ((first-2) % 5)*5 + second % 5, first % 5)
+    n100 = np.where(osgb, (19 - (first//5)*5) - second//5, 4 - first//5)
+    #Squares outside the grids, e.g. WV for the Channel Islands UTM grid
+    ok &= (e100 >= 0) & (n100 >= 0) & np.where(osgb, (e100 < 7) & (n100 < 13), True)
+
+    half = ndigits//2
+    precision = 10.0**(5-half)
+    east = np.zeros(len(digits))
+    north = np.zeros(len(digits))
+    for h in np.unique(half[ok & (half > 0)]):
+        rows = np.flatnonzero(ok & (half == h))
+        east[rows] = pd.to_numeric(digits.iloc[rows].str.slice(0, h), errors="coerce").values
+        north[rows] = pd.to_numeric(digits.iloc[rows].str.slice(h), errors="coerce").values
+
+    easting = e100*100000 + east*precision + precision/2
+    northing = n100*100000 + north*precision + precision/2
+    return pd.DataFrame({
+        "grid" : np.where(ok, np.where(osgb, "OSGB", "Irish"), None),
+        "easting" : np.where(ok, easting, np.nan),
+        "northing" : np.where(ok, northing, np.nan),
+        "precision" : np.where(ok, precision, np.nan),
+    })
+
+def grid_to_latlong(easting, northing, grid):
+    """ 
+    Convert grid eastings and northings to WGS84 latitude and longitude, one transform per grid.
+
+    Parameters
+    ----------
+        easting: np.array
+            eastings in metres
+        northing: np.array
+            northings in metres
+        grid: np.array
+            grid of each point, "OSGB" or "Irish"
+
+    Returns
+    -------
+        lat: np.array
+            latitudes, nan where missing
+        long: np.array
+            longitudes, nan where missing
+    """
+    easting = np.asarray(easting, dtype=float)
+    northing = np.asarray(northing, dtype=float)
+    grid = np.asarray(grid, dtype=object)
+    lat = np.full(len(easting), np.nan)
+    long = np.full(len(easting), np.nan)
+    for name, crs in grid_crs.items():
+        rows = np.flatnonzero((grid == name) & np.isfinite(easting) & np.isfinite(northing))
+        if len(rows) == 0:
+            continue
+        transformer = Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
+        long[rows], lat[rows] = transformer.transform(easting[rows], northing[rows])
+    return lat, long
+
+def latlong_to_grid(lat, long, grid="OSGB"):
+    """ 
+    Convert WGS84 latitude and longitude to grid eastings and northings.
+
+    Parameters
+    ----------
+        lat: np.array
+            latitudes
+        long: np.array
+            longitudes
+        grid: str
+            "OSGB" or "Irish"
+
+    Returns
+    -------
+        easting: np.array
+            eastings in metres
+        northing: np.array
+            northings in metres
+    """
+    transformer = Transformer.from_crs("EPSG:4326", grid_crs[grid], always_xy=True)
+    easting, northing = transformer.transform(np.asarray(long, dtype=float), np.asarray(lat, dtype=float))
+    return np.asarray(easting), np.asarray(northing)
+
+def format_grid_refs(easting, northing, grid="OSGB", digits=6):
+    """ 
+    Format grid eastings and northings as grid references, e.g. "SK724228".
+
+    Parameters
+    ----------
+        easting: np.array
+            eastings in metres
+        northing: np.array
+            northings in metres
+        grid: str
+            "OSGB" or "Irish"
+        digits: int
+            number of digits, 6 for 100 m squares
+
+    Returns
+    -------
+        refs: np.array
+            grid references, None where outside the grid
+    """
+    easting = np.asarray(easting, dtype=float)
+    northing = np.asarray(northing, dtype=float)
+    ok = np.isfinite(easting) & np.isfinite(northing) & (easting >= 0) & (northing >= 0)
+    e = np.where(ok, easting, 0)
+    n = np.where(ok, northing, 0)
+    e100 = (e//100000).astype(int)
+    n100 = (n//100000).astype(int)
+    if grid == "OSGB":
+        ok &= (e100 < 7) & (n100 < 13)
+        first = (19 - n100)//5*5 + (e100 + 10)//5
+        second = (19 - n100)*5 % 25 + e100 % 5
+        square = np.char.add(letters[np.clip(first, 0, 24)], letters[np.clip(second, 0, 24)])
+    else:
+        ok &= (e100 < 5) & (n100 < 5)
+        square = letters[np.clip((4 - n100)*5 + e100, 0, 24)]
+    half = digits//2
+    scale = 10.0**(5-half)
+    east = ((e % 100000)//scale).astype(int)
+    north = ((n % 100000)//scale).astype(int)
+    refs = np.char.add(np.char.add(square, np.char.zfill(east.astype(str), half)), np.char.zfill(north.astype(str), half))
+    return np.where(ok, refs.astype(object), None)
+
+def haversine(lat1, long1, lat2, long2):
+    """ 
+    Great circle distance between two sets of points.
+
+    Parameters
+    ----------
+        lat1: np.array
+            latitudes of the first points
+        long1: np.array
+            longitudes of the first points
+        lat2: np.array
+            latitudes of the second points
+        long2: np.array
+            longitudes of the second points
+
+    Returns
+    -------
+        distance: np.array
+            distance in km
+    """
+    lat1, long1, lat2, long2 = [np.radians(np.asarray(v, dtype=float)) for v in [lat1, long1, lat2, long2]]
+    a = np.sin((lat2-lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((long2-long1)/2)**2
+    return 2*earth_radius*np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+class GridIndex:
+    def __init__(
+        self,
+        grid,
+        size = 10000,
+    ):
+        """ 
+        Buckets of points by grid square.
+
+        Parameters
+        ----------
+            grid: pd.dataframe
+                output of parse_grid_refs, one row per point
+            size: float
+                side of the bucket squares in metres
+
+        """
+        self.size = size
+        self.grid = grid
+        ok = grid["grid"].notna().values
+        rows = np.flatnonzero(ok)
+        keys = pd.DataFrame({
+            "grid" : grid["grid"].values[rows],
+            "e" : (grid["easting"].values[rows]//size).astype(int),
+            "n" : (grid["northing"].values[rows]//size).astype(int),
+        })
+        self.buckets = {k : rows[v] for k, v in keys.groupby(["grid", "e", "n"]).indices.items()}
+
+    def square(self, ref):
+        """ 
+        Rows in a grid square of any precision, e.g. "SK", "SK72" or "SK7222".
+
+        Parameters
+        ----------
+            ref: str
+                grid square reference
+
+        Returns
+        -------
+            rows: np.array
+                matching rows
+        """
+        square = parse_grid_refs([ref]).iloc[0]
+        if square["grid"] is None:
+            return np.array([], dtype=int)
+        side = square["precision"]
+        e0 = square["easting"] - side/2
+        n0 = square["northing"] - side/2
+        found = []
+        for e in range(int(e0//self.size), int(np.ceil((e0+side)/self.size))):
+            for n in range(int(n0//self.size), int(np.ceil((n0+side)/self.size))):
+                found.append(self.buckets.get((square["grid"], e, n), np.array([], dtype=int)))
+        rows = np.concatenate(found) if len(found) > 0 else np.array([], dtype=int)
+        if side < self.size:
+            east = self.grid["easting"].values[rows]
+            north = self.grid["northing"].values[rows]
+            rows = rows[(east >= e0) & (east < e0+side) & (north >= n0) & (north < n0+side)]
+        return np.sort(rows)
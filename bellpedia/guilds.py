@@ -0,0 +1,146 @@
+import sys
+import numpy as np
+import pandas as pd
+
+def split_affiliations(affiliation):
+    """ 
+    Guild names of a Dove affiliations string, e.g. "Beverley and District Society;Yorkshire Association".
+
+    Parameters
+    ----------
+        affiliation: str
+            Tower.affiliation
+
+    Returns
+    -------
+        guilds: tuple
+            interned guild names, empty if missing
+    """
+    if not isinstance(affiliation, str):
+        return ()
+    return tuple(sys.intern(g.strip()) for g in affiliation.split(";") if g.strip() != "")
+
+def guild_key(name):
+    """ 
+    Normalised guild name used as a hash key.
+
+    Parameters
+    ----------
+        name: str
+            guild name
+
+    Returns
+    -------
+        key: str
+            lower case name with collapsed whitespace
+    """
+    return " ".join(str(name).lower().split())
+
+class GuildIndex:
+    def __init__(
+        self,
+        guilds,
+        bells,
+        cwt,
+        ringable,
+    ):
+        """ 
+        Inverted index from guilds to towers with per guild rollups.
+
+        Parameters
+        ----------
+            guilds: list
+                tuple of guild names of each tower
+            bells: np.array
+                number of bells of each tower
+            cwt: np.array
+                total bell weight in cwt of each tower
+            ringable: np.array
+                bool, ringable tower with bells
+
+        """
+        counts = np.array([len(g) for g in guilds], dtype=int)
+        rows = np.repeat(np.arange(len(guilds)), counts)
+        names = [name for g in guilds for name in g]
+        codes, uniques = pd.factorize(pd.Series(names, dtype=object))
+        self.names = list(uniques)
+        self.ids = {guild_key(name) : i for i, name in enumerate(self.names)}
+
+        #Per tower guild ids as CSR arrays and the inverted index from guild ids to tower rows
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+        self.guild_ids = codes.astype(np.int32)
+        order = np.argsort(codes, kind="stable")
+        spans = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self.names)))])
+        self.towers = {i : rows[order[spans[i]:spans[i+1]]] for i in range(len(self.names))}
+
+        bells = np.asarray(bells, dtype=float)[rows]
+        cwt = np.nan_to_num(np.asarray(cwt, dtype=float))[rows]
+        ringable = np.asarray(ringable, dtype=bool)[rows]
+        N = len(self.names)
+        self.rollups = pd.DataFrame({
+            "guild" : self.names,
+            "towers" : np.bincount(codes, minlength=N),
+            "bells" : np.bincount(codes, weights=bells, minlength=N).astype(int),
+            "ringable" : np.bincount(codes, weights=ringable, minlength=N).astype(int),
+            "cwt" : np.bincount(codes, weights=cwt, minlength=N),
+        }).sort_values("towers", ascending=False, kind="stable").reset_index(drop=True)
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, name):
+        """ 
+        Guild id of a guild name, case and spacing ignored.
+
+        Parameters
+        ----------
+            name: str
+                guild name
+
+        Returns
+        -------
+            id: int
+                guild id, None if not found
+        """
+        return self.ids.get(guild_key(name))
+
+    def rows(self, names):
+        """ 
+        Tower rows in any of some guilds.
+
+        Parameters
+        ----------
+            names: str or list
+                guild names
+
+        Returns
+        -------
+            rows: np.array
+                sorted tower rows
+        """
+        if isinstance(names, str):
+            names = [names]
+        found = []
+        for name in names:
+            i = self.find(name)
+            if i is None:
+                print(f"No guild {name}")
+                continue
+            found.append(self.towers[i])
+        return np.unique(np.concatenate(found)) if len(found) > 0 else np.array([], dtype=int)
+
+    def tower_guilds(self, row):
+        """ 
+        Guild names of a tower row.
+
+        Parameters
+        ----------
+            row: int
+                tower row
+
+        Returns
+        -------
+            guilds: list
+                guild names
+        """
+        return [self.names[i] for i in self.guild_ids[self.indptr[row]:self.indptr[row+1]]]
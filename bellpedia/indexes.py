@@ -0,0 +1,164 @@
+import numpy as np
+
+class SortedIndex:
+    def __init__(
+        self,
+        values,
+    ):
+        """ 
+        Sorted columnar index over numeric values for range lookups. Missing values are not indexed.
+
+        Parameters
+        ----------
+            values: np.array
+                value of each row
+
+        """
+        values = np.asarray(values, dtype=float)
+        rows = np.flatnonzero(np.isfinite(values))
+        order = np.argsort(values[rows], kind="stable")
+        self.keys = values[rows][order]
+        self.rows = rows[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def bounds(self, lo=None, hi=None):
+        """ 
+        Binary search for the slice of keys between lo and hi inclusive.
+
+        Parameters
+        ----------
+            lo: float
+                lower bound, unbounded if None
+            hi: float
+                upper bound, unbounded if None
+
+        Returns
+        -------
+            start: int
+                first index of the slice
+            end: int
+                end index of the slice
+        """
+        start = 0 if lo is None else int(np.searchsorted(self.keys, lo, side="left"))
+        end = len(self.keys) if hi is None else int(np.searchsorted(self.keys, hi, side="right"))
+        return start, max(start, end)
+
+    def range(self, lo=None, hi=None):
+        """ 
+        Rows with values between lo and hi inclusive, in O(log n + k).
+
+        Parameters
+        ----------
+            lo: float
+                lower bound, unbounded if None
+            hi: float
+                upper bound, unbounded if None
+
+        Returns
+        -------
+            rows: np.array
+                matching rows in order of value
+        """
+        start, end = self.bounds(lo, hi)
+        return self.rows[start:end]
+
+    def count(self, lo=None, hi=None):
+        """ 
+        Number of rows with values between lo and hi inclusive, in O(log n).
+
+        Parameters
+        ----------
+            lo: float
+                lower bound, unbounded if None
+            hi: float
+                upper bound, unbounded if None
+
+        Returns
+        -------
+            count: int
+                number of matching rows
+        """
+        start, end = self.bounds(lo, hi)
+        return end - start
+
+class IntervalIndex:
+    def __init__(
+        self,
+        starts,
+        ends,
+        ids,
+    ):
+        """ 
+        Index of closed intervals sorted by start for stabbing and overlap queries, with a max tree
+        of the interval ends over the start order. Intervals with a missing start or end are not indexed.
+
+        Parameters
+        ----------
+            starts: np.array
+                start of each interval
+            ends: np.array
+                end of each interval
+            ids: np.array
+                id of each interval
+
+        """
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        ids = np.asarray(ids)
+        ok = np.isfinite(starts) & np.isfinite(ends)
+        order = np.argsort(starts[ok], kind="stable")
+        self.starts = starts[ok][order]
+        self.ends = ends[ok][order]
+        self.ids = ids[ok][order]
+
+        #Implicit binary tree, node i has children 2i and 2i+1 and the leaves start at size
+        self.size = 1
+        while self.size < len(self.starts):
+            self.size *= 2
+        self.max_ends = np.full(2*self.size, -np.inf)
+        self.max_ends[self.size:self.size+len(self.ends)] = self.ends
+        n = self.size
+        while n > 1:
+            half = n//2
+            self.max_ends[half:n] = np.maximum(self.max_ends[n:2*n:2], self.max_ends[n+1:2*n:2])
+            n = half
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlap(self, lo, hi=None):
+        """ 
+        Ids of the intervals overlapping lo to hi inclusive, or containing lo if hi is None.
+        Binary search bounds the intervals starting before hi, the max tree then skips every subtree
+        ending before lo, so a query visits O((k+1) log n) nodes for k matches.
+
+        Parameters
+        ----------
+            lo: float
+                start of the query
+            hi: float
+                end of the query, lo if None
+
+        Returns
+        -------
+            ids: np.array
+                ids of the matching intervals in order of start
+        """
+        hi = lo if hi is None else hi
+        end = int(np.searchsorted(self.starts, hi, side="right"))
+        rows = []
+        #Depth first, left child last on the stack so rows come out in order of start
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, first, span = stack.pop()
+            if first >= end or self.max_ends[node] < lo:
+                continue
+            if span == 1:
+                rows.append(first)
+                continue
+            span //= 2
+            stack.append((2*node+1, first+span, span))
+            stack.append((2*node, first, span))
+        return self.ids[np.array(rows, dtype=np.int64)]
@@ -8,7 +8,18 @@ import re
 import pickle
 
 from bellpedia.functions import load_yaml
-from bellpedia.world import World, Tower, Bell
+from bellpedia.world import World, Tower, Bell, Frame
+from bellpedia.regions import RegionTree
+from bellpedia.founders import FounderTable
+from bellpedia.frames import parse_frames
+from bellpedia.names import NameTable
+from bellpedia.postcodes import normalise_postcodes
+from bellpedia.flags import practice_mask, facility_mask
+from bellpedia.guilds import split_affiliations
+from bellpedia.changes import parse_changes, ChangeLog
+from bellpedia.validate import validate_export
+from bellpedia.merge import merge_sources
+from bellpedia.strings import strings, tower_fields, bell_fields
 from bellpedia.functions import Coords
 
 class Generate_Config:
@@ -66,6 +77,8 @@ class Generate_Config:
         #Dove data settings
         self.ring_type = yaml_in["ring_type"]
         self.dove_refresh = yaml_in["dove_data_refresh"]
+        #Dove tower files merged by RingID, highest precedence first
+        self.dove_sources = yaml_in.get("dove_sources", ["towers.csv"])
         return
 
     def change_dir(
@@ -122,13 +135,142 @@ class Generate_World:
         self.plk_dir = f"{self.config.working_dir}/{self.config.data_dir}/world/"
 
         filename = "Bellpedia_All.plk"
+        self.validation = None
         if self.config.dove_refresh:
+            self.validation = self.validate_dove()
+        if self.config.dove_refresh and (self.validation.ok or not os.path.exists(self.plk_dir + filename)):
             self.towers = self.create_world_from_dove()
             self.pickle_saver(self.towers, filename)
         else:
+            if self.validation is not None:
+                print(f"Dove data failed validation, see {self.plk_dir}Bellpedia_Validation.json. Loading the saved world")
             self.towers =  self.create_world_from_pickle(filename)
+            strings.intern_towers(self.towers)
+            #Worlds saved before postcodes were normalised at ingest
+            postcodes = normalise_postcodes([t.postcode for t in self.towers])
+            for t, postcode in zip(self.towers, postcodes):
+                t.postcode = "" if postcode is None else postcode
+                #Practice days of older worlds counted weekdays in bracketed notes
+                t.practice_days = practice_mask(t.practice)
         self.world = World(self.towers)
+        self.world.graph_file = self.plk_dir + "Bellpedia_Graph.npz"
+        self.regions = self.load_regions()
+        if self.regions is not None:
+            self.world.set_regions(self.regions)
+        self.founders = self.load_founders()
+        if self.founders is not None:
+            self.world.set_founders(self.founders)
+        self.names = self.load_names()
+        if self.names is not None:
+            self.world.set_names(self.names)
+        self.changes = self.load_changes()
+        if self.changes is not None:
+            self.world.set_changes(self.changes)
         
+    def validate_dove(self):
+        """ 
+        Validate the Dove data before a rebuild and save the report next to the saved world
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            report: ValidationReport class instance
+                validation issues
+
+        """
+        tables = {}
+        for name, filename in [("bells", "bells.csv"), ("frames", "frames.csv")]:
+            if os.path.exists(self.dove_dir + filename):
+                tables[name] = pd.read_csv(self.dove_dir + filename, low_memory=False)
+        report = validate_export(self.load_dove_towers(), ring_type=self.config.ring_type, **tables)
+        report.save(self.plk_dir + "Bellpedia_Validation.json")
+        print(report.summary)
+        return report
+
+    def load_regions(self):
+        """ 
+        Load the Dove region hierarchy
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            tree: RegionTree class instance
+                region tree from regions.csv, None if not found
+
+        """
+        if not os.path.exists(self.dove_dir + "regions.csv"):
+            print(f"No regions.csv in {self.dove_dir}")
+            return None
+        return RegionTree(pd.read_csv(self.dove_dir + "regions.csv"))
+
+    def load_founders(self):
+        """ 
+        Load the Dove bell founders
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            table: FounderTable class instance
+                founders table from founders.csv, None if not found
+
+        """
+        if not os.path.exists(self.dove_dir + "founders.csv"):
+            print(f"No founders.csv in {self.dove_dir}")
+            return None
+        return FounderTable(pd.read_csv(self.dove_dir + "founders.csv"))
+
+    def load_names(self):
+        """ 
+        Load the Dove alternate names and renamed tower codes
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            table: NameTable class instance
+                name table from towers.csv, AddNtrs.txt and newpks.txt, None if towers.csv is not found
+
+        """
+        if not os.path.exists(self.dove_dir + "towers.csv"):
+            print(f"No towers.csv in {self.dove_dir}")
+            return None
+        towers = pd.read_csv(
+            self.dove_dir + "towers.csv", 
+            usecols=["TowerID", "DoveID", "Place", "Place2", "County", "Dedicn", "AltName"]
+        )
+        tables = {}
+        for name, filename in [("alternates", "AddNtrs.txt"), ("renamed", "newpks.txt")]:
+            if os.path.exists(self.dove_dir + filename):
+                tables[name] = pd.read_csv(self.dove_dir + filename, sep="\\\\", engine="python")
+            else:
+                print(f"No {filename} in {self.dove_dir}")
+        return NameTable(towers, **tables)
+
+    def load_changes(self):
+        """ 
+        Load the Dove change log
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            log: ChangeLog class instance
+                change log from changes.csv, None if not found
+
+        """
+        if not os.path.exists(self.dove_dir + "changes.csv"):
+            print(f"No changes.csv in {self.dove_dir}")
+            return None
+        return ChangeLog(parse_changes(pd.read_csv(self.dove_dir + "changes.csv")))
+
     def pickle_saver(self, obj, filename):
         """ 
         Save class instance of world to file. 
@@ -330,11 +472,15 @@ class Generate_World:
         grid_reference=dat.NG
         country = dat.Country
         county = dat.County
+        region = dat.Region
         diocese= dat.Diocese
         affiliation = dat.Affiliations
         frames = []
         practice = dat.Practice
         LGrade = dat.LGrade
+        practice_days = practice_mask(practice)
+        facilities = facility_mask(dat)
+        guilds = split_affiliations(affiliation)
 
         name = name
         place = place
@@ -345,13 +491,14 @@ class Generate_World:
         grid_reference= grid_reference
         country = self.sort_out_type(country,"str","")
         county = self.sort_out_type(county,"str", "")
+        region = self.sort_out_type(region,"str", "")
         diocese = diocese
         affiliation = affiliation
         frames = frames
         practice = practice
         LGrade = LGrade
         
-        return Tower(
+        return strings.intern_object(Tower(
             name = name,
             place = place,
             dove_id = dove_id,
@@ -361,12 +508,16 @@ class Generate_World:
             grid_reference= grid_reference,
             country = country,
             county = county,
+            region = region,
             diocese = diocese,
             affiliation = affiliation,
             frames = frames,
             practice = practice,
-            LGrade = LGrade
-        )
+            LGrade = LGrade,
+            practice_days = practice_days,
+            facilities = facilities,
+            guilds = guilds
+        ), tower_fields)
 
     def make_bells_from_data(self, dat):
         """ 
@@ -422,7 +573,7 @@ class Generate_World:
             cracked = cracked
             frame_id = frame_id
 
-            bells.append(
+            bells.append(strings.intern_object(
                 Bell(
                     N = N,
                     C = C,
@@ -440,10 +591,53 @@ class Generate_World:
                     turnings = turnings,
                     cracked = cracked,
                     frame_id = frame_id
-                )
-            )
+                ), bell_fields
+            ))
         return bells
 
+    def make_frames_from_data(self, dat):
+        """ 
+        Create frame class instances from Dove data for all towers, with the dates, truss and layout
+        codes parsed in one vectorized pass
+        
+        Parameters
+        ----------
+            dat: pd.dataframe
+                frame data from dove data.
+
+        Returns
+        -------
+            frames: dict
+                lists of frame class instances by dove tower id
+
+        """
+        parsed = parse_frames(dat)
+        frames = {}
+        for row in parsed.reset_index().itertuples(index=False):
+            frame = Frame(
+                dove_id = int(row.frame_id),
+                tower_id = int(row.tower_id),
+                number = None if pd.isna(row.number) else row.number,
+                dated = None if pd.isna(row.dated) else int(row.dated),
+                date_flag = None if pd.isna(row.date_flag) else row.date_flag,
+                materials = row.materials,
+                maker = None if pd.isna(row.maker) else row.maker,
+                maker_uncertain = bool(row.maker_uncertain),
+                listed = bool(row.listed),
+                trusses = None if pd.isna(row.trusses) else row.trusses,
+                truss_group = None if pd.isna(row.truss_group) else int(row.truss_group),
+                truss_subgroup = None if pd.isna(row.truss_subgroup) else int(row.truss_subgroup),
+                truss_type = None if pd.isna(row.truss_type) else row.truss_type,
+                truss_variant = None if pd.isna(row.truss_variant) else row.truss_variant,
+                layout = None if pd.isna(row.layout) else row.layout,
+                pits = None if pd.isna(row.pits) else int(row.pits),
+                arrangement = None if pd.isna(row.arrangement) else row.arrangement,
+                resultant_layout = None if pd.isna(row.resultant_layout) else row.resultant_layout,
+                extensions = None if pd.isna(row.extensions) else int(row.extensions)
+            )
+            frames.setdefault(frame.tower_id, []).append(frame)
+        return frames
+
     def create_world_from_dove(self):
         """ 
         Create the world from dove data combining all the bells and tower class instances
@@ -457,11 +651,16 @@ class Generate_World:
                 List of class towers in the world
 
         """
-        Towers_data = pd.read_csv(self.dove_dir + "towers.csv")
+        Towers_data = self.load_dove_towers()
         Bells_data = pd.read_csv(self.dove_dir + "bells.csv")
+        Frames = self.make_frames_from_data(pd.read_csv(self.dove_dir + "frames.csv", dtype={"Frame Number" : str}))
+        Bells_groups = Bells_data.groupby("Tower ID").indices
+
+        #One ring of the configured type per tower, the first by source precedence
+        ring_type = Towers_data["RingType"].astype("string").str.lower().values == self.config.ring_type
+        Towers_data = Towers_data[ring_type].drop_duplicates("TowerID", keep="first")
         
         Towers = []
-        dove_ids = []
         Markers = list(np.linspace(0, len(Towers_data)+1, 11, dtype=int))
         mark = 10
         print(f"{0} %")
@@ -474,15 +673,89 @@ class Generate_World:
             if Tower_temp is None:
                 continue
 
-            Tower_temp.add_bells(self.make_bells_from_data(Bells_data[Bells_data["Tower ID"] == Tower_temp.dove_id]))
-            if Tower_temp.dove_id in dove_ids:
-                continue
-
+            Tower_temp.add_bells(self.make_bells_from_data(Bells_data.iloc[Bells_groups.get(Tower_temp.dove_id, [])]))
+            Tower_temp.frames = Frames.get(Tower_temp.dove_id, [])
             Towers.append(Tower_temp)  
-            dove_ids.append(Tower_temp.dove_id)
                     
         return Towers
 
+    def load_dove_towers(self, dove_dir=None):
+        """ 
+        Load and merge the Dove tower files in dove_sources by RingID, recording the source of each ring
+        
+        Parameters
+        ----------
+            dove_dir: str
+                directory of the Dove files, the dove data directory if None
+
+        Returns
+        -------
+            Towers_data: pd.dataframe
+                one row per ring with "source", "sources" and "conflicts" columns
+
+        """
+        dove_dir = self.dove_dir if dove_dir is None else dove_dir
+        sources = {}
+        for filename in self.config.dove_sources:
+            if os.path.exists(dove_dir + filename):
+                sources[filename] = pd.read_csv(dove_dir + filename)
+            else:
+                print(f"No {filename} in {dove_dir}")
+        Towers_data = merge_sources(sources, key="RingID", precedence=self.config.dove_sources)
+        if "Postcode" in Towers_data:
+            #Normalised once here rather than every time a world is built
+            Towers_data["Postcode"] = pd.Series(normalise_postcodes(Towers_data["Postcode"].values)).fillna("").values
+        conflicts = (Towers_data["conflicts"] > 0).sum() if len(Towers_data) > 0 else 0
+        if conflicts > 0:
+            print(f"{conflicts} rings differ between {', '.join(sources)}, kept the values of the first")
+        return Towers_data
+
+    def apply_changeset(self, changeset, new_dir=None, save=True):
+        """ 
+        Patch the world with a changeset between two Dove exports, rebuilding only the changed towers
+        
+        Parameters
+        ----------
+            changeset: Changeset class instance
+                changes from the export the world was built from to the new export
+            new_dir: str
+                directory of the new export, the dove data directory if None
+            save: bool
+                save the patched world over the pickled world
+
+        Returns
+        -------
+
+        """
+        new_dir = self.dove_dir if new_dir is None else new_dir
+        Towers_data = self.load_dove_towers(new_dir)
+        Towers_data = Towers_data[Towers_data["TowerID"].isin(changeset.towers)]
+        Bells_data = pd.read_csv(new_dir + "bells.csv")
+        Bells_data = Bells_data[Bells_data["Tower ID"].isin(changeset.towers)]
+        Frames_data = pd.read_csv(new_dir + "frames.csv", dtype={"Frame Number" : str})
+        Frames = self.make_frames_from_data(Frames_data[Frames_data["Tower ID"].isin(changeset.towers)])
+        Bells_groups = Bells_data.groupby("Tower ID").indices
+
+        ring_type = Towers_data["RingType"].astype("string").str.lower().values == self.config.ring_type
+        Towers_data = Towers_data[ring_type].drop_duplicates("TowerID", keep="first")
+
+        Towers = []
+        for Ti in range(len(Towers_data)):
+            Tower_temp = self.make_tower_from_data(Towers_data.iloc[Ti])
+            if Tower_temp is None:
+                continue
+            rows = Bells_groups.get(Tower_temp.dove_id, [])
+            Tower_temp.add_bells(self.make_bells_from_data(Bells_data.iloc[rows]))
+            Tower_temp.frames = Frames.get(Tower_temp.dove_id, [])
+            Towers.append(Tower_temp)
+
+        self.world.update_towers(Towers, list(changeset.towers) + list(changeset.removed))
+        self.towers = self.world.towers
+        print(f"{len(Towers)} towers rebuilt, {len(changeset.removed)} towers removed")
+        if save:
+            self.pickle_saver(self.towers, "Bellpedia_All.plk")
+        return
+
     def create_world_from_pickle(self, filename):
         """ 
         Load world from pickled file
@@ -529,6 +802,10 @@ def grab_my_towers(
     world = Generate_World().world
 
     my_list = pd.read_excel(f"{config.working_dir}/{config.user_data_dir}/{filename}.xlsx") 
+    #Old Dove codes and alternate names
+    my_list[searchby] = world.resolve(searchby, my_list[searchby].values)
+    if searchby.lower() == "postcode":
+        my_list[searchby] = normalise_postcodes(my_list[searchby].values)
     my_list["Date"] = my_list["Date"].dt.date
     my_list.sort_values(['Date'], inplace=True, ascending=True) 
     my_list = my_list.drop_duplicates(searchby) 
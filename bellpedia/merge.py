@@ -0,0 +1,55 @@
+import pandas as pd
+
+def merge_sources(sources, key="RingID", precedence=None, coalesce=True):
+    """ 
+    Merge rows of the same entity across several source tables, e.g. the Dove towers.csv and dove.csv.
+    Rows are grouped by key with a single hash grouping pass, in linear time.
+
+    Parameters
+    ----------
+        sources: dict
+            tables by source name, all with the key column
+        key: str
+            entity key column, e.g. "RingID"
+        precedence: list
+            source names, highest precedence first, the order of sources if None
+        coalesce: bool
+            fill values missing from the highest precedence row from lower precedence rows,
+            otherwise keep the highest precedence row as it is
+
+    Returns
+    -------
+        merged: pd.dataframe
+            one row per key in order of first appearance, with the "source" of the row, all "sources"
+            of the key and the number of "conflicts", columns with different values across the sources
+    """
+    precedence = list(sources) if precedence is None else [p for p in precedence if p in sources]
+    if len(precedence) == 0:
+        print("No sources to merge")
+        return pd.DataFrame()
+    #Stacked in order of precedence, so the first row of each group has the highest precedence
+    stacked = pd.concat([sources[name].assign(source=name) for name in precedence], ignore_index=True)
+    missing = stacked[key].isna()
+    if missing.any():
+        print(f"{missing.sum()} rows without a {key} dropped")
+        stacked = stacked[~missing]
+
+    groups = stacked.groupby(key, sort=False)
+    if coalesce:
+        merged = groups.first()
+    else:
+        merged = stacked.drop_duplicates(key, keep="first").set_index(key)
+    merged["source"] = groups["source"].first()
+
+    #Provenance and conflicts only need the keys found in more than one source
+    counts = groups.size()
+    multi = counts.index[counts.values > 1]
+    merged["sources"] = merged["source"]
+    merged["conflicts"] = 0
+    if len(multi) > 0:
+        shared = stacked[stacked[key].isin(multi)]
+        shared_groups = shared.groupby(key, sort=False)
+        merged.loc[multi, "sources"] = shared_groups["source"].agg(";".join).reindex(multi).values
+        columns = [c for c in stacked.columns if c not in [key, "source"]]
+        merged.loc[multi, "conflicts"] = (shared_groups[columns].nunique() > 1).sum(axis=1).reindex(multi).values
+    return merged.reset_index()[[key] + [c for c in stacked.columns if c != key] + ["sources", "conflicts"]]
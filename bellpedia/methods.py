@@ -0,0 +1,603 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+#Place notation symbols of the bells 1 to 16
+bell_symbols = "1234567890ETABCD"
+
+####################################################################################################
+                 ############################ Place notation ############################
+####################################################################################################
+
+def change_perm(places, stage):
+    """ 
+    Permutation array of a single change. Bells not making places swap in pairs.
+
+    Parameters
+    ----------
+        places: str
+            place notation of the change e.g. "x", "14" or "125"
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        perm: np.array
+            permutation array, next_row = row[perm]
+    """
+    if places in ["x", "X", "-"]:
+        made = set()
+    else:
+        made = set(bell_symbols.index(p) for p in places.upper())
+    perm = np.arange(stage)
+    i = 0
+    while i < stage:
+        if i in made:
+            i += 1
+        elif i+1 < stage and i+1 not in made:
+            perm[i], perm[i+1] = i+1, i
+            i += 2
+        else:
+            #Implied place
+            i += 1
+    return perm
+
+def parse_notation(notation):
+    """ 
+    Split place notation into changes. Comma separated segments are palindromes
+    e.g. "x16x16x16,12" is x.16.x.16.x.16.x.16.x.16.x.12
+
+    Parameters
+    ----------
+        notation: str
+            place notation
+
+    Returns
+    -------
+        changes: list
+            place notation of each change
+    """
+    notation = notation.replace("&", "").replace("+", "")
+    segments = notation.split(",")
+    changes = []
+    for segment in segments:
+        parts = [p for p in re.split("(x|X|-)|\\.", segment) if p is not None and p != ""]
+        if len(segments) > 1:
+            parts = parts + parts[-2::-1]
+        changes.extend(parts)
+    return changes
+
+def notation_perms(notation, stage):
+    """ 
+    Permutation arrays of each change of a place notation.
+
+    Parameters
+    ----------
+        notation: str
+            place notation
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        perms: np.array
+            (Nchanges, stage) permutation arrays
+    """
+    changes = parse_notation(notation)
+    if len(changes) == 0:
+        return np.zeros((0, stage), dtype=np.int64)
+    return np.stack([change_perm(c, stage) for c in changes])
+
+def cumulative_perms(perms):
+    """ 
+    Compose the permutations of a lead so row k of the lead is lead_head[cum[k]].
+
+    Parameters
+    ----------
+        perms: np.array
+            (Nchanges, stage) permutation arrays
+
+    Returns
+    -------
+        cum: np.array
+            (Nchanges, stage) cumulative permutation arrays
+    """
+    cum = np.empty_like(perms)
+    current = np.arange(perms.shape[1])
+    for k, perm in enumerate(perms):
+        current = current[perm]
+        cum[k] = current
+    return cum
+
+####################################################################################################
+                 ############################ Methods ############################
+####################################################################################################
+
+class Method:
+    def __init__(
+        self,
+        name,
+        stage,
+        notation,
+        calls = {},
+    ):
+        """ 
+        Change ringing method defined by its place notation.
+
+        Parameters
+        ----------
+            name: str
+                name of the method
+            stage: int
+                number of working bells
+            notation: str
+                place notation of one lead
+            calls: dict
+                call symbol to (lead end notation, next lead start notation). The lead end notation
+                replaces the last changes of the lead, the next lead start notation the first changes
+                of the following lead. Either may be ""
+
+        """
+        self.name = name
+        self.stage = stage
+        self.notation = notation
+        self.lead = parse_notation(notation)
+        self.calls = calls
+
+    @property
+    def lead_length(self):
+        """ 
+        Number of changes per lead
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            length: int
+                number of changes per lead
+
+        """
+        return len(self.lead)
+
+    def lead_changes(self, start_call=None, end_call=None):
+        """ 
+        Place notation of a lead with the calls applied.
+
+        Parameters
+        ----------
+            start_call: str
+                call made at the end of the previous lead
+            end_call: str
+                call made at the end of this lead
+
+        Returns
+        -------
+            changes: list
+                place notation of each change of the lead
+        """
+        changes = list(self.lead)
+        if start_call is not None:
+            start = parse_notation(self.calls[start_call][1])
+            changes[:len(start)] = start
+        if end_call is not None:
+            end = parse_notation(self.calls[end_call][0])
+            if len(end) > 0:
+                changes[-len(end):] = end
+        return changes
+
+    def __repr__(self):
+        return f"{self.name} ({self.stage} bells: {self.notation})"
+
+def stage_symbol(stage):
+    """ 
+    Place notation symbol of the back bell.
+
+    Parameters
+    ----------
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        symbol: str
+            place notation symbol
+    """
+    return bell_symbols[stage-1]
+
+def plain_hunt(stage):
+    """ 
+    Plain hunt on any number of bells.
+
+    Parameters
+    ----------
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        method: Method class instance
+            plain hunt
+
+    """
+    n = stage_symbol(stage)
+    if stage % 2 == 0:
+        notation = ".".join(["x", f"1{n}"]*stage)
+    else:
+        notation = ".".join([n, "1"]*stage)
+    return Method(f"Plain Hunt on {stage}", stage, notation)
+
+def plain_bob(stage):
+    """ 
+    Plain Bob on any number of bells with bobs ("-") and singles ("s").
+
+    Parameters
+    ----------
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        method: Method class instance
+            Plain Bob
+
+    """
+    n = stage_symbol(stage)
+    if stage % 2 == 0:
+        half = "x" + f"1{n}x"*(stage//2 - 1) + f"1{n}"
+        notation = f"{half},12"
+        calls = {"-" : ("14", ""), "s" : ("1234", "")}
+    else:
+        half = ".".join([n, "1"]*(stage//2) + [n])
+        notation = f"{half},12{n}"
+        #The single makes thirds, the bells behind it swap
+        calls = {"-" : (f"14{n}", ""), "s" : ("123", "")}
+    return Method(f"Plain Bob on {stage}", stage, notation, calls)
+
+def grandsire(stage):
+    """ 
+    Grandsire on an odd number of bells with bobs ("-") and singles ("s").
+
+    Parameters
+    ----------
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        method: Method class instance
+            Grandsire
+
+    """
+    if stage % 2 == 0:
+        raise ValueError("Grandsire is rung on an odd number of bells")
+    n = stage_symbol(stage)
+    half = ".".join(["1", n]*(stage//2) + ["1"])
+    notation = f"3,{half}"
+    #Calls replace the last two changes of the lead
+    calls = {"-" : ("3.1", ""), "s" : ("3.123", "")}
+    return Method(f"Grandsire on {stage}", stage, notation, calls)
+
+methods = {
+    "plain hunt" : plain_hunt,
+    "plain bob" : plain_bob,
+    "grandsire" : grandsire,
+}
+
+def get_method(name, stage):
+    """ 
+    Get a standard method by name.
+
+    Parameters
+    ----------
+        name: str
+            Choices include "plain hunt", "plain bob" and "grandsire"
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        method: Method class instance
+            the method
+
+    """
+    return methods[name.lower()](stage)
+
+####################################################################################################
+                 ############################ Touches ############################
+####################################################################################################
+
+class Touch:
+    def __init__(
+        self,
+        method,
+        calling = None,
+        leads = None,
+        start = None,
+    ):
+        """ 
+        Touch of a method, a streaming generator of its rows.
+
+        Parameters
+        ----------
+            method: Method class instance
+                method rung
+            calling: str
+                call per lead, e.g. "--p-" with "p" or "." for a plain lead. Repeated until rounds
+            leads: int
+                maximum number of leads. Stops at rounds if None
+            start: np.array
+                starting row, rounds if None
+
+        """
+        self.method = method
+        self.stage = method.stage
+        self.calling = None if calling is None else [c for c in calling if c not in [" ", ","]]
+        self.leads = leads
+        if start is None:
+            start = np.arange(1, self.stage+1)
+        self.start = np.asarray(start)
+
+        self.lead_cache = {}
+
+    def lead_perms(self, start_call, end_call):
+        """ 
+        Cumulative permutation arrays of a lead, cached per call combination.
+
+        Parameters
+        ----------
+            start_call: str
+                call made at the end of the previous lead
+            end_call: str
+                call made at the end of this lead
+
+        Returns
+        -------
+            cum: np.array
+                (lead length, stage) cumulative permutation arrays
+        """
+        key = (start_call, end_call)
+        if key not in self.lead_cache:
+            changes = self.method.lead_changes(start_call, end_call)
+            perms = np.stack([change_perm(c, self.stage) for c in changes])
+            self.lead_cache[key] = cumulative_perms(perms)
+        return self.lead_cache[key]
+
+    def call(self, lead):
+        """ 
+        Call made at the end of a lead.
+
+        Parameters
+        ----------
+            lead: int
+                lead number
+
+        Returns
+        -------
+            call: str
+                call symbol, None for a plain lead
+        """
+        if self.calling is None or len(self.calling) == 0:
+            return None
+        c = self.calling[lead % len(self.calling)]
+        if c in ["p", "P", "."]:
+            return None
+        return c
+
+    def blocks(self):
+        """ 
+        Stream the rows of the touch lead by lead. The starting row is not included.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            rows: generator
+                (lead length, stage) array of rows per lead
+        """
+        head = self.start
+        start_call = None
+        max_leads = self.leads
+        if max_leads is None:
+            #Longest possible touch of the method
+            max_leads = int(np.prod(np.arange(1, self.stage+1)))//max(self.method.lead_length, 1) + 1
+        for lead in range(max_leads):
+            end_call = self.call(lead)
+            rows = head[self.lead_perms(start_call, end_call)]
+            yield rows
+            head = rows[-1]
+            start_call = end_call
+            if self.leads is None and np.array_equal(head, self.start):
+                return
+
+    def rows(self):
+        """ 
+        Stream the rows of the touch one at a time, starting with the starting row.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            rows: generator
+                np.array per row
+        """
+        yield self.start
+        for block in self.blocks():
+            for row in block:
+                yield row
+
+    def array(self):
+        """ 
+        All the rows of the touch, starting with the starting row.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            rows: np.array
+                (Nrows, stage) rows
+        """
+        return np.vstack([self.start[None,:]] + list(self.blocks()))
+
+    def is_true(self):
+        """ 
+        Check no row is repeated, the final rounds excepted.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            true: bool
+                True if the touch is true
+        """
+        rows = self.array()
+        if np.array_equal(rows[-1], rows[0]) and len(rows) > 1:
+            rows = rows[:-1]
+        return is_true(rows)
+
+####################################################################################################
+                 ############################ Extents and truth ############################
+####################################################################################################
+
+def plain_changes(stage):
+    """ 
+    Extent of plain changes, every row on the stage once, consecutive rows differing by
+    a single swap of adjacent bells (Steinhaus-Johnson-Trotter order).
+
+    Parameters
+    ----------
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        rows: np.array
+            (stage!, stage) rows starting from rounds
+    """
+    rows = np.array([[1]], dtype=np.int8)
+    for n in range(2, stage+1):
+        m = rows.shape[0]
+        out = np.empty((m, n, n), dtype=np.int8)
+        for p in range(n):
+            #Even rows move bell n from the back down, odd rows from the front up
+            pos = np.where(np.arange(m) % 2 == 0, n-1-p, p)
+            cols = np.arange(n)[None,:]
+            before = cols < pos[:,None]
+            src = np.where(before, cols, cols-1)
+            src = np.clip(src, 0, n-2)
+            block = np.take_along_axis(rows, src, axis=1)
+            block[cols.repeat(m, axis=0) == pos[:,None]] = n
+            out[:,p,:] = block
+        rows = out.reshape(m*n, n)
+    return rows.astype(np.int64)
+
+#Callings per lead of true extents of the standard methods
+extent_callings = {
+    ("plain bob", 5) : "ppp-ppp-ppp-",
+    ("plain bob", 6) : "pppp-pppp-ppppspppp-pppp-ppp-pppp-ppspppssppppsppsppppsssp-s",
+    ("grandsire", 5) : "p-p-psp-p-ps",
+}
+
+def extent(name, stage):
+    """ 
+    Rows of an extent, every row on the stage rung once.
+    
+    Parameters
+    ----------
+        name: str
+            "plain changes" on any stage, or a method of extent_callings e.g. "plain bob" on 6
+        stage: int
+            number of working bells
+
+    Returns
+    -------
+        rows: np.array
+            (stage!+1, stage) rows starting and ending in rounds
+    """
+    name = name.lower()
+    if name == "plain changes":
+        rows = plain_changes(stage)
+        return np.vstack([rows, rows[:1]])
+    if (name, stage) not in extent_callings:
+        raise ValueError(f"No extent of {name} on {stage} bells")
+    return Touch(get_method(name, stage), calling=extent_callings[(name, stage)]).array()
+
+def row_codes(rows):
+    """ 
+    Encode rows as integers for hashing.
+
+    Parameters
+    ----------
+        rows: np.array
+            (Nrows, stage) rows
+
+    Returns
+    -------
+        codes: np.array
+            integer code per row
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    powers = np.int64(16)**np.arange(rows.shape[1]-1, -1, -1, dtype=np.int64)
+    return (rows-1) @ powers
+
+def is_true(rows):
+    """ 
+    Check no row is repeated by hashing the row codes.
+
+    Parameters
+    ----------
+        rows: np.array
+            (Nrows, stage) rows
+
+    Returns
+    -------
+        true: bool
+            True if no row is repeated
+    """
+    return not pd.Series(row_codes(rows)).duplicated().any()
+
+def false_rows(rows):
+    """ 
+    Indexes of the rows repeating an earlier row.
+
+    Parameters
+    ----------
+        rows: np.array
+            (Nrows, stage) rows
+
+    Returns
+    -------
+        indexes: np.array
+            indexes of repeated rows
+    """
+    return np.flatnonzero(pd.Series(row_codes(rows)).duplicated().values)
+
+def strike_times(Nrows, stage, gapsize=0.2, handstroke_gap=1.0):
+    """ 
+    Onset of every blow of a touch. Rows alternate handstroke and backstroke, and each
+    handstroke after the first is preceded by the handstroke lead.
+
+    Parameters
+    ----------
+        Nrows: int
+            number of rows
+        stage: int
+            number of bells per row
+        gapsize: float
+            gap between blows in seconds
+        handstroke_gap: float
+            handstroke lead in blows
+
+    Returns
+    -------
+        onsets: np.array
+            (Nrows, stage) onsets in seconds
+    """
+    r = np.arange(Nrows)
+    row_start = (r*stage + (r//2)*handstroke_gap)*gapsize
+    return row_start[:,None] + gapsize*np.arange(stage)[None,:]
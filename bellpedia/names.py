@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+def name_key(name):
+    """ 
+    Normalised tower or place name used as a hash key.
+
+    Parameters
+    ----------
+        name: str
+            tower or place name
+
+    Returns
+    -------
+        key: str
+            lower case name with full stops removed and whitespace collapsed, None if missing
+    """
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return None
+    key = " ".join(str(name).lower().replace(".", "").split())
+    return key if key != "" else None
+
+def code_key(code):
+    """ 
+    Normalised Dove code, e.g. "AB KETTLEB", used as a hash key.
+
+    Parameters
+    ----------
+        code: str
+            Dove code
+
+    Returns
+    -------
+        key: str
+            upper case code with whitespace collapsed, None if missing
+    """
+    if code is None or (isinstance(code, float) and np.isnan(code)):
+        return None
+    key = " ".join(str(code).upper().split())
+    return key if key != "" else None
+
+class NameTable:
+    def __init__(
+        self,
+        towers,
+        alternates = None,
+        renamed = None,
+    ):
+        """ 
+        Hash tables resolving old Dove codes and alternate names to current tower ids.
+
+        Parameters
+        ----------
+            towers: pd.dataframe
+                Dove towers data with TowerID, DoveID, Place, Place2, County, Dedicn and AltName columns
+            alternates: pd.dataframe
+                AddNtrs.txt data with DoveID, AltName ("; " separated) and DovePlace columns
+            renamed: pd.dataframe
+                newpks.txt data with OldID and NewID columns
+
+        """
+        towers = towers.drop_duplicates("TowerID")
+
+        #Dove code -> tower id, current codes first then renamed codes chained to their current code
+        self.codes = {}
+        for tid, code in zip(towers["TowerID"], towers["DoveID"]):
+            key = code_key(code)
+            if key is not None:
+                self.codes[key] = int(tid)
+        if renamed is not None:
+            new = {code_key(o) : code_key(n) for o, n in zip(renamed["OldID"], renamed["NewID"]) if code_key(o) is not None}
+            for old in new:
+                seen = [old]
+                while seen[-1] in new and new[seen[-1]] not in seen:
+                    seen.append(new[seen[-1]])
+                current = [s for s in seen if s in self.codes]
+                if old not in self.codes and len(current) > 0:
+                    self.codes[old] = self.codes[current[0]]
+
+        #Alternate name -> tower ids
+        names = {}
+        def add(name, tid):
+            key = name_key(name)
+            if key is not None:
+                names.setdefault(key, set()).add(int(tid))
+
+        for tid, alt in zip(towers["TowerID"], towers["AltName"]):
+            if isinstance(alt, str):
+                for a in alt.split(";"):
+                    add(a, tid)
+
+        if alternates is not None:
+            by_place = {}
+            for row in towers.itertuples(index=False):
+                by_place.setdefault(row.Place, []).append(row)
+            for code, alts, where in zip(alternates["DoveID"], alternates["AltName"], alternates["DovePlace"]):
+                tid = self.codes.get(code_key(code))
+                if tid is None and isinstance(where, str):
+                    tid = self.match_place(where, by_place.get(where.split(", ")[0], []))
+                if tid is None or not isinstance(alts, str):
+                    continue
+                for a in alts.split(";"):
+                    add(a, tid)
+        self.names = {k : tuple(sorted(v)) for k, v in names.items()}
+
+    @staticmethod
+    def match_place(where, candidates):
+        """ 
+        Tower id of a Dove place description, e.g. "Abberley, Worcestershire, S Mary".
+
+        Parameters
+        ----------
+            where: str
+                Dove place description
+            candidates: list
+                tower rows with the same place
+
+        Returns
+        -------
+            id: int
+                tower id, None if not matched to a single tower
+        """
+        found = [
+            c for c in candidates
+            if isinstance(c.Dedicn, str) and f", {c.Dedicn}" in where
+            and (not isinstance(c.Place2, str) or c.Place2 in where)
+        ]
+        if len(found) > 1:
+            found = [c for c in found if f", {c.County}, " in where] or found
+        ids = set(int(c.TowerID) for c in found)
+        return ids.pop() if len(ids) == 1 else None
+
+    def resolve_id(self, value):
+        """ 
+        Current tower id of a tower id or an old or current Dove code.
+
+        Parameters
+        ----------
+            value: int or str
+                tower id or Dove code, e.g. 12574, "AB KETTLEB" or "ABERGWESYN"
+
+        Returns
+        -------
+            id: int
+                tower id, None if not resolved
+        """
+        if isinstance(value, (int, np.integer)):
+            return int(value)
+        if isinstance(value, float):
+            return None if np.isnan(value) else int(value)
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value)
+        return self.codes.get(code_key(value))
+
+    def resolve_name(self, value):
+        """ 
+        Tower ids known by an alternate name.
+
+        Parameters
+        ----------
+            value: str
+                alternate name, e.g. "Y Fenni"
+
+        Returns
+        -------
+            ids: tuple
+                tower ids
+        """
+        return self.names.get(name_key(value), ())
+
+    def resolve_ids(self, values):
+        """ 
+        Current tower ids of a whole column of tower ids and Dove codes.
+
+        Parameters
+        ----------
+            values: np.array
+                tower ids or Dove codes
+
+        Returns
+        -------
+            ids: np.array
+                tower ids, None where not resolved
+        """
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        resolved = np.array([self.resolve_id(u) for u in uniques] + [None], dtype=object)
+        return resolved[codes]
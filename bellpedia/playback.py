@@ -0,0 +1,441 @@
+import threading
+import wave
+
+import numpy as np
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+####################################################################################################
+                 ############################ Sinks ############################
+####################################################################################################
+
+class PyAudioSink:
+    def __init__(
+        self,
+        fs = 44100,
+    ):
+        """ 
+        Audio device output through one persistent PyAudio stream.
+
+        Parameters
+        ----------
+            fs: int
+                sampling rate, Hz
+
+        """
+        if pyaudio is None:
+            raise ImportError("pyaudio is required for audio device output, use NullSink or FileSink instead")
+        self.fs = fs
+        self.p = pyaudio.PyAudio()
+        self.stream = self.p.open(format=pyaudio.paFloat32,
+                                  channels=1,
+                                  rate=fs,
+                                  output=True)
+
+    def write(self, block):
+        """ 
+        Write a block to the device. Blocks until the device accepts it, which paces the player.
+
+        Parameters
+        ----------
+            block: np.array
+                float32 samples
+
+        Returns
+        -------
+
+        """
+        self.stream.write(block.astype(np.float32).tobytes())
+        return
+
+    def close(self):
+        """ 
+        Close the stream and release the device.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        self.stream.stop_stream()
+        self.stream.close()
+        self.p.terminate()
+        return
+
+class NullSink:
+    def __init__(
+        self,
+        fs = 44100,
+        keep = False,
+    ):
+        """ 
+        Sink discarding the audio, for machines without audio hardware.
+
+        Parameters
+        ----------
+            fs: int
+                sampling rate, Hz
+            keep: bool
+                keep the written blocks in self.blocks
+
+        """
+        self.fs = fs
+        self.keep = keep
+        self.blocks = []
+        self.Nsamples = 0
+
+    def write(self, block):
+        """ 
+        Count and optionally keep a block.
+
+        Parameters
+        ----------
+            block: np.array
+                float32 samples
+
+        Returns
+        -------
+
+        """
+        self.Nsamples += len(block)
+        if self.keep:
+            self.blocks.append(np.array(block, dtype=np.float32))
+        return
+
+    @property
+    def samples(self):
+        """ 
+        All the kept samples.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            samples: np.array
+                float32 samples written so far
+        """
+        if len(self.blocks) == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self.blocks)
+
+    def close(self):
+        """ 
+        Nothing to release.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        return
+
+class FileSink:
+    def __init__(
+        self,
+        filename,
+        fs = 44100,
+    ):
+        """ 
+        Sink writing the audio to a 16 bit mono wav file.
+
+        Parameters
+        ----------
+            filename: str
+                wav file to write
+            fs: int
+                sampling rate, Hz
+
+        """
+        self.fs = fs
+        self.wav = wave.open(filename, "wb")
+        self.wav.setnchannels(1)
+        self.wav.setsampwidth(2)
+        self.wav.setframerate(fs)
+
+    def write(self, block):
+        """ 
+        Append a block to the file.
+
+        Parameters
+        ----------
+            block: np.array
+                float32 samples
+
+        Returns
+        -------
+
+        """
+        self.wav.writeframes((np.clip(block, -1, 1)*32767).astype("<i2").tobytes())
+        return
+
+    def close(self):
+        """ 
+        Finish and close the file.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        self.wav.close()
+        return
+
+####################################################################################################
+                 ############################ Player ############################
+####################################################################################################
+
+class Player:
+    def __init__(
+        self,
+        sink = None,
+        fs = 44100,
+        blocksize = 1024,
+        volume = 0.5,
+    ):
+        """ 
+        Non-blocking audio player. A background thread mixes the queued buffers block by block
+        into one persistent output, so buffers start at sample accurate positions and play()
+        returns immediately.
+
+        Parameters
+        ----------
+            sink: sink class instance
+                PyAudioSink, NullSink or FileSink. An audio device if None
+            fs: int
+                sampling rate, Hz
+            blocksize: int
+                samples written per block
+            volume: float
+                output gain, range [0.0, 1.0]
+
+        """
+        if sink is None:
+            sink = PyAudioSink(fs)
+        self.sink = sink
+        self.fs = fs
+        self.blocksize = blocksize
+        self.volume = volume
+
+        #Samples mixed so far and written to the sink so far
+        self.position = 0
+        self.written = 0
+        #Scheduled (start sample, samples) not yet fully written
+        self.queue = []
+        self.closed = False
+
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def play(self, samples, delay=0.0):
+        """ 
+        Queue a buffer and return immediately.
+
+        Parameters
+        ----------
+            samples: np.array
+                float samples in the range [-1, 1]
+            delay: float
+                seconds after the current output position to start
+
+        Returns
+        -------
+            start: int
+                sample position the buffer starts at
+        """
+        return self.play_sequence([samples], [delay])[0]
+
+    def play_sequence(self, buffers, onsets):
+        """ 
+        Queue several buffers at sample accurate offsets from one another and return immediately.
+
+        Parameters
+        ----------
+            buffers: list
+                float sample arrays
+            onsets: list
+                onset of each buffer in seconds after the current output position
+
+        Returns
+        -------
+            starts: list
+                sample position of each buffer
+        """
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Player is closed")
+            base = self.position
+            starts = []
+            for samples, onset in zip(buffers, onsets):
+                start = base + int(round(onset*self.fs))
+                self.queue.append((start, np.asarray(samples, dtype=np.float32)))
+                starts.append(start)
+            self.condition.notify_all()
+        return starts
+
+    @property
+    def busy(self):
+        """ 
+        Whether queued audio remains to be written.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            busy: bool
+                True while audio is queued
+        """
+        with self.condition:
+            return len(self.queue) > 0 or self.written != self.position
+
+    def wait(self, timeout=None):
+        """ 
+        Block until the queued audio has been written.
+
+        Parameters
+        ----------
+            timeout: float
+                maximum seconds to wait
+
+        Returns
+        -------
+            done: bool
+                True if all the queued audio was written
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: len(self.queue) == 0 and self.written == self.position, timeout)
+
+    def stop(self):
+        """ 
+        Drop all queued audio.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        with self.condition:
+            self.queue = []
+            self.condition.notify_all()
+        return
+
+    def close(self):
+        """ 
+        Finish the queued audio, stop the background thread and close the sink.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.sink.close()
+        return
+
+    def next_block(self):
+        """ 
+        Mix the queued buffers overlapping the next block and drop the finished ones.
+        Called by the background thread with the condition held.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            block: np.array
+                float32 block of samples
+        """
+        start = self.position
+        end = start + self.blocksize
+        block = np.zeros(self.blocksize, dtype=np.float32)
+        remaining = []
+        for item in self.queue:
+            item_start, samples = item
+            item_end = item_start + len(samples)
+            lo = max(start, item_start)
+            hi = min(end, item_end)
+            if hi > lo:
+                block[lo-start:hi-start] += samples[lo-item_start:hi-item_start]
+            if item_end > end:
+                remaining.append(item)
+        self.queue = remaining
+        self.position = end
+        return np.clip(self.volume*block, -1, 1)
+
+    def run(self):
+        """ 
+        Background thread writing blocks while audio is queued.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.queue) > 0 or self.closed)
+                if len(self.queue) == 0 and self.closed:
+                    return
+                block = self.next_block()
+                position = self.position
+            #Write outside the lock so play() never waits on the device
+            self.sink.write(block)
+            with self.condition:
+                self.written = position
+                self.condition.notify_all()
+
+_default_player = None
+
+def get_player():
+    """ 
+    Shared player on the audio device, opened on first use.
+
+    Parameters
+    ----------
+
+    Returns
+    -------
+        player: Player class instance
+            shared player
+    """
+    global _default_player
+    if _default_player is None or _default_player.closed:
+        _default_player = Player()
+    return _default_player
+
+def set_player(player):
+    """ 
+    Replace the shared player, e.g. with a Player on a NullSink or FileSink when there is no audio device.
+
+    Parameters
+    ----------
+        player: Player class instance
+            new shared player
+
+    Returns
+    -------
+
+    """
+    global _default_player
+    _default_player = player
+    return
@@ -10,6 +10,9 @@ import matplotlib as mpl
 import matplotlib.pyplot as plt
 import contextily as ctx
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
 
 from bellpedia.world import World
 
@@ -46,6 +49,8 @@ class Geoplots:
         self.cmap = plt.get_cmap('hsv')
         self.minbells = 1
         self.maxbells = 16
+
+        self.basemaps = {}
         
     def set_filepath(self, fileprefix):
         """ 
@@ -405,4 +410,441 @@ class Geoplots:
         ax.set_ylabel("Number of bells")
         plt.savefig(f"{self.filepath}BellsDated.{self.imformat}", format=self.imformat, dpi=self.config.dpi)
         plt.show()
-        return
\ No newline at end of file
+        return
+
+    def get_basemap(self, region):
+        """ 
+        Get the basemap tiles for a region. Tiles are fetched once per region and reused.
+        
+        Parameters
+        ----------
+            region: str
+                region for lat long limits on plots, see restrict_plot
+
+        Returns
+        -------
+            basemap: dict
+                "img" tile image, "extent" image extent, "xlim" and "ylim" projected plot limits
+        """
+        xlim, ylim, zoom = self.restrict_plot(region)
+        key = (tuple(xlim), tuple(ylim), zoom)
+        if key not in self.basemaps:
+            x1,y1 = latlong_to_proj(self.config.crs_OUT, xlim[0],ylim[0])
+            x2,y2 = latlong_to_proj(self.config.crs_OUT, xlim[1],ylim[1])
+            img, extent = ctx.bounds2img(x1, y1, x2, y2, zoom=zoom, source=self.source)
+            self.basemaps[key] = {
+                "img" : img,
+                "extent" : extent,
+                "xlim" : [x1,x2],
+                "ylim" : [y1,y2],
+            }
+        return self.basemaps[key]
+
+    def histogram_specs(self, towers, bells):
+        """ 
+        Shared histogram bins and labels for the batch plots, computed once over the whole world.
+        
+        Parameters
+        ----------
+            towers: pd.dataframe
+                world.towercolumns of the whole world
+            bells: pd.dataframe
+                world.bellcolumns of the whole world
+
+        Returns
+        -------
+            specs: dict
+                plot name to bins, data column and axis labels
+        """
+        def nanmax(values):
+            values = np.asarray(values, dtype=float)
+            if np.all(np.isnan(values)):
+                return 1
+            return int(np.nanmax(values))+1
+
+        Max_tenor = nanmax(towers["cwt"].values)
+        Max_cwt = nanmax(bells["cwt"].values)
+        Max_diam = nanmax(bells["diameter"].values)
+        return {
+            "TowerNBells" : {
+                "source" : "towers", "column" : "nbells",
+                "bins" : np.arange(self.minbells, self.maxbells+1.5, 1)-0.5,
+                "xlim" : [0-0.5, self.maxbells+0.5], "log" : False,
+                "xlabel" : "Number of bells", "ylabel" : "Number of towers",
+            },
+            "TowerWeight" : {
+                "source" : "towers", "column" : "cwt",
+                "bins" : np.arange(0, Max_tenor+1, 1),
+                "xlim" : [0, Max_tenor], "log" : False,
+                "xlabel" : "Tenor weight (cwt)", "ylabel" : "Number of towers",
+            },
+            "BellsFreq" : {
+                "source" : "bells", "column" : "nominal",
+                "bins" : np.logspace(np.log10(100), np.log10(10000), 100),
+                "xlim" : [100, 10000], "log" : True,
+                "xlabel" : "Frequency of bell (Hz)", "ylabel" : "Number of bells",
+            },
+            "BellsWeight" : {
+                "source" : "bells", "column" : "cwt",
+                "bins" : np.arange(0, Max_cwt+0.25, 0.25),
+                "xlim" : [0, Max_cwt], "log" : False,
+                "xlabel" : "Bell weight (cwt)", "ylabel" : "Number of bells",
+            },
+            "BellsDiameter" : {
+                "source" : "bells", "column" : "diameter",
+                "bins" : np.linspace(0, Max_diam, 100),
+                "xlim" : [0, Max_diam], "log" : False,
+                "xlabel" : "Diameter of bell (cm)", "ylabel" : "Number of bells",
+            },
+            "BellsDated" : {
+                "source" : "bells", "column" : "dated",
+                "bins" : np.arange(1500, 2100, 10),
+                "xlim" : [1500, 2100], "log" : False,
+                "xlabel" : "Year of bell founding", "ylabel" : "Number of bells",
+            },
+        }
+
+    def make_group_plots(
+            self,
+            world,
+            groupby="country",
+            groups=None,
+            fileprefix="",
+            region=None,
+            small_multiples=False,
+            ncols=4,
+            workers=None,
+            plot_Locations=True,
+            plot_NBells=True,
+            plot_TenorWeight=True,
+            plot_Freq=True,
+            plot_Weight=True,
+            plot_Diameter=True,
+            plot_Dated=True,
+            ):
+        """ 
+        Make the plots for every group of towers in one pass, e.g. per country or county.
+        The world is partitioned once, the histograms of all groups are binned together with
+        shared bins and the basemap tiles are fetched once per region and shared with the workers.
+        
+        Parameters
+        ----------
+            world: class instance of the world
+                class instance of the world containing Towers and their Bells.
+            groupby: str
+                Tower field to partition by, e.g. "country" or "county"
+            groups: list
+                Subset of group values to plot. All groups if None
+            fileprefix: str
+                prefix for filenames for plots
+            region: str
+                region for lat long limits on the location plots. If None the group name is used for 
+                "country" and self.region otherwise
+            small_multiples: bool
+                Draw a single grid figure per plot type with one panel per group instead of one figure per group
+            ncols: int
+                Number of columns of the small multiples grid
+            workers: int
+                Number of worker processes. Renders in process if 1
+            plot_Locations: bool
+                Scatter plot of bell tower locations
+            plot_NBells: bool
+                Histogram of the number of bells per tower 
+            plot_TenorWeight: bool
+                Histogram of tenor weight 
+            plot_Freq: bool
+                Histogram of nominal bell frequencies
+            plot_Weight: bool
+                Histogram of bell weights
+            plot_Diameter: bool
+                Histogram of bell diameters 
+            plot_Dated: bool
+                Histogram of the dates of bell foundings
+
+        Returns
+        -------
+            filenames: list
+                Saved figure files
+        """
+        self.set_filepath(fileprefix)
+
+        towers = world.towercolumns
+        bells = world.bellcolumns
+
+        keys = towers[groupby].fillna("").astype(str).values
+        names, codes = np.unique(keys, return_inverse=True)
+        if groups is not None:
+            keep = np.isin(names, [str(g) for g in groups])
+        else:
+            keep = names != ""
+        bell_codes = codes[bells["tower"].values.astype(int)]
+        Ngroups = len(names)
+
+        wanted = {
+            "TowerNBells" : plot_NBells,
+            "TowerWeight" : plot_TenorWeight,
+            "BellsFreq" : plot_Freq,
+            "BellsWeight" : plot_Weight,
+            "BellsDiameter" : plot_Diameter,
+            "BellsDated" : plot_Dated,
+        }
+        specs = {k : v for k, v in self.histogram_specs(towers, bells).items() if wanted[k]}
+        for spec in specs.values():
+            if spec["source"] == "towers":
+                values, group_codes = towers[spec["column"]].values, codes
+            else:
+                values, group_codes = bells[spec["column"]].values, bell_codes
+            spec["hist"] = grouped_histogram(values, group_codes, Ngroups, spec["bins"])
+
+        colours = self.cmap(np.linspace(0.12, 1, self.maxbells))
+        nbells = np.clip(towers["nbells"].values.astype(int), self.minbells, self.maxbells)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(Ngroups+1))
+
+        def group_region(name):
+            if region is not None:
+                return region
+            if groupby == "country":
+                return name
+            return self.region
+
+        basemaps = {}
+        locations = {}
+        if plot_Locations:
+            for gi in np.flatnonzero(keep):
+                key = group_region(names[gi])
+                if key not in basemaps:
+                    basemaps[key] = self.get_basemap(key)
+                idx = order[bounds[gi]:bounds[gi+1]]
+                locations[gi] = {
+                    "x" : towers["x"].values[idx],
+                    "y" : towers["y"].values[idx],
+                    "c" : colours[nbells[idx]-1],
+                    "basemap" : key,
+                }
+
+        jobs = []
+        if small_multiples:
+            panels = np.flatnonzero(keep)
+            if plot_Locations:
+                jobs.append({
+                    "kind" : "locations_grid",
+                    "titles" : [names[gi] for gi in panels],
+                    "panels" : [locations[gi] for gi in panels],
+                    "ncols" : ncols,
+                    "filename" : f"{self.filepath}{groupby}_TowerLocations.{self.imformat}",
+                })
+            for plotname, spec in specs.items():
+                jobs.append({
+                    "kind" : "histogram_grid",
+                    "titles" : [names[gi] for gi in panels],
+                    "hists" : spec["hist"][panels],
+                    "spec" : {k : v for k, v in spec.items() if k != "hist"},
+                    "ncols" : ncols,
+                    "filename" : f"{self.filepath}{groupby}_{plotname}.{self.imformat}",
+                })
+        else:
+            for gi in np.flatnonzero(keep):
+                label = safe_filename(names[gi])
+                if plot_Locations:
+                    jobs.append({
+                        "kind" : "locations",
+                        "panel" : locations[gi],
+                        "colours" : colours,
+                        "minbells" : self.minbells,
+                        "maxbells" : self.maxbells,
+                        "filename" : f"{self.filepath}{label}_TowerLocations.{self.imformat}",
+                    })
+                for plotname, spec in specs.items():
+                    jobs.append({
+                        "kind" : "histogram",
+                        "hist" : spec["hist"][gi],
+                        "spec" : {k : v for k, v in spec.items() if k != "hist"},
+                        "filename" : f"{self.filepath}{label}_{plotname}.{self.imformat}",
+                    })
+        for job in jobs:
+            job["format"] = self.imformat
+            job["dpi"] = self.config.dpi
+
+        if workers is None:
+            workers = os.cpu_count()
+        if workers == 1 or len(jobs) <= 1:
+            init_render_worker(basemaps)
+            return [render_job(job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker, initargs=(basemaps,)) as pool:
+            return list(pool.map(render_job, jobs, chunksize=max(1, len(jobs)//(4*workers))))
+
+####################################################################################################
+                 ############################ Batch rendering ############################ 
+####################################################################################################
+
+_shared_basemaps = {}
+
+def init_render_worker(basemaps):
+    """ 
+    Store the basemap tiles shared by all jobs of a render worker.
+    
+    Parameters
+    ----------
+        basemaps: dict
+            region name to basemap from Geoplots.get_basemap
+
+    Returns
+    -------
+
+    """
+    global _shared_basemaps
+    _shared_basemaps = basemaps
+    return
+
+def safe_filename(name):
+    """ 
+    Turn a group name into a string safe for filenames.
+    
+    Parameters
+    ----------
+        name: str
+            group name
+
+    Returns
+    -------
+        name: str
+            filename safe group name
+
+    """
+    return re.sub("[^A-Za-z0-9]+", "_", str(name)).strip("_")
+
+def grouped_histogram(values, codes, ngroups, bins):
+    """ 
+    Histogram values for every group at once.
+    
+    Parameters
+    ----------
+        values: np.array
+            values to bin
+        codes: np.array
+            integer group code of each value
+        ngroups: int
+            number of groups
+        bins: np.array
+            shared bin edges
+
+    Returns
+    -------
+        hist: np.array
+            (ngroups, len(bins)-1) counts
+    """
+    values = np.asarray(values, dtype=float)
+    Nbins = len(bins)-1
+    idx = np.searchsorted(bins, values, side="right")-1
+    #Right edge of the last bin is closed as in np.histogram
+    idx[values == bins[-1]] = Nbins-1
+    ok = np.isfinite(values) & (idx >= 0) & (idx < Nbins)
+    flat = np.bincount(codes[ok]*Nbins + idx[ok], minlength=ngroups*Nbins)
+    return flat.reshape(ngroups, Nbins)
+
+def draw_locations(ax, panel):
+    """ 
+    Draw tower locations over the shared basemap on an axis.
+    
+    Parameters
+    ----------
+        ax: matplotlib axis
+            axis to draw on
+        panel: dict
+            "x", "y", "c" tower positions and colours and the "basemap" key
+
+    Returns
+    -------
+
+    """
+    basemap = _shared_basemaps[panel["basemap"]]
+    ax.axis('off')
+    ax.imshow(basemap["img"], extent=basemap["extent"], interpolation="bilinear")
+    ax.scatter(
+        x=panel["x"], y=panel["y"], color=panel["c"],
+        alpha=.4, marker="X", edgecolors='black',
+    )
+    ax.set_xlim(basemap["xlim"])
+    ax.set_ylim(basemap["ylim"])
+    return
+
+def draw_histogram(ax, hist, spec):
+    """ 
+    Draw a pre-binned histogram on an axis.
+    
+    Parameters
+    ----------
+        ax: matplotlib axis
+            axis to draw on
+        hist: np.array
+            counts per bin
+        spec: dict
+            bins and labels from Geoplots.histogram_specs
+
+    Returns
+    -------
+
+    """
+    bins = spec["bins"]
+    if spec["log"]:
+        ax.bar(bins[:-1], hist, width=bins[1:]-bins[:-1], align="edge")
+        ax.set_xscale("log")
+    else:
+        xs = (bins[1:]+bins[:-1])/2
+        ax.bar(xs, hist, width=bins[1]-bins[0], align="center")
+    ax.set_xlim(spec["xlim"])
+    ax.set_xlabel(spec["xlabel"])
+    ax.set_ylabel(spec["ylabel"])
+    return
+
+def render_job(job):
+    """ 
+    Render and save a single batch figure. Uses the object oriented Figure so it is safe in worker processes.
+    
+    Parameters
+    ----------
+        job: dict
+            figure description from Geoplots.make_group_plots
+
+    Returns
+    -------
+        filename: str
+            saved figure file
+    """
+    kind = job["kind"]
+    if kind == "locations":
+        fig = Figure(figsize=(8.27, 11.69))
+        ax = fig.subplots(1,1)
+        draw_locations(ax, job["panel"])
+        for c in range(job["minbells"], job["maxbells"]+1):
+            ax.scatter(
+                x=-np.inf, y=-np.inf, color=job["colours"][c-1],
+                label=f"{c} bells", 
+                marker="X",edgecolors='black',
+            )
+        ax.legend()
+    elif kind == "histogram":
+        fig = Figure(figsize=set_size())
+        ax = fig.subplots(1,1)
+        draw_histogram(ax, job["hist"], job["spec"])
+    else:
+        Npanels = max(1, len(job["titles"]))
+        ncols = min(job["ncols"], Npanels)
+        nrows = int(np.ceil(Npanels/ncols))
+        width, height = set_size()
+        if kind == "locations_grid":
+            height = width*11.69/8.27
+        fig = Figure(figsize=(width*ncols/2, height*nrows/2))
+        axes = np.atleast_1d(fig.subplots(nrows, ncols, squeeze=False)).ravel()
+        for pi, title in enumerate(job["titles"]):
+            if kind == "locations_grid":
+                draw_locations(axes[pi], job["panels"][pi])
+            else:
+                draw_histogram(axes[pi], job["hists"][pi], job["spec"])
+            axes[pi].set_title(title.replace("&", r"\&") if mpl.rcParams["text.usetex"] else title)
+        for ax in axes[len(job["titles"]):]:
+            ax.axis('off')
+        fig.tight_layout()
+    fig.savefig(job["filename"], format=job["format"], dpi=job["dpi"])
+    return job["filename"]
@@ -0,0 +1,158 @@
+import re
+import numpy as np
+import pandas as pd
+
+#Area letters, district, sector digit and unit letters of a full UK postcode without spaces
+full_pattern = r"^([A-Z]{1,2})(\d[A-Z\d]?)(\d)([A-Z]{2})$"
+#Area, optional district and optional sector and unit of a postcode prefix
+prefix_pattern = re.compile(r"^([A-Z]{1,2})(\d[A-Z\d]?)?(?:\s+(\d)([A-Z]{2})?)?$")
+
+def split_postcodes(postcodes):
+    """ 
+    Split a whole column of postcodes into their parts in one vectorized pass.
+    Case and spacing are ignored, e.g. "dh13el", "DH1 3EL" and " dh1  3el" are all DH1 3EL.
+
+    Parameters
+    ----------
+        postcodes: np.array
+            postcodes
+
+    Returns
+    -------
+        parts: pd.dataframe
+            "area", "district", "sector" and "unit" of each postcode, missing where not a full postcode
+    """
+    compact = pd.Series(postcodes, dtype="string").str.upper().str.replace(r"\s+", "", regex=True)
+    parts = compact.str.extract(full_pattern)
+    parts.columns = ["area", "district", "sector", "unit"]
+    return parts
+
+def normalise_postcodes(postcodes):
+    """ 
+    Normalise a whole column of postcodes to the "DH1 3EL" form.
+
+    Parameters
+    ----------
+        postcodes: np.array
+            postcodes
+
+    Returns
+    -------
+        postcodes: np.array
+            normalised postcodes, stripped and upper case where not a full postcode, None where missing
+    """
+    parts = split_postcodes(postcodes)
+    normal = parts["area"] + parts["district"] + " " + parts["sector"] + parts["unit"]
+    fallback = pd.Series(postcodes, dtype="string").str.strip().str.upper()
+    out = normal.fillna(fallback).astype(object).values
+    return np.where(pd.isna(out), None, out)
+
+def postcode_keys(parts):
+    """ 
+    Sortable keys of postcode parts. Parts are separated so a prefix such as DH1 does not match DH10.
+
+    Parameters
+    ----------
+        parts: pd.dataframe
+            output of split_postcodes
+
+    Returns
+    -------
+        keys: pd.series
+            "AREA|DISTRICT|SECTOR|UNIT" keys, missing where not a full postcode
+    """
+    return parts["area"] + "|" + parts["district"] + "|" + parts["sector"] + "|" + parts["unit"]
+
+def prefix_key(prefix):
+    """ 
+    Key prefix of a postcode area ("DH"), district ("DH1"), sector ("DH1 3") or full postcode ("DH1 3EL").
+
+    Parameters
+    ----------
+        prefix: str
+            postcode prefix
+
+    Returns
+    -------
+        key: str
+            key prefix, None if not a postcode prefix
+    """
+    prefix = " ".join(str(prefix).upper().split())
+    full = re.match(full_pattern, prefix.replace(" ", ""))
+    if full is not None:
+        return "|".join(full.groups())
+    match = prefix_pattern.match(prefix)
+    if match is None:
+        return None
+    key = ""
+    for part in match.groups():
+        if part is None:
+            break
+        key += part + "|"
+    return key
+
+class PostcodeIndex:
+    def __init__(
+        self,
+        postcodes,
+    ):
+        """ 
+        Sorted index of postcodes by area, district, sector and unit for prefix lookups.
+        Missing or malformed postcodes are not indexed.
+
+        Parameters
+        ----------
+            postcodes: np.array
+                postcode of each row
+
+        """
+        keys = postcode_keys(split_postcodes(postcodes))
+        rows = np.flatnonzero(keys.notna().values)
+        keys = keys.values[rows].astype(str)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.rows = rows[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix(self, prefix):
+        """ 
+        Rows with postcodes in an area, district, sector or unit, in O(log n + k).
+
+        Parameters
+        ----------
+            prefix: str
+                postcode prefix, e.g. "DH", "DH1", "DH1 3" or "DH1 3EL"
+
+        Returns
+        -------
+            rows: np.array
+                matching rows in postcode order
+        """
+        key = prefix_key(prefix)
+        if key is None:
+            return np.array([], dtype=int)
+        start = int(np.searchsorted(self.keys, key, side="left"))
+        end = int(np.searchsorted(self.keys, key + "\uffff", side="right"))
+        return self.rows[start:end]
+
+    def prefix_batch(self, prefixes):
+        """ 
+        Rows of each of a list of postcode prefixes.
+
+        Parameters
+        ----------
+            prefixes: list
+                postcode prefixes
+
+        Returns
+        -------
+            matches: pd.dataframe
+                "prefix" and matching "row"
+        """
+        found = [self.prefix(p) for p in prefixes]
+        return pd.DataFrame({
+            "prefix" : np.repeat(np.array(prefixes, dtype=object), [len(f) for f in found]),
+            "row" : np.concatenate(found) if len(found) > 0 else np.array([], dtype=int),
+        })
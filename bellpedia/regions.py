@@ -0,0 +1,343 @@
+import numpy as np
+import pandas as pd
+
+#Rings larger than this are counted in the last bin of the ring size distribution
+max_ring_size = 16
+
+class RegionTree:
+    def __init__(
+        self,
+        regions,
+    ):
+        """ 
+        Tree of regions, council areas, counties, countries and dioceses from the Dove regions.csv ParentID links.
+
+        Parameters
+        ----------
+            regions: pd.dataframe
+                Dove regions data with ID, Name, Abbreviation, Type, Category and ParentID columns
+
+        """
+        regions = regions.copy()
+        regions["ParentID"] = pd.to_numeric(regions["ParentID"], errors="coerce")
+        self.regions = regions.set_index("ID")
+        self.parent = {
+            int(i) : (int(p) if np.isfinite(p) else None)
+            for i, p in zip(self.regions.index, self.regions["ParentID"])
+        }
+
+        self.ancestors = {}
+        for node in self.parent:
+            chain = [node]
+            while self.parent.get(chain[-1]) is not None and self.parent[chain[-1]] not in chain:
+                chain.append(self.parent[chain[-1]])
+            self.ancestors[node] = tuple(chain)
+        self.regions["depth"] = [len(self.ancestors[int(i)])-1 for i in self.regions.index]
+
+        #Name lookup per category. Repeated names resolve to the deepest, non RC node
+        self.names = {}
+        ordered = self.regions.assign(
+            RC = self.regions["Abbreviation"].fillna("").str.contains("(RC)", regex=False)
+        ).sort_values(["RC", "depth"], ascending=[True, False])
+        for node, name, category in zip(ordered.index, ordered["Name"], ordered["Category"]):
+            key = (str(category).lower(), str(name).lower())
+            if key not in self.names:
+                self.names[key] = int(node)
+
+    def find(self, name, category="geographical"):
+        """ 
+        Region id of a name.
+
+        Parameters
+        ----------
+            name: str
+                region name
+            category: str
+                Choices include "geographical", "ecclesiastical", "historical" and "association"
+
+        Returns
+        -------
+            id: int
+                region id, None if not found
+        """
+        if name is None or (isinstance(name, float) and np.isnan(name)):
+            return None
+        return self.names.get((category.lower(), str(name).lower()))
+
+    def name(self, node):
+        """ 
+        Name of a region id.
+
+        Parameters
+        ----------
+            node: int
+                region id
+
+        Returns
+        -------
+            name: str
+                region name
+        """
+        return self.regions.at[node, "Name"]
+
+    def node(self, which):
+        """ 
+        Region id from an id or a name in any category.
+
+        Parameters
+        ----------
+            which: int or str
+                region id or name
+
+        Returns
+        -------
+            id: int
+                region id, None if not found
+        """
+        if isinstance(which, (int, np.integer)):
+            return int(which) if int(which) in self.parent else None
+        for category in ["geographical", "ecclesiastical", "historical", "association"]:
+            node = self.find(which, category)
+            if node is not None:
+                return node
+        return None
+
+class RegionIndex:
+    def __init__(
+        self,
+        tree,
+        towers = [],
+    ):
+        """ 
+        Index of towers by every ancestor region with precomputed rollups per region:
+        tower count, bell count, total metal weight and ring size distribution.
+
+        Parameters
+        ----------
+            tree: RegionTree class instance
+                region tree
+            towers: list
+                tower class instances to index
+
+        """
+        self.tree = tree
+        self.tower_nodes = {}
+        self.members = {}
+        self.rollups = {}
+        self.build(towers)
+
+    def tower_leaves(self, tower):
+        """ 
+        Most specific geographical and ecclesiastical regions of a tower.
+
+        Parameters
+        ----------
+            tower: Tower class instance
+                tower to place
+
+        Returns
+        -------
+            nodes: tuple
+                region ids of the tower and all their ancestors
+        """
+        nodes = []
+        for name in [getattr(tower, "region", None), tower.county, tower.country]:
+            node = self.tree.find(name, "geographical")
+            if node is not None:
+                nodes.extend(self.tree.ancestors[node])
+                break
+        node = self.tree.find(tower.diocese, "ecclesiastical")
+        if node is not None:
+            nodes.extend(self.tree.ancestors[node])
+        return tuple(dict.fromkeys(nodes))
+
+    @staticmethod
+    def tower_stats(tower):
+        """ 
+        Contribution of a tower to the rollups.
+
+        Parameters
+        ----------
+            tower: Tower class instance
+                tower
+
+        Returns
+        -------
+            stats: tuple
+                (bells, metal weight in cwt, ring size)
+        """
+        cwt = np.array([b.cwt for b in tower.bells], dtype=float)
+        return len(tower.bells), float(np.nansum(cwt)), min(tower.Nbells, max_ring_size)
+
+    def build(self, towers):
+        """ 
+        Index all the towers and compute every rollup in one grouped pass.
+
+        Parameters
+        ----------
+            towers: list
+                tower class instances
+
+        Returns
+        -------
+
+        """
+        dat = {"node" : [], "dove_id" : [], "bells" : [], "cwt" : [], "size" : []}
+        for t in towers:
+            nodes = self.tower_leaves(t)
+            self.tower_nodes[t.dove_id] = nodes
+            bells, cwt, size = self.tower_stats(t)
+            for node in nodes:
+                dat["node"].append(node)
+                dat["dove_id"].append(t.dove_id)
+                dat["bells"].append(bells)
+                dat["cwt"].append(cwt)
+                dat["size"].append(size)
+        df = pd.DataFrame(dat)
+
+        self.members = {int(node) : set(ids) for node, ids in df.groupby("node")["dove_id"]}
+        sums = df.groupby("node")[["bells", "cwt"]].sum()
+        counts = df.groupby("node").size()
+        sizes = pd.crosstab(df["node"], df["size"]).reindex(columns=range(max_ring_size+1), fill_value=0)
+        self.rollups = {
+            int(node) : {
+                "towers" : int(counts[node]),
+                "bells" : int(sums.at[node, "bells"]),
+                "cwt" : float(sums.at[node, "cwt"]),
+                "rings" : sizes.loc[node].values.astype(int),
+            }
+            for node in counts.index
+        }
+        return
+
+    def update(self, tower, sign):
+        """ 
+        Add (sign=1) or remove (sign=-1) a tower from the rollups of its regions.
+
+        Parameters
+        ----------
+            tower: Tower class instance
+                tower
+            sign: int
+                1 to add, -1 to remove
+
+        Returns
+        -------
+
+        """
+        if sign > 0:
+            nodes = self.tower_leaves(tower)
+            self.tower_nodes[tower.dove_id] = nodes
+        else:
+            nodes = self.tower_nodes.pop(tower.dove_id, ())
+        bells, cwt, size = self.tower_stats(tower)
+        for node in nodes:
+            if node not in self.rollups:
+                self.rollups[node] = {"towers" : 0, "bells" : 0, "cwt" : 0.0, "rings" : np.zeros(max_ring_size+1, dtype=int)}
+                self.members[node] = set()
+            rollup = self.rollups[node]
+            rollup["towers"] += sign
+            rollup["bells"] += sign*bells
+            rollup["cwt"] += sign*cwt
+            rollup["rings"][size] += sign
+            if sign > 0:
+                self.members[node].add(tower.dove_id)
+            else:
+                self.members[node].discard(tower.dove_id)
+        return
+
+    def add_tower(self, tower):
+        """ 
+        Index a new tower, updating the rollups of its regions only.
+
+        Parameters
+        ----------
+            tower: Tower class instance
+                tower
+
+        Returns
+        -------
+
+        """
+        if tower.dove_id in self.tower_nodes:
+            return
+        self.update(tower, 1)
+        return
+
+    def remove_tower(self, tower):
+        """ 
+        Remove a tower, updating the rollups of its regions only.
+
+        Parameters
+        ----------
+            tower: Tower class instance
+                tower
+
+        Returns
+        -------
+
+        """
+        if tower.dove_id not in self.tower_nodes:
+            return
+        self.update(tower, -1)
+        return
+
+    def stats(self, which):
+        """ 
+        Rollup of a region.
+
+        Parameters
+        ----------
+            which: int or str
+                region id or name
+
+        Returns
+        -------
+            stats: dict
+                "name", "towers", "bells", "cwt" total metal weight and "rings", the number of
+                towers with 0 to 16 bells
+        """
+        node = self.tree.node(which)
+        empty = {"towers" : 0, "bells" : 0, "cwt" : 0.0, "rings" : np.zeros(max_ring_size+1, dtype=int)}
+        rollup = self.rollups.get(node, empty)
+        return {"name" : None if node is None else self.tree.name(node), **rollup}
+
+    def tower_ids(self, which):
+        """ 
+        dove_ids of the towers in a region and all its sub regions.
+
+        Parameters
+        ----------
+            which: int or str
+                region id or name
+
+        Returns
+        -------
+            dove_ids: set
+                tower dove_ids
+        """
+        return self.members.get(self.tree.node(which), set())
+
+    @property
+    def summary(self):
+        """ 
+        Rollups of every region.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            summary: pd.dataframe
+                rollups indexed by region id with name, type and parent
+        """
+        ids = list(self.rollups.keys())
+        df = pd.DataFrame({
+            "name" : [self.tree.name(i) for i in ids],
+            "type" : [self.tree.regions.at[i, "Type"] for i in ids],
+            "parent" : [self.tree.parent[i] for i in ids],
+            "towers" : [self.rollups[i]["towers"] for i in ids],
+            "bells" : [self.rollups[i]["bells"] for i in ids],
+            "cwt" : [self.rollups[i]["cwt"] for i in ids],
+        }, index=pd.Index(ids, name="id"))
+        return df.sort_values("towers", ascending=False)
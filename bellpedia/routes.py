@@ -0,0 +1,636 @@
+import re
+import numpy as np
+import pandas as pd
+from bellpedia.gridref import haversine
+from bellpedia.functions import convert_distance
+from bellpedia.flags import day_bits, practice_masks
+
+def distance_matrix(lat, long, detour=1.3):
+    """ 
+    All pairs road distance estimate between points, computed in one broadcast.
+
+    Parameters
+    ----------
+        lat: np.array
+            latitudes
+        long: np.array
+            longitudes
+        detour: float
+            ratio of road to great circle distance
+
+    Returns
+    -------
+        D: np.array
+            (N, N) distances in km
+    """
+    lat = np.asarray(lat, dtype=float)
+    long = np.asarray(long, dtype=float)
+    return detour*haversine(lat[:,None], long[:,None], lat[None,:], long[None,:])
+
+def to_minutes(time):
+    """ 
+    Minutes after midnight of a "HH:MM" time.
+
+    Parameters
+    ----------
+        time: str or float
+            time, or minutes after midnight
+
+    Returns
+    -------
+        minutes: float
+            minutes after midnight
+    """
+    if isinstance(time, str):
+        hours, minutes = time.split(":")
+        return 60*int(hours) + int(minutes)
+    return float(time)
+
+def to_clock(minutes):
+    """ 
+    "HH:MM" times of minutes after midnight.
+
+    Parameters
+    ----------
+        minutes: np.array
+            minutes after midnight
+
+    Returns
+    -------
+        times: list
+            "HH:MM" times, None where missing
+    """
+    return [
+        None if not np.isfinite(m) else f"{int(m//60) % 24:02d}:{int(m % 60):02d}"
+        for m in np.asarray(minutes, dtype=float)
+    ]
+
+def practice_windows(practices, day, default_time="19:30", length=120, masks=None):
+    """ 
+    Time windows of a list of towers from their practice information on a weekday,
+    e.g. "Tue 19:30", "Sat (alt) 13:30" or "Wed (alt)". Practice days are the weekday masks of bellpedia.flags.
+
+    Parameters
+    ----------
+        practices: list
+            Tower.practice of each tower
+        day: str
+            weekday, e.g. "Tue"
+        default_time: str
+            start of practices without a time
+        length: float
+            length of a practice in minutes
+        masks: np.array
+            weekday bits of each tower, e.g. Tower.practice_days, parsed from practices if None
+
+    Returns
+    -------
+        windows: np.array
+            (N, 2) opening and closing minutes after midnight, nan for towers without a practice on the day
+    """
+    day = day[:3].title()
+    if masks is None:
+        masks = practice_masks(practices)
+    on_day = (np.asarray(masks, dtype=int) & day_bits(day)) != 0
+    windows = np.full((len(practices), 2), np.nan)
+    for i in np.flatnonzero(on_day):
+        practice = practices[i]
+        #The time follows the day, possibly after a bracketed note
+        time = re.search(rf"\b{day}\w*(?:\s*\([^)]*\))?\s+(\d{{1,2}}):(\d{{2}})", practice)
+        start = to_minutes(default_time) if time is None else 60*int(time.group(1)) + int(time.group(2))
+        windows[i] = [start, start + length]
+    return windows
+
+class RoutePlanner:
+    def __init__(
+        self,
+        lat,
+        long,
+        start = None,
+        return_to_start = True,
+        windows = None,
+        start_time = "09:00",
+        visit = 30,
+        speed = 30,
+        detour = 1.3,
+        lateness = 1000,
+    ):
+        """ 
+        Visiting order of a list of points from a start point. A nearest neighbour construction is
+        improved by 2-opt and Or-opt moves, each scored for all positions at once.
+        Node 0 is the start and node N+1 the end of the route, the start again or a free end.
+
+        Parameters
+        ----------
+            lat: np.array
+                latitudes of the points to visit
+            long: np.array
+                longitudes of the points to visit
+            start: tuple
+                (lat, long) of the start, the first point if None
+            return_to_start: bool
+                finish the route back at the start
+            windows: np.array
+                (N, 2) opening and closing minutes after midnight of each point, nan where unconstrained
+            start_time: str
+                departure time from the start
+            visit: float
+                minutes spent at each point
+            speed: float
+                average travelling speed in km/h
+            detour: float
+                ratio of road to great circle distance
+            lateness: float
+                penalty per minute of arriving after a window closes, in km
+        """
+        lat = np.asarray(lat, dtype=float)
+        long = np.asarray(long, dtype=float)
+        self.fixed_start = start is not None
+        if start is None and len(lat) == 0:
+            raise ValueError("No points to route and no start given")
+        if start is None:
+            start = (lat[0], long[0])
+        self.lat = np.concatenate([[start[0]], lat])
+        self.long = np.concatenate([[start[1]], long])
+        self.N = len(lat)
+
+        D = distance_matrix(self.lat, self.long, detour)
+        end = D[:,0] if return_to_start else np.zeros(self.N+1)
+        self.D = np.zeros((self.N+2, self.N+2))
+        self.D[:self.N+1,:self.N+1] = D
+        self.D[:self.N+1,-1] = end
+        self.D[-1,:self.N+1] = end
+        self.return_to_start = return_to_start
+
+        self.windows = None
+        if windows is not None:
+            self.windows = np.full((self.N+2, 2), np.nan)
+            self.windows[1:self.N+1] = windows
+        self.start_time = to_minutes(start_time)
+        self.visit = visit
+        self.speed = speed
+        self.lateness = lateness
+
+    def schedule(self, tour):
+        """ 
+        Arrival and departure times along a route, waiting for windows to open.
+
+        Parameters
+        ----------
+            tour: np.array
+                nodes from 0 to N+1
+
+        Returns
+        -------
+            arrive: np.array
+                arrival minutes after midnight
+            depart: np.array
+                departure minutes after midnight
+            late: np.array
+                minutes arrived after the window closed
+        """
+        legs = self.D[tour[:-1], tour[1:]]/self.speed*60
+        arrive = np.zeros(len(tour))
+        depart = np.zeros(len(tour))
+        late = np.zeros(len(tour))
+        depart[0] = self.start_time
+        arrive[0] = self.start_time
+        for k in range(1, len(tour)):
+            arrive[k] = depart[k-1] + legs[k-1]
+            begin = arrive[k]
+            if self.windows is not None and np.isfinite(self.windows[tour[k],0]):
+                begin = max(begin, self.windows[tour[k],0])
+                late[k] = max(0.0, begin - self.windows[tour[k],1])
+            depart[k] = begin + (self.visit if 0 < tour[k] <= self.N else 0)
+        return arrive, depart, late
+
+    def cost(self, tour):
+        """ 
+        Length of a route plus the lateness penalty.
+
+        Parameters
+        ----------
+            tour: np.array
+                nodes from 0 to N+1
+
+        Returns
+        -------
+            cost: float
+                route cost in km
+        """
+        length = self.D[tour[:-1], tour[1:]].sum()
+        if self.windows is None:
+            return length
+        arrive, depart, late = self.schedule(tour)
+        #Finishing earlier breaks ties between routes of equal length
+        return length + self.lateness*late.sum() + (depart[-1] - self.start_time)*self.speed/60*1e-3
+
+    def construct(self):
+        """ 
+        Nearest neighbour route, or earliest start when there are time windows.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            tour: np.array
+                nodes from 0 to N+1
+        """
+        tour = [0]
+        todo = np.ones(self.N+2, dtype=bool)
+        todo[[0, self.N+1]] = False
+        if not self.fixed_start:
+            #The start sits on the first point
+            tour.append(1)
+            todo[1] = False
+        time = self.start_time
+        while todo.any():
+            here = tour[-1]
+            candidates = np.flatnonzero(todo)
+            if self.windows is None:
+                nxt = candidates[np.argmin(self.D[here, candidates])]
+            else:
+                arrive = time + self.D[here, candidates]/self.speed*60
+                opens = np.nan_to_num(self.windows[candidates,0], nan=-np.inf)
+                closes = np.nan_to_num(self.windows[candidates,1], nan=np.inf)
+                begin = np.maximum(arrive, opens)
+                score = begin + self.lateness*np.maximum(0, begin - closes)
+                #Prefer windowed towers that would otherwise close
+                score = score - 1e-3*np.isfinite(self.windows[candidates,1])
+                nxt = candidates[np.argmin(score)]
+                time = max(time + self.D[here, nxt]/self.speed*60, np.nan_to_num(self.windows[nxt,0], nan=-np.inf)) + self.visit
+            tour.append(nxt)
+            todo[nxt] = False
+        tour.append(self.N+1)
+        return np.array(tour)
+
+    def two_opt_moves(self, tour):
+        """ 
+        Change in length of reversing every section of the route.
+
+        Parameters
+        ----------
+            tour: np.array
+                nodes from 0 to N+1
+
+        Returns
+        -------
+            delta: np.array
+                (M, M) change in length for reversing between edge i and edge j, inf where not allowed
+        """
+        a = tour[:-1]
+        b = tour[1:]
+        delta = self.D[a[:,None], a[None,:]] + self.D[b[:,None], b[None,:]] - self.D[a, b][:,None] - self.D[a, b][None,:]
+        allowed = np.triu(np.ones(delta.shape, dtype=bool), k=1)
+        if not self.fixed_start:
+            allowed[0] = False
+        delta[~allowed] = np.inf
+        return delta
+
+    def or_opt_moves(self, tour, L):
+        """ 
+        Change in length of moving every section of L points to every other edge, either way round.
+
+        Parameters
+        ----------
+            tour: np.array
+                nodes from 0 to N+1
+            L: int
+                section length
+
+        Returns
+        -------
+            delta: np.array
+                (S, M, 2) change in length of moving section s to edge m forwards or reversed
+        """
+        first = 2 if not self.fixed_start else 1
+        starts = np.arange(first, len(tour)-L)
+        if len(starts) == 0:
+            return starts, np.zeros((0, len(tour)-1, 2))
+        s0 = tour[starts]
+        s1 = tour[starts+L-1]
+        before = tour[starts-1]
+        after = tour[starts+L]
+        removed = self.D[before, s0] + self.D[s1, after] - self.D[before, after]
+
+        x = tour[:-1]
+        y = tour[1:]
+        forward = self.D[x[None,:], s0[:,None]] + self.D[s1[:,None], y[None,:]] - self.D[x, y][None,:]
+        backward = self.D[x[None,:], s1[:,None]] + self.D[s0[:,None], y[None,:]] - self.D[x, y][None,:]
+        delta = np.stack([forward, backward], axis=2) - removed[:,None,None]
+
+        #Edges touching the section itself
+        edges = np.arange(len(tour)-1)
+        touching = (edges[None,:] >= starts[:,None]-1) & (edges[None,:] <= starts[:,None]+L-1)
+        if not self.fixed_start:
+            touching[:,0] = True
+        delta[touching] = np.inf
+        return starts, delta
+
+    def improve(self, tour, max_iter=10000, candidates=20):
+        """ 
+        Apply improving 2-opt and Or-opt moves until none is left. Without time windows every improving
+        move that does not touch the same part of the route as a better one is applied together.
+        With time windows the best few moves by length are checked one at a time against the schedule.
+
+        Parameters
+        ----------
+            tour: np.array
+                nodes from 0 to N+1
+            max_iter: int
+                maximum number of rounds of moves
+            candidates: int
+                moves of each kind considered per round with time windows
+
+        Returns
+        -------
+            tour: np.array
+                improved route
+        """
+        cost = self.cost(tour)
+        if self.windows is None:
+            candidates = max(candidates, len(tour))
+        for _ in range(max_iter):
+            moves = []
+            delta = self.two_opt_moves(tour)
+            for f in self.best(delta, candidates):
+                i, j = np.unravel_index(f, delta.shape)
+                moves.append((delta[i, j], ("2opt", i, j)))
+            for L in [1, 2, 3]:
+                starts, delta = self.or_opt_moves(tour, L)
+                for f in self.best(delta, candidates):
+                    k, m, r = np.unravel_index(f, delta.shape)
+                    moves.append((delta[k, m, r], ("oropt", starts[k], L, m, r)))
+            moves = sorted(moves, key=lambda m: m[0])
+
+            if self.windows is None:
+                if len(moves) == 0:
+                    break
+                new = self.apply_batch(tour, moves)
+                new_cost = self.cost(new)
+                if not new_cost < cost - 1e-9:
+                    #Fall back to the single best move
+                    new = self.apply_batch(tour, moves[:1])
+                    new_cost = self.cost(new)
+                tour, cost = new, new_cost
+                continue
+
+            #Moves that are neutral on length can still fix lateness
+            if self.schedule(tour)[2].sum() > 0:
+                moves += self.window_moves(tour)
+            improved = False
+            for _, move in moves:
+                new = self.apply_batch(tour, [(0, move)])
+                new_cost = self.cost(new)
+                if new_cost < cost - 1e-9:
+                    tour, cost = new, new_cost
+                    improved = True
+                    break
+            if not improved:
+                break
+        return tour
+
+    @staticmethod
+    def best(delta, k):
+        """ 
+        Flat indexes of the k most negative entries below zero.
+
+        Parameters
+        ----------
+            delta: np.array
+                changes in length
+            k: int
+                number of entries
+
+        Returns
+        -------
+            flat: np.array
+                flat indexes in delta
+        """
+        flat = delta.ravel()
+        if flat.size == 0:
+            return np.array([], dtype=int)
+        if flat.size > k:
+            idx = np.argpartition(flat, k)[:k]
+        else:
+            idx = np.arange(flat.size)
+        return idx[flat[idx] < -1e-9]
+
+    def apply_batch(self, tour, moves):
+        """ 
+        Apply moves that do not touch the same positions, in order, skipping any that overlap an
+        earlier one. Each move sets a sort key for the positions it changes.
+
+        Parameters
+        ----------
+            tour: np.array
+                nodes from 0 to N+1
+            moves: list
+                (delta, move) of 2-opt moves ("2opt", i, j) reversing between edges i and j and
+                Or-opt moves ("oropt", start, L, edge, reverse)
+
+        Returns
+        -------
+            tour: np.array
+                new route
+        """
+        keys = np.arange(len(tour), dtype=float)
+        touched = np.zeros(len(tour), dtype=bool)
+        for _, move in moves:
+            if move[0] == "2opt":
+                i, j = move[1], move[2]
+                span = np.arange(i, j+2)
+                if touched[span].any():
+                    continue
+                touched[span] = True
+                keys[i+1:j+1] = (i+1+j) - keys[i+1:j+1]
+            else:
+                start, L, edge, reverse = move[1:]
+                span = np.concatenate([np.arange(start-1, start+L+1), [edge, edge+1]])
+                if touched[span].any():
+                    continue
+                touched[span] = True
+                offsets = (np.arange(L)+1)/(L+1)
+                keys[start:start+L] = edge + (offsets[::-1] if reverse else offsets)
+        return tour[np.argsort(keys, kind="stable")]
+
+    def window_moves(self, tour):
+        """ 
+        Single point moves of late points to every earlier position.
+
+        Parameters
+        ----------
+            tour: np.array
+                nodes from 0 to N+1
+
+        Returns
+        -------
+            moves: list
+                candidate Or-opt moves
+        """
+        late = self.schedule(tour)[2]
+        moves = []
+        first = 2 if not self.fixed_start else 1
+        for k in range(first, len(tour)-1):
+            if late[k] > 0:
+                for edge in range(first-1, k-1):
+                    moves.append((0.0, ("oropt", k, 1, edge, False)))
+        return moves
+
+    def solve(self, max_iter=10000):
+        """ 
+        Near optimal visiting order.
+
+        Parameters
+        ----------
+            max_iter: int
+                maximum number of improving moves
+
+        Returns
+        -------
+            order: np.array
+                positions of the points in visiting order
+        """
+        tour = self.improve(self.construct(), max_iter)
+        return tour[1:-1] - 1
+
+    def itinerary(self, order, ids=None, names=None, distance_unit="miles"):
+        """ 
+        Stops, legs and times of a visiting order.
+
+        Parameters
+        ----------
+            order: np.array
+                positions of the points in visiting order
+            ids: list
+                id of each point
+            names: list
+                name of each point
+            distance_unit: str
+                unit of the leg distances
+
+        Returns
+        -------
+            itinerary: pd.dataframe
+                "stop", "position", "dove_id", "name", "leg" and "total" distance, "arrive",
+                "depart" and "late" minutes
+        """
+        tour = np.concatenate([[0], np.asarray(order, dtype=int) + 1, [self.N+1]])
+        arrive, depart, late = self.schedule(tour)
+        factor = 1000.0/convert_distance(distance_unit)
+        legs = self.D[tour[:-1], tour[1:]]*factor
+        df = pd.DataFrame({
+            "stop" : np.arange(1, len(order)+1),
+            "position" : np.asarray(order, dtype=int),
+            "dove_id" : None if ids is None else np.asarray(ids, dtype=object)[order],
+            "name" : None if names is None else np.asarray(names, dtype=object)[order],
+            "leg" : legs[:-1],
+            "arrive" : to_clock(arrive[1:-1]),
+            "depart" : to_clock(depart[1:-1]),
+            "late" : late[1:-1],
+        })
+        df["total"] = df["leg"].cumsum()
+        df.attrs["return_leg"] = legs[-1] if self.return_to_start else 0.0
+        df.attrs["length"] = df["total"].iloc[-1] + df.attrs["return_leg"] if len(df) > 0 else 0.0
+        return df
+
+def plan_feasible(lat, long, start, return_to_start=True, windows=None, limit=None, **kwargs):
+    """ 
+    Route over the points that can be reached within their time windows. Late points are dropped
+    and the rest re-routed until every stop is on time.
+
+    Parameters
+    ----------
+        lat: np.array
+            latitudes of the points to visit
+        long: np.array
+            longitudes of the points to visit
+        start: tuple
+            (lat, long) of the start, the first point if None
+        return_to_start: bool
+            finish the route back at the start
+        windows: np.array
+            (N, 2) opening and closing minutes after midnight of each point
+        limit: int
+            maximum number of stops, all if None
+        **kwargs:
+            RoutePlanner settings
+
+    Returns
+    -------
+        positions: np.array
+            positions of the points on the route
+        order: np.array
+            visiting order of the positions
+        planner: RoutePlanner class instance
+            planner of the route
+    """
+    lat = np.asarray(lat, dtype=float)
+    long = np.asarray(long, dtype=float)
+    keep = np.arange(len(lat))
+    while len(keep) > 0:
+        planner = RoutePlanner(
+            lat[keep], long[keep], start, return_to_start,
+            windows = None if windows is None else windows[keep], **kwargs
+        )
+        order = planner.solve()
+        late = planner.schedule(np.concatenate([[0], order+1, [planner.N+1]]))[2][1:-1]
+        on_time = order[late <= 0]
+        if limit is not None:
+            on_time = on_time[:limit]
+        if len(on_time) == len(keep):
+            return keep, order, planner
+        keep = keep[np.sort(on_time)]
+    return keep, np.array([], dtype=int), None
+
+def plan_days(lat, long, start, per_day, return_to_start=True, windows=None, **kwargs):
+    """ 
+    Split a list of points into days of at most per_day points. Without time windows a single route
+    over all points is cut into consecutive days and each day is re-optimised from the start.
+    With time windows each day takes the points that can be reached on time from those left.
+
+    Parameters
+    ----------
+        lat: np.array
+            latitudes of the points to visit
+        long: np.array
+            longitudes of the points to visit
+        start: tuple
+            (lat, long) of the start of each day
+        per_day: int
+            points per day
+        return_to_start: bool
+            finish each day back at the start
+        windows: np.array
+            (N, 2) opening and closing minutes after midnight of each point
+        **kwargs:
+            RoutePlanner settings
+
+    Returns
+    -------
+        days: list
+            (positions, order, RoutePlanner) of each day, where order is the visiting order of the positions
+    """
+    lat = np.asarray(lat, dtype=float)
+    long = np.asarray(long, dtype=float)
+    days = []
+    if len(lat) == 0:
+        return days
+    if windows is None:
+        order = RoutePlanner(lat, long, start, True, **kwargs).solve()
+        for k in range(0, len(order), per_day):
+            chunk = order[k:k+per_day]
+            planner = RoutePlanner(lat[chunk], long[chunk], start, return_to_start, **kwargs)
+            days.append((chunk, planner.solve(), planner))
+        return days
+
+    left = np.arange(len(lat))
+    while len(left) > 0:
+        keep, order, planner = plan_feasible(lat[left], long[left], start, return_to_start, windows[left], per_day, **kwargs)
+        if len(keep) == 0:
+            print(f"{len(left)} points cannot be reached within their time windows")
+            break
+        days.append((left[keep], order, planner))
+        left = np.delete(left, keep)
+    return days
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+#Relative importance of each group of features
+default_weights = {
+    "weight" : 1.0,
+    "nominal" : 1.0,
+    "diameter" : 0.5,
+    "tenor" : 1.0,
+    "nbells" : 1.0,
+}
+
+def ring_profiles(world, K=8):
+    """ 
+    Fixed length profiles of every ring. The bells of each ring are sorted treble to tenor by
+    weight and resampled onto K points, all rings at once.
+
+    Parameters
+    ----------
+        world: class instance of the world
+            class instance of the world containing Towers and their Bells.
+        K: int
+            points per profile
+
+    Returns
+    -------
+        profiles: dict
+            "weight" cwt relative to the tenor, "nominal" octaves above the tenor nominal and
+            "diameter" relative to the tenor, each (NTowers, K), and per tower "tenor_cwt",
+            "tenor_nominal" and "nbells"
+    """
+    bells = world.bellcolumns
+    Ntowers = world.NTowers
+    tower = bells["tower"].values.astype(int)
+    cwt = bells["cwt"].values.astype(float)
+    order = np.lexsort((np.nan_to_num(cwt, nan=-1), tower))
+    tower = tower[order]
+    cwt = cwt[order]
+    nominal = bells["nominal"].values.astype(float)[order]
+    nominal = np.where(nominal > 0, nominal, np.nan)
+    diameter = bells["diameter"].values.astype(float)[order]
+
+    counts = np.bincount(tower, minlength=Ntowers)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    ends = starts + counts - 1
+    has = counts > 0
+
+    def tenor_value(values):
+        out = np.full(Ntowers, np.nan)
+        out[has] = values[ends[has]]
+        return out
+
+    tenor_cwt = tenor_value(cwt)
+    tenor_nominal = tenor_value(nominal)
+    tenor_diameter = tenor_value(diameter)
+
+    #Fractional position of each grid point within each ring
+    grid = np.linspace(0, 1, K)
+    pos = grid[None,:]*np.maximum(counts-1, 0)[:,None]
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo+1, np.maximum(counts-1, 0)[:,None])
+    frac = pos - lo
+    lo = np.clip(starts[:,None] + lo, 0, max(len(tower)-1, 0))
+    hi = np.clip(starts[:,None] + hi, 0, max(len(tower)-1, 0))
+
+    def resample(values):
+        if len(values) == 0:
+            return np.full((Ntowers, K), np.nan)
+        out = values[lo]*(1-frac) + values[hi]*frac
+        out[~has] = np.nan
+        return out
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "weight" : resample(cwt)/tenor_cwt[:,None],
+            "nominal" : np.log2(resample(nominal)/tenor_nominal[:,None]),
+            "diameter" : resample(diameter)/tenor_diameter[:,None],
+            "tenor_cwt" : tenor_cwt,
+            "tenor_nominal" : tenor_nominal,
+            "nbells" : np.array([t.Nbells for t in world.towers], dtype=float),
+        }
+
+class RingIndex:
+    def __init__(
+        self,
+        world,
+        K = 8,
+        weights = default_weights,
+    ):
+        """ 
+        Nearest neighbour index of rings by their weight, nominal and diameter profiles,
+        tenor weight and nominal and number of bells.
+
+        Parameters
+        ----------
+            world: class instance of the world
+                class instance of the world containing Towers and their Bells.
+            K: int
+                points per profile
+            weights: dict
+                relative importance of the "weight", "nominal", "diameter", "tenor" and "nbells" features
+
+        """
+        self.world = world
+        self.K = K
+        self.weights = weights
+        self.dove_ids = np.array([t.dove_id for t in world.towers])
+        self.position = pd.Series(np.arange(len(self.dove_ids)), index=self.dove_ids)
+        self.position = self.position[~self.position.index.duplicated()]
+
+        self.features = self.encode(ring_profiles(world, K))
+        self.tree = cKDTree(self.features)
+
+    def encode(self, profiles):
+        """ 
+        Standardised and weighted feature vectors. Missing values sit at the mean.
+
+        Parameters
+        ----------
+            profiles: dict
+                output of ring_profiles
+
+        Returns
+        -------
+            features: np.array
+                (NTowers, 3K+3) feature vectors
+        """
+        groups = [
+            (profiles["weight"], self.weights["weight"]),
+            (profiles["nominal"], self.weights["nominal"]),
+            (profiles["diameter"], self.weights["diameter"]),
+            (np.log(profiles["tenor_cwt"])[:,None], self.weights["tenor"]),
+            (np.log2(profiles["tenor_nominal"])[:,None], self.weights["tenor"]),
+            (profiles["nbells"][:,None], self.weights["nbells"]),
+        ]
+        columns = []
+        for values, weight in groups:
+            values = np.where(np.isfinite(values), values, np.nan)
+            mean = np.nanmean(values, axis=0) if np.isfinite(values).any() else 0
+            std = np.nanstd(values, axis=0) if np.isfinite(values).any() else 1
+            std = np.where(np.isfinite(std) & (std > 0), std, 1)
+            z = np.nan_to_num((values - mean)/std)
+            #Each profile counts as much as one scalar feature
+            columns.append(weight*z/np.sqrt(values.shape[1]))
+        return np.hstack(columns)
+
+    def query_batch(self, which, k=10):
+        """ 
+        Most similar rings to each of a list of towers.
+
+        Parameters
+        ----------
+            which: list
+                dove_ids or towers to match
+            k: int
+                number of similar rings per tower
+
+        Returns
+        -------
+            matches: pd.dataframe
+                "query" dove_id, "rank", matching "dove_id", its "position" in world.towers and "distance"
+        """
+        ids = np.array([w.dove_id if hasattr(w, "dove_id") else int(w) for w in which])
+        rows = self.position.reindex(ids).values
+        found = ~pd.isna(rows)
+        ids = ids[found]
+        rows = rows[found].astype(int)
+        if len(rows) == 0:
+            return pd.DataFrame({"query" : [], "rank" : [], "dove_id" : [], "position" : [], "distance" : []})
+
+        #One extra neighbour as each tower matches itself
+        kk = min(k+1, len(self.dove_ids))
+        dist, idx = self.tree.query(self.features[rows], k=kk)
+        dist = dist.reshape(len(rows), kk)
+        idx = idx.reshape(len(rows), kk)
+
+        not_self = idx != rows[:,None]
+        #Keep the first k that are not the query itself
+        keep = not_self & (np.cumsum(not_self, axis=1) <= k)
+        q = np.repeat(ids, kk).reshape(len(rows), kk)
+        rank = np.cumsum(not_self, axis=1)
+        return pd.DataFrame({
+            "query" : q[keep],
+            "rank" : rank[keep],
+            "dove_id" : self.dove_ids[idx[keep]],
+            "position" : idx[keep],
+            "distance" : dist[keep],
+        })
@@ -0,0 +1,514 @@
+import os
+import hashlib
+import pickle
+import shutil
+import subprocess
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bellpedia.load import Generate_Config
+from bellpedia.synth import PARTIALS
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+####################################################################################################
+                 ############################ Decoding ############################
+####################################################################################################
+
+def decode(filename, fs=44100):
+    """ 
+    Decode a recording into mono samples. wav files are read directly, other formats with
+    soundfile if installed, falling back to a local ffmpeg for formats its libsndfile cannot read.
+
+    Parameters
+    ----------
+        filename: str
+            audio file, e.g. .mp3 or .wav
+        fs: int
+            sampling rate used when decoding with ffmpeg, Hz
+
+    Returns
+    -------
+        samples: np.array
+            float32 mono samples
+        fs: int
+            sampling rate, Hz
+    """
+    filename = str(filename)
+    if filename.lower().endswith(".wav"):
+        with wave.open(filename, "rb") as wav:
+            fs = wav.getframerate()
+            width = wav.getsampwidth()
+            Nchannels = wav.getnchannels()
+            raw = wav.readframes(wav.getnframes())
+        dtype = {1 : np.uint8, 2 : "<i2", 4 : "<i4"}[width]
+        samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+        if width == 1:
+            samples = samples - 128
+        samples /= float(2**(8*width-1))
+        return samples.reshape(-1, Nchannels).mean(axis=1), fs
+
+    error = None
+    if soundfile is not None:
+        try:
+            samples, fs = soundfile.read(filename, dtype="float32", always_2d=True)
+            return samples.mean(axis=1), fs
+        except Exception as e:
+            #Older libsndfile builds cannot read mp3
+            error = e
+
+    if shutil.which("ffmpeg") is None:
+        if error is not None:
+            raise RuntimeError(f"soundfile could not decode {filename} ({error}) and ffmpeg is not installed")
+        raise RuntimeError(f"soundfile or ffmpeg is required to decode {filename}")
+    out = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", filename, "-f", "f32le", "-ac", "1", "-ar", str(fs), "-"],
+        check=True, capture_output=True,
+    )
+    return np.frombuffer(out.stdout, dtype="<f4").copy(), fs
+
+####################################################################################################
+                 ############################ Analysis ############################
+####################################################################################################
+
+def spectrum(samples, fs, start=0.05, length=1.0):
+    """ 
+    Magnitude spectrum of a window shortly after the strike.
+
+    Parameters
+    ----------
+        samples: np.array
+            mono samples
+        fs: int
+            sampling rate, Hz
+        start: float
+            seconds after the strike the window starts, skips the strike transient
+        length: float
+            window length in seconds
+
+    Returns
+    -------
+        freqs: np.array
+            frequencies, Hz
+        mags: np.array
+            magnitudes
+    """
+    strike = int(np.argmax(np.abs(samples)))
+    lo = min(strike + int(start*fs), max(len(samples)-1, 0))
+    window = samples[lo:lo+int(length*fs)]
+    Nfft = 1 << int(np.ceil(np.log2(max(len(window), 2)*4)))
+    mags = np.abs(np.fft.rfft(window*np.hanning(len(window)), Nfft))
+    freqs = np.fft.rfftfreq(Nfft, 1/fs)
+    return freqs, mags
+
+def find_peaks(freqs, mags, Npeaks=30, fmin=50, fmax=8000):
+    """ 
+    Strongest local maxima of a spectrum, refined by parabolic interpolation.
+
+    Parameters
+    ----------
+        freqs: np.array
+            frequencies, Hz
+        mags: np.array
+            magnitudes
+        Npeaks: int
+            maximum number of peaks
+        fmin: float
+            lowest frequency considered, Hz
+        fmax: float
+            highest frequency considered, Hz
+
+    Returns
+    -------
+        peak_freqs: np.array
+            peak frequencies, Hz, strongest first
+        peak_mags: np.array
+            peak magnitudes
+    """
+    inner = (mags[1:-1] > mags[:-2]) & (mags[1:-1] >= mags[2:])
+    idx = np.flatnonzero(inner) + 1
+    idx = idx[(freqs[idx] >= fmin) & (freqs[idx] <= fmax)]
+    idx = idx[np.argsort(-mags[idx])][:Npeaks]
+
+    a = np.log(mags[idx-1] + 1e-12)
+    b = np.log(mags[idx] + 1e-12)
+    c = np.log(mags[idx+1] + 1e-12)
+    denom = a - 2*b + c
+    shift = np.where(denom != 0, 0.5*(a - c)/np.where(denom != 0, denom, 1), 0)
+    df = freqs[1] - freqs[0]
+    return freqs[idx] + shift*df, mags[idx]
+
+def nominal_scores(candidates, peak_freqs, peak_mags, tolerance=0.03):
+    """ 
+    Score candidate nominals by how well the peaks match the partials of a bell with that nominal.
+
+    Parameters
+    ----------
+        candidates: np.array
+            candidate nominal frequencies, Hz
+        peak_freqs: np.array
+            peak frequencies, Hz
+        peak_mags: np.array
+            peak magnitudes
+        tolerance: float
+            relative frequency tolerance of a match
+
+    Returns
+    -------
+        scores: np.array
+            score of each candidate
+    """
+    ratios = np.array([p[0] for p in PARTIALS.values()])
+    weights = peak_mags/np.max(peak_mags)
+    expected = candidates[:,None,None]*ratios[None,:,None]
+    close = np.abs(peak_freqs[None,None,:]/expected - 1) < tolerance
+    return (close*weights[None,None,:]).max(axis=2).sum(axis=1)
+
+def decay_times(samples, fs, partial_freqs, frame=0.1, duration=2.0):
+    """ 
+    Track the amplitude of each partial over short time frames and fit its exponential decay.
+
+    Parameters
+    ----------
+        samples: np.array
+            mono samples
+        fs: int
+            sampling rate, Hz
+        partial_freqs: np.array
+            partial frequencies to track, Hz
+        frame: float
+            frame length in seconds
+        duration: float
+            seconds after the strike to track
+
+    Returns
+    -------
+        taus: np.array
+            decay time of each partial in seconds, nan if it could not be fitted
+    """
+    strike = int(np.argmax(np.abs(samples)))
+    Nframe = int(frame*fs)
+    segment = samples[strike:strike+int(duration*fs)]
+    Nframes = len(segment)//Nframe
+    taus = np.full(len(partial_freqs), np.nan)
+    if Nframes < 3:
+        return taus
+    frames = segment[:Nframes*Nframe].reshape(Nframes, Nframe)*np.hanning(Nframe)[None,:]
+    spec = np.abs(np.fft.rfft(frames, axis=1))
+    freqs = np.fft.rfftfreq(Nframe, 1/fs)
+    t = (np.arange(Nframes)+0.5)*frame
+    for i, f in enumerate(partial_freqs):
+        if not np.isfinite(f):
+            continue
+        k = int(np.argmin(np.abs(freqs - f)))
+        amp = spec[:, max(k-1,0):k+2].max(axis=1)
+        ok = amp > 1e-9
+        if ok.sum() < 3:
+            continue
+        slope = np.polyfit(t[ok], np.log(amp[ok]), 1)[0]
+        if slope < 0:
+            taus[i] = -1/slope
+    return taus
+
+def analyse(samples, fs, expected_nominal=None):
+    """ 
+    Estimate the nominal, hum, prime, tierce, quint and strike note of a bell recording.
+
+    Parameters
+    ----------
+        samples: np.array
+            mono samples
+        fs: int
+            sampling rate, Hz
+        expected_nominal: float
+            Dove nominal, Hz. Used to pick the nominal peak when given
+
+    Returns
+    -------
+        result: dict
+            partial name to frequency (Hz) and decay time (s), and the strike note (Hz)
+    """
+    freqs, mags = spectrum(samples, fs)
+    peak_freqs, peak_mags = find_peaks(freqs, mags)
+    result = {"duration" : len(samples)/fs}
+    if len(peak_freqs) == 0:
+        return result
+
+    if expected_nominal is not None and np.isfinite(expected_nominal):
+        near = np.abs(np.log2(peak_freqs/expected_nominal)) < 1/12
+        candidates = peak_freqs[near] if near.any() else np.array([expected_nominal])
+    else:
+        candidates = peak_freqs
+    nominal = candidates[np.argmax(nominal_scores(candidates, peak_freqs, peak_mags))]
+
+    names = list(PARTIALS.keys())
+    ratios = np.array([PARTIALS[p][0] for p in names])
+    partial_freqs = np.full(len(names), np.nan)
+    for i, r in enumerate(ratios):
+        rel = np.abs(peak_freqs/(nominal*r) - 1)
+        j = int(np.argmin(rel))
+        if rel[j] < 0.06:
+            partial_freqs[i] = peak_freqs[j]
+    partial_freqs[names.index("nominal")] = nominal
+    taus = decay_times(samples, fs, partial_freqs)
+
+    for name, f, tau in zip(names, partial_freqs, taus):
+        result[name] = f
+        result[f"{name}_decay"] = tau
+    #Strike note is the virtual pitch of the nominal, superquint and octave nominal, about nominal/2
+    strike = np.array([nominal/2, result["superquint"]/3, result["octave"]/4])
+    result["strike"] = float(np.nanmean(strike))
+    return result
+
+def analyse_file(filename, expected_nominal=None):
+    """ 
+    Decode and analyse one recording.
+
+    Parameters
+    ----------
+        filename: str
+            audio file
+        expected_nominal: float
+            Dove nominal, Hz
+
+    Returns
+    -------
+        result: dict
+            see analyse
+    """
+    samples, fs = decode(filename)
+    return analyse(samples, fs, expected_nominal)
+
+def try_analyse_file(filename):
+    """ 
+    Analyse one recording, returning the error rather than raising so a batch carries on.
+
+    Parameters
+    ----------
+        filename: str
+            audio file
+
+    Returns
+    -------
+        result: dict
+            see analyse, or the "error" if the recording could not be decoded or analysed
+    """
+    try:
+        return analyse_file(filename)
+    except Exception as e:
+        return {"error" : f"{type(e).__name__}: {e}"}
+
+def file_hash(filename):
+    """ 
+    Content hash of a file.
+
+    Parameters
+    ----------
+        filename: str
+            file
+
+    Returns
+    -------
+        hash: str
+            sha1 hex digest
+    """
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cents(f1, f2):
+    """ 
+    Interval from f2 to f1 in cents.
+
+    Parameters
+    ----------
+        f1: np.array
+            frequencies, Hz
+        f2: np.array
+            reference frequencies, Hz
+
+    Returns
+    -------
+        cents: np.array
+            1200*log2(f1/f2)
+    """
+    return 1200*np.log2(np.asarray(f1, dtype=float)/np.asarray(f2, dtype=float))
+
+####################################################################################################
+                 ############################ Sound library ############################
+####################################################################################################
+
+class SoundLibrary:
+    def __init__(
+        self,
+        config = Generate_Config(),
+        sound_dir = None,
+        cache_file = "Bellpedia_Sounds.plk",
+    ):
+        """ 
+        Batch spectral analysis of the bell recordings laid out as <sound_dir>/<tower>/<bell number>.<ext>,
+        where the tower folder is its Dove id, or its place if no other tower shares the place.
+        Results are cached by file content hash so only new or changed files are analysed.
+
+        Parameters
+        ----------
+            config: class of configuration settings
+                Class of configuration settings used across the module.
+            sound_dir: str
+                folder of recordings, data/sounds if None
+            cache_file: str
+                filename of the analysis cache in the world data folder
+
+        """
+        self.config = config
+        if sound_dir is None:
+            sound_dir = f"{self.config.working_dir}/{self.config.data_dir}/sounds"
+        self.sound_dir = sound_dir
+        self.cache_path = f"{self.config.working_dir}/{self.config.data_dir}/world/{cache_file}"
+        self.cache = self.load_cache()
+
+    def load_cache(self):
+        """ 
+        Load the analysis cache.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            cache: dict
+                file hash to analysis result
+        """
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, "rb") as f:
+                return pickle.load(f)
+        return {}
+
+    def save_cache(self):
+        """ 
+        Save the analysis cache.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, "wb") as f:
+            pickle.dump(self.cache, f, pickle.HIGHEST_PROTOCOL)
+        return
+
+    @property
+    def files(self):
+        """ 
+        Recordings in the library.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            files: pd.dataframe
+                "file", tower folder "place" and bell number "N" of each recording
+        """
+        dat = {"file" : [], "place" : [], "N" : []}
+        for path in sorted(Path(self.sound_dir).glob("*/*")):
+            if path.suffix.lower() not in [".mp3", ".wav", ".flac", ".ogg"]:
+                continue
+            dat["file"].append(str(path))
+            dat["place"].append(path.parent.name)
+            dat["N"].append(int(path.stem) if path.stem.isdigit() else path.stem)
+        return pd.DataFrame(dat)
+
+    def analyse_all(self, world=None, workers=None):
+        """ 
+        Analyse every recording not already in the cache, in parallel. Recordings that fail are reported
+        in the "error" column and retried on the next run.
+
+        Parameters
+        ----------
+            world: class instance of the world
+                used to look up the Dove nominal of each recorded bell
+            workers: int
+                number of worker processes. Analyses in process if 1
+
+        Returns
+        -------
+            results: pd.dataframe
+                analysis of every recording, with the Dove nominal and the difference in cents if world is given
+        """
+        files = self.files
+        files["hash"] = [file_hash(f) for f in files["file"]]
+        files["dove_nominal"] = [self.dove_nominal(world, p, N) for p, N in zip(files["place"], files["N"])]
+
+        #Recordings are analysed blind so the cached result only depends on the file contents
+        new = files[~files["hash"].isin(list(self.cache.keys()))].drop_duplicates("hash")
+        if len(new) > 0:
+            if workers == 1 or len(new) == 1:
+                results = list(map(try_analyse_file, new["file"]))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(try_analyse_file, new["file"]))
+            failed = {}
+            for f, h, result in zip(new["file"], new["hash"], results):
+                if "error" in result:
+                    print(f"Could not analyse {f}: {result['error']}")
+                    failed[h] = result
+                else:
+                    self.cache[h] = result
+            self.save_cache()
+        else:
+            failed = {}
+
+        results = pd.DataFrame([self.cache.get(h, failed.get(h, {})) for h in files["hash"]], index=files.index)
+        if "error" not in results:
+            results["error"] = None
+        if "nominal" not in results:
+            results["nominal"] = np.nan
+        df = pd.concat([files, results], axis=1)
+        df["nominal_cents"] = cents(df["nominal"], df["dove_nominal"])
+        return df
+
+    def dove_nominal(self, world, place, N):
+        """ 
+        Dove nominal of a recorded bell.
+
+        Parameters
+        ----------
+            world: class instance of the world
+                world to search, None for no lookup
+            place: str
+                tower folder, its Dove id or place
+            N: int
+                bell number
+
+        Returns
+        -------
+            nominal: float
+                Dove nominal, Hz, nan if not found or the place is shared by several towers
+        """
+        if world is None:
+            return np.nan
+        if str(place).isdigit():
+            towers = world.search("dove_id", int(place)).towers
+        else:
+            towers = world.search("place", place).towers
+            if len(towers) > 1:
+                print(f"{len(towers)} towers in {place}, name the recordings folder by Dove id")
+                return np.nan
+        for tower in towers:
+            for bell in tower.bells:
+                if bell.N == N and bell.nominal is not None:
+                    return float(bell.nominal)
+        return np.nan
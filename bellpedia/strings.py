@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+#Repetitive string attributes of towers and bells
+tower_fields = ["country", "county", "region", "diocese"]
+bell_fields = ["note", "caster", "founder", "collection_type", "listed"]
+
+class StringTable:
+    def __init__(
+        self,
+    ):
+        """ 
+        Dictionary encoding of repetitive strings. Each field has a vocabulary of its distinct values,
+        every object shares the single copy of each value and values are encoded as small integer codes.
+
+        Parameters
+        ----------
+
+        """
+        self.codes = {}
+        self.values = {}
+        #Lower cased vocabularies, extended as the vocabularies grow
+        self.lower_codes = {}
+        self.lower_values = {}
+        self.lower_dtypes = {}
+
+    def intern(self, field, value):
+        """ 
+        Shared copy of a value, added to the vocabulary of the field when first seen.
+
+        Parameters
+        ----------
+            field: str
+                field name, e.g. "country"
+            value: str
+                value
+
+        Returns
+        -------
+            value: str
+                shared copy of the value, the value itself if missing or not a string
+        """
+        if not isinstance(value, str):
+            return value
+        codes = self.codes.setdefault(field, {})
+        if value not in codes:
+            codes[value] = len(codes)
+            self.values.setdefault(field, []).append(value)
+            return value
+        return self.values[field][codes[value]]
+
+    def intern_object(self, obj, fields):
+        """ 
+        Replace string attributes of a tower or bell by their shared copies.
+
+        Parameters
+        ----------
+            obj: Tower or Bell class instance
+                object to intern
+            fields: list
+                attribute names
+
+        Returns
+        -------
+            obj: Tower or Bell class instance
+                the same object
+        """
+        for field in fields:
+            setattr(obj, field, self.intern(field, getattr(obj, field, None)))
+        return obj
+
+    def intern_towers(self, towers):
+        """ 
+        Intern the towers and bells of a world, e.g. one loaded from a pickle.
+
+        Parameters
+        ----------
+            towers: list
+                tower class instances
+
+        Returns
+        -------
+
+        """
+        for t in towers:
+            self.intern_object(t, tower_fields)
+            for b in t.bells:
+                self.intern_object(b, bell_fields)
+        return
+
+    def vocabulary(self, field):
+        """ 
+        Distinct values of a field in order of first appearance.
+
+        Parameters
+        ----------
+            field: str
+                field name
+
+        Returns
+        -------
+            values: list
+                vocabulary of the field
+        """
+        return self.values.get(field, [])
+
+    def categorical(self, field, values):
+        """ 
+        Values of a field as a pandas Categorical over the shared vocabulary.
+
+        Parameters
+        ----------
+            field: str
+                field name
+            values: np.array
+                values, interned first so every value is in the vocabulary
+
+        Returns
+        -------
+            categorical: pd.Categorical
+                integer coded values
+        """
+        codes = self.intern_codes(field, values)
+        return pd.Categorical.from_codes(codes, categories=self.vocabulary(field))
+
+    def intern_codes(self, field, values):
+        """ 
+        Integer codes of values of a field, adding new values to the vocabulary in the same pass.
+
+        Parameters
+        ----------
+            field: str
+                field name
+            values: list
+                values
+
+        Returns
+        -------
+            codes: np.array
+                codes, -1 where missing or not a string
+        """
+        codes = self.codes.setdefault(field, {})
+        vocabulary = self.values.setdefault(field, [])
+        out = np.empty(len(values), dtype=np.int32)
+        for i, v in enumerate(values):
+            if not isinstance(v, str):
+                out[i] = -1
+                continue
+            code = codes.get(v)
+            if code is None:
+                code = codes[v] = len(vocabulary)
+                vocabulary.append(v)
+            out[i] = code
+        return out
+
+    def lower_categorical(self, field, values):
+        """ 
+        Values of a field as a lower cased Categorical. The lower cased vocabulary is kept between calls
+        and only extended for values not seen before, so small worlds cost a dictionary lookup per value.
+
+        Parameters
+        ----------
+            field: str
+                field name
+            values: list
+                values
+
+        Returns
+        -------
+            categorical: pd.Categorical
+                lower cased values
+        """
+        codes = self.intern_codes(field, values)
+        vocabulary = self.values[field]
+        mapping = self.lower_codes.get(field)
+        if mapping is None or len(mapping) < len(vocabulary) + 1:
+            lowered = self.lower_values.setdefault(field, {})
+            known = [] if mapping is None else list(mapping[:-1])
+            for v in vocabulary[len(known):]:
+                known.append(lowered.setdefault(v.lower(), len(lowered)))
+            #Last entry maps missing values, code -1
+            mapping = np.array(known + [-1], dtype=np.int32)
+            self.lower_codes[field] = mapping
+            self.lower_dtypes[field] = pd.CategoricalDtype(list(lowered))
+        return pd.Categorical.from_codes(mapping[codes], dtype=self.lower_dtypes[field])
+
+    def encode(self, field, values):
+        """ 
+        Integer codes of values of a field.
+
+        Parameters
+        ----------
+            field: str
+                field name
+            values: np.array
+                values
+
+        Returns
+        -------
+            codes: np.array
+                codes, -1 where missing or not in the vocabulary
+        """
+        codes = self.codes.get(field, {})
+        return np.array([codes.get(v, -1) if isinstance(v, str) else -1 for v in values], dtype=np.int32)
+
+#Vocabularies shared by every world
+strings = StringTable()
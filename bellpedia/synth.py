@@ -0,0 +1,326 @@
+import io
+import wave
+
+import numpy as np
+
+#Partials of a true harmonic tuned bell relative to the nominal
+#(ratio to nominal, relative amplitude, decay time at the reference weight in seconds)
+PARTIALS = {
+    "hum"        : (0.25, 0.35, 6.0),
+    "prime"      : (0.50, 0.45, 3.5),
+    "tierce"     : (0.60, 0.55, 2.5),
+    "quint"      : (0.75, 0.20, 2.0),
+    "nominal"    : (1.00, 1.00, 1.8),
+    "superquint" : (1.50, 0.30, 1.0),
+    "octave"     : (2.00, 0.20, 0.7),
+}
+#Weight in cwt at which the decay times above apply
+reference_cwt = 10.0
+
+class BellSynth:
+    def __init__(
+        self,
+        fs = 44100,
+        duration = 2.0,
+        partials = PARTIALS,
+        attack = 0.002,
+        block = 1024,
+        chunk = 64,
+    ):
+        """ 
+        Vectorized bell tone synthesis engine. Tones are the sum of the hum, prime, tierce, quint,
+        nominal and upper partials each with an exponential decay, rendered for many bells at once.
+        Rendered tones are cached per nominal, weight and duration.
+
+        Parameters
+        ----------
+            fs: int
+                sampling rate, Hz
+            duration: float
+                default tone duration in seconds
+            partials: dict
+                partial name to (ratio to nominal, amplitude, decay time)
+            attack: float
+                attack ramp in seconds to avoid clicks at the strike
+            block: int
+                samples per block of the block recurrence used when rendering
+            chunk: int
+                bells rendered together, bounds the memory used when rendering
+
+        """
+        self.fs = fs
+        self.duration = duration
+        self.attack = attack
+        self.block = block
+        self.chunk = chunk
+
+        self.names = list(partials.keys())
+        self.ratios = np.array([partials[p][0] for p in self.names])
+        self.amps = np.array([partials[p][1] for p in self.names])
+        self.taus = np.array([partials[p][2] for p in self.names])
+
+        self.cache = {}
+
+    def partials(self, nominals, cwts=None):
+        """ 
+        Partial frequencies, amplitudes and decay times for an array of bells.
+        Heavier bells ring for longer, decay times scale with the cube root of the weight.
+
+        Parameters
+        ----------
+            nominals: np.array
+                nominal frequencies of the bells, Hz
+            cwts: np.array
+                weights of the bells in cwt. The reference weight is used where missing
+
+        Returns
+        -------
+            freqs: np.array
+                (Nbells, Npartials) partial frequencies
+            amps: np.array
+                (Nbells, Npartials) partial amplitudes
+            taus: np.array
+                (Nbells, Npartials) partial decay times
+        """
+        nominals = np.atleast_1d(np.asarray(nominals, dtype=float))
+        if cwts is None:
+            cwts = np.full(nominals.shape, reference_cwt)
+        cwts = np.atleast_1d(np.asarray(cwts, dtype=float))
+        cwts = np.where(np.isfinite(cwts) & (cwts > 0), cwts, reference_cwt)
+
+        freqs = nominals[:,None]*self.ratios[None,:]
+        amps = np.broadcast_to(self.amps, freqs.shape).copy()
+        #Remove partials above the Nyquist frequency
+        amps[~(freqs < self.fs/2)] = 0
+        taus = self.taus[None,:]*np.cbrt(cwts/reference_cwt)[:,None]
+        return freqs, amps, taus
+
+    def render(self, nominals, cwts=None, duration=None):
+        """ 
+        Render the tones of many bells at once.
+
+        Parameters
+        ----------
+            nominals: np.array
+                nominal frequencies of the bells, Hz. Missing nominals give silence
+            cwts: np.array
+                weights of the bells in cwt
+            duration: float
+                tone duration in seconds
+
+        Returns
+        -------
+            tones: np.array
+                (Nbells, Nsamples) float32 tones with peak amplitude at most 1
+        """
+        if duration is None:
+            duration = self.duration
+        freqs, amps, taus = self.partials(nominals, cwts)
+        amps[~np.isfinite(freqs)] = 0
+        freqs = np.nan_to_num(freqs)
+
+        Nsamples = int(self.fs*duration)
+        Nblocks = int(np.ceil(Nsamples/self.block))
+        #Each partial is Im(amp*z**n), a damped complex exponential. The first block is
+        #computed directly and the following blocks by multiplying with z**(block*k), so
+        #the whole tone is one batched matrix product instead of sin/exp per sample
+        z = -1/(taus*self.fs) + 2j*np.pi*freqs/self.fs
+        tones = np.zeros((freqs.shape[0], Nblocks*self.block), dtype=np.float64)
+        n = np.arange(self.block)
+        k = np.arange(Nblocks)
+        for i in range(0, freqs.shape[0], self.chunk):
+            zi = z[i:i+self.chunk]
+            base = np.exp(zi[:,:,None]*n[None,None,:]).astype(np.complex64)
+            weights = (amps[i:i+self.chunk,None,:]*np.exp(zi[:,None,:]*self.block*k[None,:,None])).astype(np.complex64)
+            tones[i:i+self.chunk] = np.matmul(weights, base).imag.reshape(len(zi), -1)
+        tones = tones[:,:Nsamples]
+
+        Nattack = min(Nsamples, int(self.fs*self.attack))
+        tones[:,:Nattack] *= np.linspace(0, 1, Nattack, endpoint=False)
+        peak = np.max(np.abs(tones), axis=1, keepdims=True)
+        tones /= np.where(peak > 0, peak, 1)
+        return tones.astype(np.float32)
+
+    def render_bells(self, bells, duration=None):
+        """ 
+        Render the tones of a list of bells using the cache.
+
+        Parameters
+        ----------
+            bells: list
+                bell class instances
+            duration: float
+                tone duration in seconds
+
+        Returns
+        -------
+            tones: np.array
+                (Nbells, Nsamples) float32 tones
+        """
+        if duration is None:
+            duration = self.duration
+        keys = [self.key(bell, duration) for bell in bells]
+
+        missing = list(dict.fromkeys(k for k in keys if k not in self.cache))
+        if len(missing) > 0:
+            rendered = self.render(
+                [k[0] for k in missing],
+                [k[1] for k in missing],
+                duration,
+            )
+            for k, tone in zip(missing, rendered):
+                self.cache[k] = tone
+
+        Nsamples = int(self.fs*duration)
+        if len(keys) == 0:
+            return np.zeros((0, Nsamples), dtype=np.float32)
+        return np.stack([self.cache[k] for k in keys])
+
+    def key(self, bell, duration):
+        """ 
+        Cache key of a bell tone.
+
+        Parameters
+        ----------
+            bell: bell class instance
+                bell to be rendered
+            duration: float
+                tone duration in seconds
+
+        Returns
+        -------
+            key: tuple
+                (nominal, cwt, duration) rounded so equal bells share a tone
+        """
+        nominal = np.nan if bell.nominal is None else float(bell.nominal)
+        cwt = float(bell.cwt)
+        return (
+            round(nominal, 2) if np.isfinite(nominal) else np.nan,
+            round(cwt, 2) if np.isfinite(cwt) else np.nan,
+            float(duration),
+        )
+
+    def clear_cache(self):
+        """ 
+        Empty the tone cache.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        self.cache = {}
+        return
+
+    def mix(self, tones, onsets, gains=None, length=None):
+        """ 
+        Mix tones into one buffer with sample accurate onsets.
+
+        Parameters
+        ----------
+            tones: np.array
+                (Nstrikes, Nsamples) tones, one per strike
+            onsets: np.array
+                onset of each strike in seconds
+            gains: np.array
+                gain of each strike
+            length: float
+                buffer length in seconds, long enough for the last tone if None
+
+        Returns
+        -------
+            buffer: np.array
+                mixed float32 buffer with peak amplitude at most 1
+        """
+        tones = np.atleast_2d(tones)
+        starts = np.round(np.asarray(onsets, dtype=float)*self.fs).astype(int)
+        if gains is None:
+            gains = np.ones(len(starts))
+
+        Nsamples = tones.shape[1]
+        if length is None:
+            Ntotal = int(starts.max()) + Nsamples if len(starts) > 0 else 0
+        else:
+            Ntotal = int(self.fs*length)
+
+        buffer = np.zeros(Ntotal, dtype=np.float64)
+        for tone, start, gain in zip(tones, starts, gains):
+            end = min(start+Nsamples, Ntotal)
+            if end > start:
+                buffer[start:end] += gain*tone[:end-start]
+
+        peak = np.max(np.abs(buffer)) if Ntotal > 0 else 0
+        if peak > 1:
+            buffer /= peak
+        return buffer.astype(np.float32)
+
+    def mix_strikes(self, tones, which, onsets, gains=None):
+        """ 
+        Mix many strikes of a few tones into one buffer with sample accurate onsets,
+        without copying the tone of every strike.
+        
+        Parameters
+        ----------
+            tones: np.array
+                (Ntones, Nsamples) tones, e.g. one per bell
+            which: np.array
+                tone index of each strike
+            onsets: np.array
+                onset of each strike in seconds
+            gains: np.array
+                gain of each strike
+
+        Returns
+        -------
+            buffer: np.array
+                mixed float32 buffer with peak amplitude at most 1
+        """
+        tones = np.atleast_2d(tones)
+        which = np.asarray(which, dtype=int)
+        starts = np.round(np.asarray(onsets, dtype=float)*self.fs).astype(int)
+        if gains is None:
+            gains = np.ones(len(starts))
+        gains = np.asarray(gains, dtype=float)
+        if len(starts) == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        Nsamples = tones.shape[1]
+        buffer = np.zeros(int(starts.max())+Nsamples, dtype=np.float64)
+        for b, start, gain in zip(which, starts, gains):
+            buffer[start:start+Nsamples] += gain*tones[b]
+
+        peak = np.max(np.abs(buffer))
+        if peak > 1:
+            buffer /= peak
+        return buffer.astype(np.float32)
+
+    def to_wav(self, buffer, filename=None):
+        """ 
+        Export a buffer as a 16 bit mono wav. No audio device needed.
+
+        Parameters
+        ----------
+            buffer: np.array
+                float buffer in the range [-1, 1]
+            filename: str
+                file to write. Returns the wav bytes if None
+
+        Returns
+        -------
+            wav: bytes
+                wav file contents if filename is None
+        """
+        pcm = (np.clip(buffer, -1, 1)*32767).astype("<i2")
+        out = io.BytesIO() if filename is None else filename
+        with wave.open(out, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.fs)
+            wav.writeframes(pcm.tobytes())
+        if filename is None:
+            return out.getvalue()
+        return
+
+default_synth = BellSynth()
@@ -0,0 +1,322 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+from bellpedia.load import Generate_Config
+from bellpedia.plots import Geoplots
+
+class Timeline:
+    def __init__(
+        self,
+        config = Generate_Config(),
+        region = "UK",
+        fileprefix = "",
+        start = 1500,
+        end = 2030,
+        step = 10,
+        Nfounders = 12,
+        colourby = "founder",
+    ):
+        """ 
+        Animated map of bells appearing by their casting date, coloured by founder.
+
+        Parameters
+        ----------
+            config: class of configuration settings
+                Class of configuration settings used across the module.
+            region: str
+                region for lat long limits on the map, see Geoplots.restrict_plot
+            fileprefix: str
+                prefix for filenames for the animation
+            start: int
+                First year of the timeline
+            end: int
+                Last year of the timeline
+            step: int
+                Years per frame, e.g. 10 for one frame per decade
+            Nfounders: int
+                Number of most prolific founders given their own colour, the rest are grouped as "Other"
+            colourby: str
+                Bell field to colour by, "founder" or "caster"
+
+        """
+        self.config = config
+        self.geoplots = Geoplots(config=config, region=region, fileprefix=fileprefix, imformat="png")
+        self.region = region
+
+        self.start = start
+        self.end = end
+        self.step = step
+        self.Nfounders = Nfounders
+        self.colourby = colourby
+
+    def bin_bells(self, world):
+        """ 
+        Pre-bin the bells of the world by frame and tower location once.
+        Bells of the same tower, founder and frame are merged into one point sized by their count.
+        Points are sorted by frame so frame k shows points[:bounds[k+1]].
+
+        Parameters
+        ----------
+            world: class instance of the world
+                class instance of the world containing Towers and their Bells.
+
+        Returns
+        -------
+            points: dict
+                "x", "y", "size", "founder" and "frame" arrays of the points, "bounds" per frame,
+                "founders" names and "years" of each frame
+        """
+        towers = world.towercolumns
+        bells = world.bellcolumns
+
+        dated = bells["dated"].values
+        ok = np.isfinite(dated) & (dated >= self.start) & (dated < self.end)
+        bells = bells[ok]
+        frame = ((bells["dated"].values - self.start)//self.step).astype(int)
+        Nframes = int(np.ceil((self.end - self.start)/self.step))
+
+        names = bells[self.colourby].astype(object).fillna("(unknown)").astype(str).values
+        founders, founder_codes, counts = np.unique(names, return_inverse=True, return_counts=True)
+        top = np.argsort(-counts, kind="stable")[:self.Nfounders]
+        remap = np.full(len(founders), len(top))
+        remap[top] = np.arange(len(top))
+        founder_codes = remap[founder_codes]
+        founders = list(founders[top]) + ["Other"]
+
+        tower = bells["tower"].values.astype(int)
+        keys = np.stack([frame, tower, founder_codes], axis=1)
+        keys, size = np.unique(keys, axis=0, return_counts=True)
+        order = np.lexsort((keys[:,1], keys[:,0]))
+        keys = keys[order]
+        size = size[order]
+
+        return {
+            "x" : towers["x"].values[keys[:,1]],
+            "y" : towers["y"].values[keys[:,1]],
+            "size" : size,
+            "founder" : keys[:,2],
+            "frame" : keys[:,0],
+            "bounds" : np.searchsorted(keys[:,0], np.arange(Nframes+1)),
+            "founders" : founders,
+            "years" : self.start + self.step*np.arange(Nframes),
+        }
+
+    def render(
+            self,
+            world,
+            filename = "BellsTimeline",
+            formats = ["gif"],
+            fps = 5,
+            dpi = 80,
+            workers = None,
+            keep_frames = False,
+        ):
+        """ 
+        Render the timeline frames in parallel and encode them into animations.
+
+        Parameters
+        ----------
+            world: class instance of the world
+                class instance of the world containing Towers and their Bells.
+            filename: str
+                filename of the animation without extension
+            formats: list
+                Animation formats, "gif" and/or "mp4". mp4 requires ffmpeg
+            fps: int
+                Frames per second
+            dpi: int
+                Resolution of the frames
+            workers: int
+                Number of worker processes. Renders in process if 1
+            keep_frames: bool
+                Keep the individual png frames next to the animation
+
+        Returns
+        -------
+            filenames: list
+                Saved animation files
+        """
+        points = self.bin_bells(world)
+        basemap = self.geoplots.get_basemap(self.region)
+        colours = plt.get_cmap("tab20")(np.arange(len(points["founders"])-1) % 20)
+        colours = np.vstack([colours, [[0.5, 0.5, 0.5, 1.0]]])
+
+        frame_dir = tempfile.mkdtemp(prefix="bellpedia_timeline_")
+        jobs = [
+            {
+                "frame" : k,
+                "year" : int(points["years"][k]),
+                "filename" : f"{frame_dir}/frame_{k:05d}.png",
+                "dpi" : dpi,
+            }
+            for k in range(len(points["years"]))
+        ]
+        shared = {
+            "basemap" : basemap,
+            "points" : points,
+            "colours" : colours,
+            "step" : self.step,
+        }
+
+        if workers is None:
+            workers = os.cpu_count()
+        if workers == 1:
+            init_timeline_worker(shared)
+            frames = [render_frame(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_timeline_worker, initargs=(shared,)) as pool:
+                frames = list(pool.map(render_frame, jobs, chunksize=max(1, len(jobs)//(4*workers))))
+
+        outputs = []
+        for imformat in formats:
+            out = f"{self.geoplots.filepath}{filename}.{imformat}"
+            if imformat == "gif":
+                encode_gif(frames, out, fps)
+            elif imformat == "mp4":
+                encode_mp4(frame_dir, out, fps)
+            else:
+                print(f"Timeline format ERROR: {imformat}")
+                continue
+            outputs.append(out)
+
+        if keep_frames:
+            shutil.move(frame_dir, f"{self.geoplots.filepath}{filename}_frames")
+        else:
+            shutil.rmtree(frame_dir)
+        return outputs
+
+####################################################################################################
+                 ############################ Frame rendering ############################
+####################################################################################################
+
+_shared_timeline = {}
+
+def init_timeline_worker(shared):
+    """ 
+    Store the basemap and binned points shared by all frames of a render worker.
+
+    Parameters
+    ----------
+        shared: dict
+            basemap, points and colours from Timeline.render
+
+    Returns
+    -------
+
+    """
+    global _shared_timeline
+    _shared_timeline = shared
+    return
+
+def render_frame(job):
+    """ 
+    Render a single timeline frame. All bells cast up to the frame are shown, those cast
+    within the frame are highlighted.
+
+    Parameters
+    ----------
+        job: dict
+            "frame" index, "year", "filename" and "dpi"
+
+    Returns
+    -------
+        filename: str
+            saved frame file
+    """
+    basemap = _shared_timeline["basemap"]
+    points = _shared_timeline["points"]
+    colours = _shared_timeline["colours"]
+
+    k = job["frame"]
+    old = slice(0, points["bounds"][k])
+    new = slice(points["bounds"][k], points["bounds"][k+1])
+
+    fig = Figure(figsize=(8.27, 11.69))
+    ax = fig.subplots(1,1)
+    ax.axis('off')
+    ax.imshow(basemap["img"], extent=basemap["extent"], interpolation="bilinear")
+    ax.scatter(
+        x=points["x"][old], y=points["y"][old], s=6*points["size"][old],
+        color=colours[points["founder"][old]], alpha=.4, linewidths=0,
+    )
+    ax.scatter(
+        x=points["x"][new], y=points["y"][new], s=12*points["size"][new],
+        color=colours[points["founder"][new]], alpha=.9, edgecolors='black',
+    )
+    ax.set_xlim(basemap["xlim"])
+    ax.set_ylim(basemap["ylim"])
+
+    handles = [
+        Line2D([], [], marker="o", linestyle="", color=colours[i], label=name)
+        for i, name in enumerate(points["founders"])
+    ]
+    if mpl.rcParams["text.usetex"]:
+        for h in handles:
+            h.set_label(h.get_label().replace("&", r"\&"))
+    ax.legend(handles=handles, loc="upper left")
+    ax.set_title(f"{job['year']}-{job['year']+_shared_timeline['step']-1}: {int(points['size'][new].sum())} casts")
+    fig.savefig(job["filename"], format="png", dpi=job["dpi"])
+    return job["filename"]
+
+def encode_gif(frames, filename, fps):
+    """ 
+    Encode png frames into a gif.
+
+    Parameters
+    ----------
+        frames: list
+            frame filenames in order
+        filename: str
+            output filename
+        fps: int
+            Frames per second
+
+    Returns
+    -------
+
+    """
+    from PIL import Image
+    images = [Image.open(f).convert("P", palette=Image.ADAPTIVE) for f in frames]
+    images[0].save(filename, save_all=True, append_images=images[1:], duration=int(1000/fps), loop=0)
+    return
+
+def encode_mp4(frame_dir, filename, fps):
+    """ 
+    Encode png frames into an mp4 with a local ffmpeg.
+
+    Parameters
+    ----------
+        frame_dir: str
+            directory of frame_XXXXX.png frames
+        filename: str
+            output filename
+        fps: int
+            Frames per second
+
+    Returns
+    -------
+
+    """
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is required to encode mp4 timelines")
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-framerate", str(fps),
+            "-i", f"{frame_dir}/frame_%05d.png",
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-pix_fmt", "yuv420p",
+            filename,
+        ],
+        check=True,
+    )
+    return
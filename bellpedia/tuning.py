@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+note_names = ["C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B"]
+
+def semitones_from_A4(nominals):
+    """ 
+    Nominal frequencies as fractional semitones from A4 = 440 Hz.
+
+    Parameters
+    ----------
+        nominals: np.array
+            nominal frequencies, Hz
+
+    Returns
+    -------
+        semitones: np.array
+            semitones above A4
+    """
+    return 12*np.log2(np.asarray(nominals, dtype=float)/440.0)
+
+def note_name(semitones):
+    """ 
+    Note names of semitones from A4, without octave.
+
+    Parameters
+    ----------
+        semitones: np.array
+            semitones above A4
+
+    Returns
+    -------
+        names: np.array
+            note name of each value, None where missing
+    """
+    semitones = np.asarray(semitones, dtype=float)
+    ok = np.isfinite(semitones)
+    idx = (np.round(np.where(ok, semitones, 0)).astype(int) + 9) % 12
+    return np.where(ok, np.array(note_names, dtype=object)[idx], None)
+
+def bell_tuning(world):
+    """ 
+    Tuning of every bell in the world relative to the tenor of its ring, computed for all rings at once.
+    The tenor is the lowest nominal of the ring.
+
+    Parameters
+    ----------
+        world: class instance of the world
+            class instance of the world containing Towers and their Bells.
+
+    Returns
+    -------
+        bells: pd.dataframe
+            world.bellcolumns with "tenor_nominal", "cents" above the tenor and "deviation",
+            the cents from the nearest equal tempered semitone above the tenor
+    """
+    bells = world.bellcolumns
+    nominal = bells["nominal"].values.astype(float)
+    nominal = np.where(nominal > 0, nominal, np.nan)
+    tower = bells["tower"].values.astype(int)
+
+    tenor = np.full(world.NTowers, np.inf)
+    ok = np.isfinite(nominal)
+    np.minimum.at(tenor, tower[ok], nominal[ok])
+    tenor[~np.isfinite(tenor)] = np.nan
+
+    bells["tenor_nominal"] = tenor[tower]
+    bells["cents"] = 1200*np.log2(nominal/bells["tenor_nominal"].values)
+    bells["deviation"] = bells["cents"].values - 100*np.round(bells["cents"].values/100)
+    return bells
+
+def ring_tuning(world):
+    """ 
+    Tuning of every ring in the world, computed for all rings at once.
+
+    Parameters
+    ----------
+        world: class instance of the world
+            class instance of the world containing Towers and their Bells.
+
+    Returns
+    -------
+        rings: pd.dataframe
+            indexed by tower dove_id with "key" inferred from the tenor, "tenor_nominal",
+            "tenor_offset" cents of the tenor from equal temperament at A4 = 440 Hz,
+            "ntuned" bells with a nominal, "rms_cents" and "max_cents" deviations of the bells
+            above the tenor from equal temperament and the "score", the rms deviation, where
+            lower is better in tune
+    """
+    bells = bell_tuning(world)
+    tower = bells["tower"].values.astype(int)
+    deviation = bells["deviation"].values
+    ok = np.isfinite(deviation)
+    above = ok & (bells["cents"].values > 0)
+
+    Ntowers = world.NTowers
+    ntuned = np.bincount(tower[ok], minlength=Ntowers)
+    nabove = np.bincount(tower[above], minlength=Ntowers)
+    sumsq = np.bincount(tower[above], weights=deviation[above]**2, minlength=Ntowers)
+    maxdev = np.zeros(Ntowers)
+    np.maximum.at(maxdev, tower[above], np.abs(deviation[above]))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rms = np.sqrt(sumsq/nabove)
+    maxdev = np.where(nabove > 0, maxdev, np.nan)
+
+    tenor = np.full(Ntowers, np.nan)
+    tenor[tower[ok]] = bells["tenor_nominal"].values[ok]
+    semis = semitones_from_A4(tenor)
+
+    rings = pd.DataFrame({
+        "key" : pd.Categorical(note_name(semis), categories=note_names),
+        "tenor_nominal" : tenor,
+        "tenor_offset" : 100*(semis - np.round(semis)),
+        "ntuned" : ntuned,
+        "rms_cents" : rms,
+        "max_cents" : maxdev,
+        "score" : rms,
+    }, index=pd.Index([t.dove_id for t in world.towers], name="dove_id"))
+    return rings
@@ -0,0 +1,274 @@
+import json
+import numpy as np
+import pandas as pd
+
+#Bell roles and cast dates sort_out_bell and sort_out_dated understand
+role_pattern = r"\d+|\d+c\d+|c\d+|c\d+b|c\d+#|[A-Za-z]+|\d+bc\d+|\d+#c\d+|\d+b|\d+#"
+date_pattern = r"\d+|c\d+|\(\d+\)|\(n/d\)"
+weight_pattern = r"\d+-\d+-\d+"
+#Plausible ranges of numeric columns
+limits = {
+    "Lat" : (-90, 90),
+    "Long" : (-180, 180),
+    "Weight (lbs)" : (1, 50000),
+    "Diameter (in)" : (2, 150),
+    "Nominal (Hz)" : (40, 6000),
+    "Cast Date" : (900, 2100),
+}
+#Bounding box of Britain and Ireland for towers with a GB or IE country code
+british_isles = {"Lat" : (49.8, 61.0), "Long" : (-10.7, 2.0)}
+
+class ValidationReport:
+    def __init__(
+        self,
+    ):
+        """ 
+        Machine readable report of data validation issues. Errors would break or corrupt the ingest,
+        warnings are implausible values that are ingested as they are.
+
+        Parameters
+        ----------
+
+        """
+        self.parts = []
+
+    def add(self, table, check, severity, keys, column, values, mask):
+        """ 
+        Record the rows failing a check.
+
+        Parameters
+        ----------
+            table: str
+                table name, e.g. "bells"
+            check: str
+                check name, e.g. "weight_range"
+            severity: str
+                "error" or "warning"
+            keys: np.array
+                row key of each row
+            column: str
+                column checked
+            values: np.array
+                value of each row
+            mask: np.array
+                bool, rows failing the check
+
+        Returns
+        -------
+
+        """
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return
+        self.parts.append(pd.DataFrame({
+            "table" : table,
+            "check" : check,
+            "severity" : severity,
+            "key" : np.asarray(keys, dtype=object)[mask],
+            "column" : column,
+            "value" : np.asarray(values, dtype=object)[mask],
+        }))
+        return
+
+    @property
+    def issues(self):
+        """ 
+        All issues.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            issues: pd.dataframe
+                "table", "check", "severity", row "key", "column" and "value" of each issue
+        """
+        if len(self.parts) == 0:
+            return pd.DataFrame(columns=["table", "check", "severity", "key", "column", "value"])
+        return pd.concat(self.parts, ignore_index=True)
+
+    @property
+    def ok(self):
+        """ 
+        True if there are no errors.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            ok: bool
+                no errors
+        """
+        return not any((p["severity"] == "error").any() for p in self.parts)
+
+    @property
+    def summary(self):
+        """ 
+        Number of issues of each check.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            summary: pd.dataframe
+                "table", "check", "severity" and "count"
+        """
+        return self.issues.groupby(["table", "check", "severity"]).size().rename("count").reset_index()
+
+    def to_dict(self):
+        """ 
+        Report as a dictionary.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+            report: dict
+                "ok", "summary" and "issues" records
+        """
+        issues = self.issues.astype(object).where(self.issues.notna(), None)
+        return {
+            "ok" : self.ok,
+            "summary" : self.summary.to_dict(orient="records"),
+            "issues" : issues.to_dict(orient="records"),
+        }
+
+    def save(self, filename):
+        """ 
+        Save the report as JSON.
+
+        Parameters
+        ----------
+            filename: str
+                JSON filename
+
+        Returns
+        -------
+
+        """
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=1, default=str)
+        return
+
+def check_range(report, table, df, key, column, severity="warning"):
+    """ 
+    Record numeric values of a column outside their plausible range.
+
+    Parameters
+    ----------
+        report: ValidationReport class instance
+            report to add to
+        table: str
+            table name
+        df: pd.dataframe
+            table
+        key: str
+            row key column
+        column: str
+            column checked
+        severity: str
+            "error" or "warning"
+
+    Returns
+    -------
+
+    """
+    if column not in df:
+        return
+    lo, hi = limits[column]
+    values = pd.to_numeric(df[column], errors="coerce").values
+    report.add(table, f"{column} range", severity, df[key].values, column, df[column].values, (values < lo) | (values > hi))
+    return
+
+def validate_export(towers, bells=None, frames=None, ring_type=None):
+    """ 
+    Validate a Dove export with vectorized checks over whole columns.
+
+    Parameters
+    ----------
+        towers: pd.dataframe
+            Dove towers data
+        bells: pd.dataframe
+            Dove bells data
+        frames: pd.dataframe
+            Dove frames data
+        ring_type: str
+            ring type ingested, e.g. "full-circle ring", all if None
+
+    Returns
+    -------
+        report: ValidationReport class instance
+            validation issues
+    """
+    report = ValidationReport()
+    all_towers = towers
+    if ring_type is not None:
+        towers = towers[towers["RingType"].astype("string").str.lower().values == ring_type]
+
+    #Towers
+    report.add("towers", "duplicate RingID", "error", towers["RingID"].values, "RingID", towers["RingID"].values,
+        towers["RingID"].duplicated(keep=False).values)
+    report.add("towers", "duplicate TowerID", "warning", towers["RingID"].values, "TowerID", towers["TowerID"].values,
+        towers.duplicated(["TowerID", "RingType"], keep="first").values)
+    lat = pd.to_numeric(towers["Lat"], errors="coerce").values
+    long = pd.to_numeric(towers["Long"], errors="coerce").values
+    report.add("towers", "missing coordinates", "warning", towers["TowerID"].values, "Lat", towers["Lat"].values,
+        ~(np.isfinite(lat) & np.isfinite(long)))
+    check_range(report, "towers", towers, "TowerID", "Lat", "error")
+    check_range(report, "towers", towers, "TowerID", "Long", "error")
+    if "ISO3166code" in towers:
+        home = towers["ISO3166code"].isin(["GB", "IE"]).values
+        outside = np.zeros(len(towers), dtype=bool)
+        for column, values in [("Lat", lat), ("Long", long)]:
+            lo, hi = british_isles[column]
+            outside |= (values < lo) | (values > hi)
+        report.add("towers", "outside Britain and Ireland", "warning", towers["TowerID"].values, "Lat", towers["Lat"].values, home & outside)
+
+    if bells is not None:
+        keys = bells["Bell ID"].values
+        report.add("bells", "missing Bell ID", "error", keys, "Bell ID", keys, bells["Bell ID"].isna().values)
+        report.add("bells", "duplicate Bell ID", "error", keys, "Bell ID", keys,
+            bells["Bell ID"].notna().values & bells["Bell ID"].duplicated(keep=False).values)
+        report.add("bells", "orphan bell", "warning", keys, "Tower ID", bells["Tower ID"].values,
+            ~bells["Tower ID"].isin(all_towers["TowerID"]).values)
+        report.add("bells", "missing collection type", "error", keys, "Collection Type", bells["Collection Type"].values,
+            bells["Collection Type"].isna().values)
+
+        role = bells["Bell Role"].astype("string")
+        report.add("bells", "unparsable role", "warning", keys, "Bell Role", bells["Bell Role"].values,
+            ~role.str.fullmatch(role_pattern).fillna(False).values.astype(bool))
+        dated = bells["Cast Date"].astype("string")
+        report.add("bells", "unparsable date", "warning", keys, "Cast Date", bells["Cast Date"].values,
+            dated.notna().values & ~dated.str.fullmatch(date_pattern).fillna(True).values.astype(bool))
+        report.add("bells", "Cast Date range", "warning", keys, "Cast Date", bells["Cast Date"].values,
+            ~pd.to_numeric(dated.str.extract(r"(\d+)")[0], errors="coerce").between(*limits["Cast Date"]).values
+            & dated.str.contains(r"\d", regex=True).fillna(False).values.astype(bool))
+
+        #Weights are lbs or "cwt-qr-lb" strings, anything else breaks Bell.StrToCwt
+        weight = bells["Weight (lbs)"]
+        numeric = pd.to_numeric(weight, errors="coerce")
+        text = weight.astype("string").str.strip()
+        report.add("bells", "unparsable weight", "error", keys, "Weight (lbs)", weight.values,
+            weight.notna().values & numeric.isna().values & ~text.str.fullmatch(weight_pattern).fillna(False).values.astype(bool))
+        report.add("bells", "Weight (lbs) range", "warning", keys, "Weight (lbs)", weight.values,
+            (numeric < limits["Weight (lbs)"][0]).values | (numeric > limits["Weight (lbs)"][1]).values)
+        for column in ["Nominal (Hz)", "Diameter (in)"]:
+            values = pd.to_numeric(bells[column], errors="coerce")
+            report.add("bells", f"unparsable {column}", "error", keys, column, bells[column].values,
+                bells[column].notna().values & values.isna().values)
+            check_range(report, "bells", bells, "Bell ID", column)
+
+        if frames is not None:
+            frame_ids = bells["Frame ID"]
+            report.add("bells", "unknown frame", "warning", keys, "Frame ID", frame_ids.values,
+                frame_ids.notna().values & ~frame_ids.isin(frames["Frame ID"]).values)
+
+    if frames is not None:
+        keys = frames["Frame ID"].values
+        report.add("frames", "duplicate Frame ID", "error", keys, "Frame ID", keys, frames["Frame ID"].duplicated(keep=False).values)
+        report.add("frames", "orphan frame", "warning", keys, "Tower ID", frames["Tower ID"].values,
+            ~frames["Tower ID"].isin(all_towers["TowerID"]).values)
+    return report
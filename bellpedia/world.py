@@ -1,8 +1,27 @@
+import os
+import copy
 import numpy as np
 import pandas as pd
 import re
-import pyaudio
 from bellpedia.functions import Coords
+from bellpedia.synth import default_synth
+from bellpedia.methods import Touch, get_method, strike_times
+from bellpedia.playback import get_player
+from bellpedia.tuning import ring_tuning
+from bellpedia.similarity import RingIndex
+from bellpedia.indexes import SortedIndex
+from bellpedia.regions import RegionIndex
+from bellpedia.founders import FounderIndex
+from bellpedia.frames import FrameIndex
+from bellpedia.postcodes import PostcodeIndex, normalise_postcodes
+from bellpedia.gridref import parse_grid_refs, grid_to_latlong, haversine, GridIndex
+from bellpedia.routes import RoutePlanner, plan_feasible, plan_days, practice_windows
+from bellpedia.graph import TowerGraph
+from bellpedia.flags import FlagIndex, practice_mask, practice_masks, facility_bits
+from bellpedia.guilds import GuildIndex, split_affiliations
+from bellpedia.changes import parse_changes
+from bellpedia.strings import strings
+from bellpedia.cache import ResultCache
 
 cwt2kg = 50.8023
 lb2kg = 0.453592
@@ -18,7 +37,8 @@ intocm = 2.54
 class World:
     def __init__(
         self, 
-        towers = []
+        towers = [],
+        cache_size = 128
     ):
         """ 
         Create world class instance of the world containing Towers and their Bells.
@@ -27,6 +47,8 @@ class World:
         ----------
             towers: list
                 List of towers of tower class
+            cache_size: int
+                Number of search results kept, 0 to not cache searches
 
         Returns
         -------
@@ -36,6 +58,17 @@ class World:
         self.bells = [bell for t in towers for bell in t.bells]
 
         self.create_lookup()
+        #Derived indexes built on first use
+        self.indexes = {}
+        self.founder_table = None
+        self.name_table = None
+        self.change_log = None
+        #Saved neighbour graph, set by Generate_World
+        self.graph_file = None
+        #Recent search results, cleared whenever the world changes
+        self.search_cache = ResultCache(cache_size)
+        #Built summaries, shared with copies of the world
+        self.summaries = {}
 
     @property
     def NTowers(self):
@@ -78,18 +111,21 @@ class World:
             which: str
                 Choices include "name","place","dove_id","Nbells","coordinates","postcode","country" and "county"
             search: str
-                Value to find
+                Value to find. Old Dove codes and alternate names are resolved when a name table is set
 
         Returns
         -------
             world: class instance of the world
                 world class instance of the world containing subset of searched Towers and their Bells.
+                Repeated searches return a copy of the cached world, sharing its lookup and summaries
         """
         if type(search) not in [list, np.ndarray]:
             which = which.lower()
             if which == "postcode":
-                search = search
-            elif which == "nbells" or which == "dove_id":
+                search = normalise_postcodes([search])[0]
+            elif which == "dove_id":
+                search = self.resolve_ids([search])[0]
+            elif which == "nbells":
                 search = int(search)
             else:
                 search = search.lower()
@@ -100,177 +136,1648 @@ class World:
 
             which = which.lower()
             if which == "postcode":
-                search = [s for s in search]
-            elif which == "nbells" or which == "dove_id":
+                search = list(normalise_postcodes(search))
+            elif which == "dove_id":
+                search = list(self.resolve_ids(search))
+            elif which == "nbells":
                 search = [int(s) for s in search]
             else:
                 search = [s.lower() for s in search]
                 
+        key = (which, frozenset(search))
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return cached.copy()
+
+        indexes = list(self.lookup[self.lookup[which].isin(search)].index.values)
+        if which in ["name", "place"] and self.name_table is not None:
+            #Alternate names
+            indexes += [self.positions[i] for s in search for i in self.name_table.resolve_name(s) if i in self.positions]
+        indexes = list(set(indexes)) #Make sure unique
+        world = World([self.towers[index] for index in indexes])
+        self.search_cache.put(key, world)
+        return world.copy()
+
+    def copy(self):
+        """ 
+        Shallow copy of the world sharing its towers, lookup and summaries, without rebuilding the lookup.
+        Adding or removing towers of the copy leaves the original unchanged
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            world: class instance of the world
+                copy of the world
+        """
+        world = copy.copy(self)
+        world.towers = list(self.towers)
+        world.bells = list(self.bells)
+        #Indexes such as the graph are updated in place, so the copy builds its own
+        world.indexes = {}
+        world.search_cache = ResultCache(self.search_cache.maxsize)
+        return world
+
+    def clear_cache(self):
+        """ 
+        Drop cached search results and summaries, after the towers of the world change
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        self.search_cache.clear()
+        #A new dict, other worlds of the same search keep theirs
+        self.summaries = {}
+        return
+
+    @property
+    def cache_stats(self):
+        """ 
+        Hit and miss statistics of the search cache
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            stats: pd.series
+                "hits", "misses", "hit_rate", "evictions", "invalidations", "size" and "maxsize"
+        """
+        return self.search_cache.stats
+
+    @property
+    def postcode_index(self):
+        """ 
+        Sorted index of the tower postcodes by area, district, sector and unit, built on first use.
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            index: PostcodeIndex class instance
+                postcode index over the positions of world.towers
+        """
+        if "postcodes" not in self.indexes:
+            self.indexes["postcodes"] = PostcodeIndex(self.lookup["postcode"].values)
+        return self.indexes["postcodes"]
+
+    def search_postcode(self, prefix):
+        """ 
+        Towers in postcode areas ("DH"), districts ("DH1"), sectors ("DH1 3") or units ("DH1 3EL")
+        
+        Parameters
+        ----------
+            prefix: str or list
+                postcode prefix or list of prefixes
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the world containing the towers in the postcodes
+        """
+        if type(prefix) not in [list, np.ndarray]:
+            prefix = [prefix]
+        rows = self.postcode_index.prefix_batch(list(prefix))["row"].values
+        indexes = np.unique(rows)
+        return World([self.towers[index] for index in indexes])
+
+    @property
+    def gridcolumns(self):
+        """ 
+        National Grid references of the towers parsed and converted to WGS84 in one vectorized pass, built on first use.
+        Rows are in the same order as world.towers.
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            grid: pd.dataframe
+                "grid", "easting", "northing", "precision" and the "lat" and "long" of the grid reference
+        """
+        if "grid" not in self.indexes:
+            grid = parse_grid_refs([t.grid_reference for t in self.towers])
+            grid["lat"], grid["long"] = grid_to_latlong(grid["easting"].values, grid["northing"].values, grid["grid"].values)
+            self.indexes["grid"] = grid
+        return self.indexes["grid"]
+
+    def check_coordinates(self, tolerance=1.0, fill=True):
+        """ 
+        Cross check the coordinates of every tower against its National Grid reference.
+        
+        Parameters
+        ----------
+            tolerance: float
+                disagreement in km above which a tower is flagged
+            fill: bool
+                replace missing coordinates with those of the grid reference
+
+        Returns
+        -------
+            check: pd.dataframe
+                per tower "dove_id", "grid_reference", "lat", "long", "grid_lat", "grid_long",
+                "distance" km between them, "flagged" disagreements and "filled" coordinates
+        """
+        grid = self.gridcolumns
+        lat = np.array([np.nan if t.coordinates is None else t.coordinates.lat for t in self.towers], dtype=float)
+        long = np.array([np.nan if t.coordinates is None else t.coordinates.long for t in self.towers], dtype=float)
+        distance = haversine(lat, long, grid["lat"].values, grid["long"].values)
+        missing = ~(np.isfinite(lat) & np.isfinite(long)) & np.isfinite(grid["lat"].values)
+
+        if fill:
+            for i in np.flatnonzero(missing):
+                self.towers[i].coordinates = Coords(grid.at[i, "lat"], grid.at[i, "long"])
+            if missing.any():
+                self.create_lookup()
+                self.clear_cache()
+        check = pd.DataFrame({
+            "dove_id" : [t.dove_id for t in self.towers],
+            "grid_reference" : [t.grid_reference for t in self.towers],
+            "lat" : lat,
+            "long" : long,
+            "grid_lat" : grid["lat"].values,
+            "grid_long" : grid["long"].values,
+            "distance" : distance,
+            "flagged" : distance > tolerance,
+            "filled" : missing & fill,
+        })
+        if check["flagged"].any():
+            print(f"{check['flagged'].sum()} towers more than {tolerance} km from their grid reference")
+        return check
+
+    def grid_index(self, size=10):
+        """ 
+        Buckets of the towers by National Grid square, built on first use.
+        
+        Parameters
+        ----------
+            size: float
+                side of the bucket squares in km
+
+        Returns
+        -------
+            index: GridIndex class instance
+                grid index over the positions of world.towers
+        """
+        key = f"grid_{size}"
+        if key not in self.indexes:
+            self.indexes[key] = GridIndex(self.gridcolumns, size*1000)
+        return self.indexes[key]
+
+    def search_grid(self, square):
+        """ 
+        Towers in a National Grid square of any precision, e.g. "SK", "SK72" or "SK7222"
+        
+        Parameters
+        ----------
+            square: str
+                grid square reference
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the world containing the towers in the square
+        """
+        indexes = self.grid_index().square(square)
+        return World([self.towers[index] for index in indexes])
+
+    def route_stops(self, which=None, start=None, practice_day=None, **kwargs):
+        """ 
+        Towers, start point and time windows of a route.
+        
+        Parameters
+        ----------
+            which: list
+                dove_ids to visit, all towers if None
+            start: Coords, tuple or int
+                start coordinates, (lat, long) or dove_id, the first tower if None
+            practice_day: str
+                weekday, e.g. "Tue", to only visit towers during their practice on that day
+            **kwargs:
+                practice_windows settings
+
+        Returns
+        -------
+            towers: list
+                tower class instances to visit
+            start: tuple
+                (lat, long) of the start, None for the first tower
+            windows: np.array
+                (N, 2) practice windows, None without a practice day
+        """
+        if which is None:
+            towers = self.towers
+        else:
+            ids = self.resolve_ids(which)
+            towers = [self.towers[self.positions[i]] for i in ids if i in self.positions]
+        towers = [t for t in towers if t.coordinates is not None and np.isfinite(t.coordinates.lat)]
+
+        if isinstance(start, Coords):
+            start = (start.lat, start.long)
+        elif isinstance(start, (int, np.integer)):
+            start = self.towers[self.positions[start]].coordinates
+            start = (start.lat, start.long)
+
+        windows = None
+        if practice_day is not None:
+            masks = [getattr(t, "practice_days", None) for t in towers]
+            if any(m is None for m in masks):
+                masks = practice_masks([t.practice for t in towers])
+            windows = practice_windows([t.practice for t in towers], practice_day, masks=masks, **kwargs)
+            keep = np.isfinite(windows[:,0])
+            if not keep.all():
+                print(f"{(~keep).sum()} towers without a practice on {practice_day}")
+            towers = [t for t, k in zip(towers, keep) if k]
+            windows = windows[keep]
+        return towers, start, windows
+
+    def plan_route(self, which=None, start=None, return_to_start=True, practice_day=None, start_time="09:00", visit=30, speed=30, distance_unit="miles"):
+        """ 
+        Near optimal visiting order of the towers of the world, or a list of dove_ids, for an outing
+        
+        Parameters
+        ----------
+            which: list
+                dove_ids to visit, all towers if None
+            start: Coords, tuple or int
+                start coordinates, (lat, long) or dove_id, the first tower if None
+            return_to_start: bool
+                finish the route back at the start
+            practice_day: str
+                weekday, e.g. "Tue", to visit the towers that can be reached during their practice on that day
+            start_time: str
+                departure time, e.g. "09:00"
+            visit: float
+                minutes spent at each tower
+            speed: float
+                average travelling speed in km/h
+            distance_unit: str
+                unit of the leg distances
+
+        Returns
+        -------
+            route: pd.dataframe
+                "stop", "dove_id", "name", "place", "leg" and "total" distance, "arrive", "depart" and "late" minutes
+        """
+        towers, start, windows = self.route_stops(which, start, practice_day)
+        if len(towers) == 0:
+            print("No towers to visit")
+            return None
+        lat = [t.coordinates.lat for t in towers]
+        long = [t.coordinates.long for t in towers]
+        if windows is None:
+            planner = RoutePlanner(lat, long, start, return_to_start, None, start_time, visit, speed)
+            order = planner.solve()
+        else:
+            #Only the towers that can be reached during their practice
+            keep, order, planner = plan_feasible(
+                lat, long, start, return_to_start, windows, start_time=start_time, visit=visit, speed=speed
+            )
+            if planner is None:
+                print(f"No towers can be reached during their practice on {practice_day}")
+                return None
+            print(f"{len(towers)-len(keep)} towers cannot be reached during their practice")
+            towers = [towers[i] for i in keep]
+        route = planner.itinerary(order, [t.dove_id for t in towers], [t.name for t in towers], distance_unit)
+        route.insert(4, "place", [towers[i].place for i in route["position"]])
+        return route.drop(columns="position")
+
+    def plan_days(self, per_day, which=None, start=None, return_to_start=True, practice_day=None, start_time="09:00", visit=30, speed=30, distance_unit="miles"):
+        """ 
+        Itineraries of at most per_day towers each, covering the towers of the world or a list of dove_ids
+        
+        Parameters
+        ----------
+            per_day: int
+                towers per day
+            which: list
+                dove_ids to visit, all towers if None
+            start: Coords, tuple or int
+                start coordinates of each day, (lat, long) or dove_id, the first tower if None
+            return_to_start: bool
+                finish each day back at the start
+            practice_day: str
+                weekday, e.g. "Tue", to visit towers during their practice on that day
+            start_time: str
+                departure time each day, e.g. "09:00"
+            visit: float
+                minutes spent at each tower
+            speed: float
+                average travelling speed in km/h
+            distance_unit: str
+                unit of the leg distances
+
+        Returns
+        -------
+            days: pd.dataframe
+                plan_route itineraries of each "day"
+        """
+        towers, start, windows = self.route_stops(which, start, practice_day)
+        if len(towers) == 0:
+            print("No towers to visit")
+            return None
+        if start is None:
+            start = (towers[0].coordinates.lat, towers[0].coordinates.long)
+        days = plan_days(
+            [t.coordinates.lat for t in towers], [t.coordinates.long for t in towers], start, per_day,
+            return_to_start, windows=windows, start_time=start_time, visit=visit, speed=speed
+        )
+        itineraries = []
+        for day, (chunk, order, planner) in enumerate(days):
+            stops = [towers[i] for i in chunk]
+            route = planner.itinerary(order, [t.dove_id for t in stops], [t.name for t in stops], distance_unit)
+            route.insert(4, "place", [stops[i].place for i in route["position"]])
+            route.insert(0, "day", day+1)
+            itineraries.append(route.drop(columns="position"))
+        return pd.concat(itineraries, ignore_index=True)
+
+    def set_names(self, table):
+        """ 
+        Resolve old Dove codes and alternate names in searches
+        
+        Parameters
+        ----------
+            table: NameTable class instance
+                name table from towers.csv, AddNtrs.txt and newpks.txt
+
+        Returns
+        -------
+
+        """
+        self.name_table = table
+        self.clear_cache()
+        return
+
+    def set_changes(self, log):
+        """ 
+        Attach the Dove change log to the world
+        
+        Parameters
+        ----------
+            log: ChangeLog class instance
+                change log from changes.csv
+
+        Returns
+        -------
+
+        """
+        self.change_log = log
+        return
+
+    def add_changes(self, changes):
+        """ 
+        Stream new rows of changes.csv into the change log
+        
+        Parameters
+        ----------
+            changes: pd.dataframe
+                Dove changes data with Date, TowerID, Place, Region, Description of change, Source and Route columns
+
+        Returns
+        -------
+
+        """
+        if self.change_log is None:
+            print("No change log set")
+            return
+        self.change_log.append(parse_changes(changes))
+        return
+
+    def change_history(self, dove_id):
+        """ 
+        Change history of a tower
+        
+        Parameters
+        ----------
+            dove_id: int
+                dove tower id number or Dove code
+
+        Returns
+        -------
+            events: pd.dataframe
+                changes of the tower, oldest first
+        """
+        if self.change_log is None:
+            print("No change log set")
+            return None
+        return self.change_log.history(self.resolve_ids([dove_id])[0])
+
+    def search_changed(self, start=None, end=None, days=None, today=None):
+        """ 
+        Search towers changed between two dates, or in the last number of days
+        
+        Parameters
+        ----------
+            start: str
+                first date, e.g. "2023-01-01"
+            end: str
+                last date
+            days: int
+                number of days before today, used instead of start and end
+            today: str
+                date days are counted back from, the latest change if None
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the changed towers
+        """
+        if self.change_log is None:
+            print("No change log set")
+            return World([])
+        if days is not None:
+            events = self.change_log.since(days, today)
+        else:
+            events = self.change_log.between(start, end)
+        indexes = sorted(self.positions[i] for i in events["tower_id"].unique() if i in self.positions)
+        return World([self.towers[index] for index in indexes])
+
+    def ring_counts(self, date):
+        """ 
+        Number of bells of the towers as of a date, from the completed augmentations in the change log
+        
+        Parameters
+        ----------
+            date: str
+                date, e.g. "2020-01-01"
+
+        Returns
+        -------
+            counts: pd.dataframe
+                per tower "dove_id", "place", current "bells" and "bells_asof", missing where not known
+        """
+        current = pd.Series([len(t.bells) for t in self.towers], index=[t.dove_id for t in self.towers])
+        asof = current.astype(float) if self.change_log is None else self.change_log.ring_counts(date, current)
+        return pd.DataFrame({
+            "dove_id" : current.index,
+            "place" : [t.place for t in self.towers],
+            "bells" : current.values,
+            "bells_asof" : asof.values,
+        })
+
+    def resolve_ids(self, values):
+        """ 
+        Current tower dove_ids of a list of tower ids and old or current Dove codes
+        
+        Parameters
+        ----------
+            values: list
+                tower ids or Dove codes
+
+        Returns
+        -------
+            dove_ids: np.array
+                tower dove_ids, None where not resolved
+        """
+        if self.name_table is None:
+            return np.array([int(v) for v in values], dtype=object)
+        return self.name_table.resolve_ids(values)
+
+    def resolve(self, which, values):
+        """ 
+        Batch resolve a whole input column to the current values used by the world. Old Dove codes become
+        current dove_ids and alternate names become the current name or place of their tower.
+        
+        Parameters
+        ----------
+            which: str
+                Choices include "name","place" and "dove_id", other columns are returned unchanged
+            values: list
+                values to resolve
+
+        Returns
+        -------
+            values: np.array
+                resolved values, unresolved values are unchanged
+        """
+        which = which.lower()
+        values = np.array(values, dtype=object)
+        if self.name_table is None:
+            return values
+        if which == "dove_id":
+            resolved = self.name_table.resolve_ids(values)
+            return np.where(pd.isna(resolved), values, resolved)
+        if which in ["name", "place"]:
+            known = set(self.lookup[which].dropna().values)
+            for i, v in enumerate(values):
+                if not isinstance(v, str) or v.lower() in known:
+                    continue
+                ids = [j for j in self.name_table.resolve_name(v) if j in self.positions]
+                if len(ids) > 0:
+                    values[i] = getattr(self.towers[self.positions[ids[0]]], which)
+        return values
+
+    def create_lookup(self):
+        """ 
+        Create dictionary lookup table in world class
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+
+        """
+        dat = {
+            "name" : [],
+            "place" : [],
+            "dove_id" : [],
+
+            "nbells" : [],
+            "coordinates" : [],
+            "postcode" : [],
+
+            "country" : [],
+            "county" : []
+        }
+        for t in self.towers:
+            if t.name is not None:
+                dat["name"].append(str(t.name).lower())
+            else:
+                dat["name"].append(None)
+
+            if t.place is not None:
+                dat["place"].append(str(t.place).lower())
+            else:
+                dat["place"].append(None)
+
+            if t.dove_id is not None:
+                dat["dove_id"].append(t.dove_id)
+            else:
+                dat["dove_id"].append(None)
+
+            if t.Nbells is not None:
+                dat["nbells"].append(t.Nbells)
+            else:
+                dat["nbells"].append(None)
+
+            if t.coordinates is not None:
+                dat["coordinates"].append(t.coordinates)
+            else:
+                dat["coordinates"].append(None)
+
+            if t.postcode is not None:
+                dat["postcode"].append(t.postcode)
+            else:
+                dat["postcode"].append(None)
+
+            dat["country"].append(t.country)
+            dat["county"].append(t.county)
+            
+        #Dictionary encoded, lower cased once per distinct value
+        for field in ["country", "county"]:
+            dat[field] = strings.lower_categorical(field, dat[field])
+        #Postcodes are normalised at ingest
+        self.lookup = pd.DataFrame(dat)
+        self.positions = {dove_id : i for i, dove_id in enumerate(dat["dove_id"]) if dove_id is not None}
+        return
+
+    @property
+    def summary(self):
+        """ 
+        Get summary dataframe of world
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            summary: pd.dataframe
+                summary of world
+
+        """
+        return self.summarytowers
+
+    @property
+    def summarytowers(self):
+        """ 
+        Get summary dataframe of world
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            summary: pd.dataframe
+                summary of world, built once and copied
+
+        """
+        if "towers" in self.summaries:
+            return self.summaries["towers"].copy()
+        dfs = []
+        for t in self.towers:
+            dfs.append(t.summary["Tower"])
+
+        if len(dfs) != 0:
+            df = pd.concat(dfs)
+            df["Country"] = strings.categorical("country", df["Country"].values)
+            df["County"] = strings.categorical("county", df["County"].values)
+            self.summaries["towers"] = df
+            return df.copy()
+        else:
+            dat = {
+                "name" : [],
+                "place" : [],
+                "dove_id" : [],
+
+                "nbells" : [],
+                "coordinates" : [],
+                "postcode" : [],
+
+                "country" : [],
+                "county" : []
+            }
+            return pd.DataFrame(dat)
+        
+
+    @property
+    def summarybells(self):
+        """ 
+        Get summary dataframe of bells in the world
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            summary: pd.dataframe
+                summary of  bells in the world, built once and copied
+
+        """
+        if "bells" in self.summaries:
+            return self.summaries["bells"].copy()
+        dfs = {}
+
+        bi = 0
+        for b in self.bells:
+            dfs[bi] = b.summary
+            bi += 1
+
+        if len(dfs) != 0:
+            df = pd.DataFrame(dfs).T
+            df = df.set_index("dove_id") 
+            df.index.name = None
+            df.index = np.array(df.index.values, dtype=np.dtype(int))
+            df["note"] = strings.categorical("note", df["note"].values)
+            self.summaries["bells"] = df
+            return df.copy()
+        else:
+            dat = {
+                "N": [],
+                "C": [],
+                "Note": [],
+                "nominal": [],
+                "weight": [],
+                "cwt": [],
+                "diameter": [],
+                "dated" : [],
+                "dove_id" : []
+            }
+            return pd.DataFrame(dat)
+        
+    @property
+    def tuning(self):
+        """ 
+        Tuning of every ring in the world, computed once for all rings and kept.
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            tuning: pd.dataframe
+                ring tuning indexed by tower dove_id, see tuning.ring_tuning
+
+        """
+        if "tuning" not in self.indexes:
+            self.indexes["tuning"] = ring_tuning(self)
+        return self.indexes["tuning"]
+
+    def search_tuning(self, key=None, max_cents=None, min_bells=None, best=None):
+        """ 
+        Search towers by the tuning of their ring
+        
+        Parameters
+        ----------
+            key: str or list
+                key(s) of the ring inferred from the tenor e.g. "D" or "Eb"
+            max_cents: float
+                maximum rms deviation from equal temperament in cents
+            min_bells: int
+                minimum number of bells with a nominal
+            best: int
+                keep only the best in tune towers
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the world containing the towers ordered best in tune first
+        """
+        df = self.tuning
+        mask = np.isfinite(df["score"].values)
+        if key is not None:
+            if type(key) not in [list, np.ndarray]:
+                key = [key]
+            mask &= df["key"].isin(key).values
+        if max_cents is not None:
+            mask &= df["score"].values <= max_cents
+        if min_bells is not None:
+            mask &= df["ntuned"].values >= min_bells
+
+        indexes = np.flatnonzero(mask)
+        indexes = indexes[np.argsort(df["score"].values[indexes], kind="stable")]
+        if best is not None:
+            indexes = indexes[:best]
+        return World([self.towers[index] for index in indexes])
+
+    def similar(self, which, k=10):
+        """ 
+        Towers whose rings are most similar to a tower by number of bells, tenor and weight, 
+        nominal and diameter profiles. Uses a nearest neighbour index built once per world.
+        
+        Parameters
+        ----------
+            which: int or Tower class instance
+                dove_id or tower to match
+            k: int
+                number of similar towers
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the similar towers, most similar first
+        """
+        df = self.similar_batch([which], k)
+        return World([self.towers[index] for index in df["position"].values])
+
+    def similar_batch(self, which, k=10):
+        """ 
+        Towers whose rings are most similar to each of a list of towers
+        
+        Parameters
+        ----------
+            which: list
+                dove_ids or towers to match
+            k: int
+                number of similar towers per tower
+
+        Returns
+        -------
+            matches: pd.dataframe
+                "query" dove_id, "rank", matching "dove_id", its "position" in world.towers and "distance"
+        """
+        if "rings" not in self.indexes:
+            self.indexes["rings"] = RingIndex(self)
+        return self.indexes["rings"].query_batch(which, k)
+
+    def range_index(self, field):
+        """ 
+        Sorted index of the bells of the world on a numeric field, built on first use.
+        
+        Parameters
+        ----------
+            field: str
+                Choices include "cwt", "nominal", "diameter" and "dated"
+
+        Returns
+        -------
+            index: SortedIndex class instance
+                sorted index over the rows of world.bellcolumns
+        """
+        if "bellcolumns" not in self.indexes:
+            self.indexes["bellcolumns"] = self.bellcolumns
+        key = f"range_{field}"
+        if key not in self.indexes:
+            self.indexes[key] = SortedIndex(self.indexes["bellcolumns"][field].values)
+        return self.indexes[key]
+
+    def search_bells(self, field, lo=None, hi=None):
+        """ 
+        Bells with a field between lo and hi inclusive, e.g. ("cwt", 10, 12) or ("dated", 1600, 1650),
+        by binary search of a sorted index.
+        
+        Parameters
+        ----------
+            field: str
+                Choices include "cwt", "nominal", "diameter" and "dated"
+            lo: float
+                lower bound, unbounded if None
+            hi: float
+                upper bound, unbounded if None
+
+        Returns
+        -------
+            bells: pd.dataframe
+                matching rows of world.bellcolumns in order of the field, indexed by position in 
+                world.bells and linked to their tower by "tower" position and "tower_id"
+        """
+        rows = self.range_index(field).range(lo, hi)
+        return self.indexes["bellcolumns"].iloc[rows]
+
+    def search_range(self, field, lo=None, hi=None):
+        """ 
+        Towers with a bell with a field between lo and hi inclusive
+        
+        Parameters
+        ----------
+            field: str
+                Choices include "cwt", "nominal", "diameter" and "dated"
+            lo: float
+                lower bound, unbounded if None
+            hi: float
+                upper bound, unbounded if None
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the world containing the towers of the matching bells
+        """
+        towers = self.search_bells(field, lo, hi)["tower"].values
+        indexes = np.unique(towers)
+        return World([self.towers[index] for index in indexes])
+
+    def set_regions(self, tree):
+        """ 
+        Index the towers of the world by the Dove region hierarchy with precomputed rollups.
+        
+        Parameters
+        ----------
+            tree: RegionTree class instance
+                region tree from regions.csv
+
+        Returns
+        -------
+
+        """
+        self.indexes["regions"] = RegionIndex(tree, self.towers)
+        return
+
+    def region_stats(self, which):
+        """ 
+        Precomputed rollup of a region and all its sub regions, e.g. "Devon", "England" or "Diocese of Exeter"
+        
+        Parameters
+        ----------
+            which: int or str
+                region id or name
+
+        Returns
+        -------
+            stats: dict
+                "name", "towers", "bells", "cwt" total metal weight and "rings", the number of
+                towers with 0 to 16 bells
+        """
+        if "regions" not in self.indexes:
+            print("No region index, call set_regions with a RegionTree")
+            return None
+        return self.indexes["regions"].stats(which)
+
+    def search_region(self, which):
+        """ 
+        Towers in a region and all its sub regions
+        
+        Parameters
+        ----------
+            which: int or str
+                region id or name
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the world containing the towers of the region
+        """
+        if "regions" not in self.indexes:
+            print("No region index, call set_regions with a RegionTree")
+            return World([])
+        ids = self.indexes["regions"].tower_ids(which)
+        indexes = sorted(self.positions[i] for i in ids if i in self.positions)
+        return World([self.towers[index] for index in indexes])
+
+    def set_founders(self, table):
+        """ 
+        Join the bells of the world to the Dove founders table. The founder index is built on first use.
+        
+        Parameters
+        ----------
+            table: FounderTable class instance
+                founders table from founders.csv
+
+        Returns
+        -------
+
+        """
+        self.founder_table = table
+        self.indexes.pop("founders", None)
+        return
+
+    @property
+    def founder_index(self):
+        """ 
+        Inverted index from interned founder id to bells and towers
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            index: FounderIndex class instance
+                founder index over the rows of world.bellcolumns, None without a founders table
+        """
+        if self.founder_table is None:
+            print("No founders table, call set_founders with a FounderTable")
+            return None
+        if "founders" not in self.indexes:
+            if "bellcolumns" not in self.indexes:
+                self.indexes["bellcolumns"] = self.bellcolumns
+            self.indexes["founders"] = FounderIndex(self.founder_table, self.indexes["bellcolumns"])
+        return self.indexes["founders"]
+
+    def search_founder(self, founder, region=None):
+        """ 
+        Bells cast by a founder, optionally within a region, e.g. ("Mears & Stainbank", "Kent")
+        
+        Parameters
+        ----------
+            founder: str or int
+                founder name or id
+            region: int or str
+                region id or name, all regions if None
+
+        Returns
+        -------
+            bells: pd.dataframe
+                matching rows of world.bellcolumns with their "founder_id"
+        """
+        index = self.founder_index
+        if index is None:
+            return None
+        rows = index.bell_rows(founder)
+        if region is not None:
+            if "regions" not in self.indexes:
+                print("No region index, call set_regions with a RegionTree")
+                return None
+            ids = self.indexes["regions"].tower_ids(region)
+            tower_ids = self.indexes["bellcolumns"]["tower_id"].values[rows]
+            rows = rows[np.fromiter((i in ids for i in tower_ids), dtype=bool, count=len(rows))]
+        bells = self.indexes["bellcolumns"].iloc[rows].copy()
+        bells["founder_id"] = index.founder_id[rows]
+        return bells
+
+    def search_caster(self, founder):
+        """ 
+        Towers with a bell cast by a founder
+        
+        Parameters
+        ----------
+            founder: str or int
+                founder name or id
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the world containing the towers of the founder
+        """
+        index = self.founder_index
+        if index is None:
+            return World([])
+        return World([self.towers[i] for i in index.tower_rows(founder)])
+
+    def founders_active(self, start, end=None):
+        """ 
+        Founders active in a year or a period, e.g. 1650 or (1600, 1650)
+        
+        Parameters
+        ----------
+            start: int
+                year
+            end: int
+                end year of the period, a single year if None
+
+        Returns
+        -------
+            founders: pd.dataframe
+                matching rows of the founders table
+        """
+        if self.founder_table is None:
+            print("No founders table, call set_founders with a FounderTable")
+            return None
+        return self.founder_table.active_in(start, end)
+
+    @property
+    def frame_index(self):
+        """ 
+        Indexes of the bell frames of the world by material, maker and date with precomputed statistics
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            index: FrameIndex class instance
+                frame index over the rows of world.framecolumns
+        """
+        if "frames" not in self.indexes:
+            if "bellcolumns" not in self.indexes:
+                self.indexes["bellcolumns"] = self.bellcolumns
+            self.indexes["frames"] = FrameIndex(self.framecolumns, self.indexes["bellcolumns"])
+        return self.indexes["frames"]
+
+    def search_frames(self, material=None, maker=None, lo=None, hi=None):
+        """ 
+        Bell frames by material, maker and date range, e.g. ("oak", None, 1600, 1700)
+        
+        Parameters
+        ----------
+            material: str
+                frame material, e.g. "cast iron" or "oak"
+            maker: str
+                frame maker, e.g. "John Taylor & Co"
+            lo: float
+                earliest frame date, unbounded if None
+            hi: float
+                latest frame date, unbounded if None
+
+        Returns
+        -------
+            frames: pd.dataframe
+                matching rows of world.framecolumns
+        """
+        index = self.frame_index
+        return index.frames.iloc[index.rows(material, maker, lo, hi)]
+
+    def frame_bells(self, frame_ids):
+        """ 
+        Bells hung in the given frames
+        
+        Parameters
+        ----------
+            frame_ids: list
+                Dove frame ids
+
+        Returns
+        -------
+            bells: pd.dataframe
+                matching rows of world.bellcolumns
+        """
+        if type(frame_ids) not in [list, np.ndarray]:
+            frame_ids = [frame_ids]
+        rows = self.frame_index.bell_rows(frame_ids)
+        return self.indexes["bellcolumns"].iloc[rows]
+
+    @property
+    def frame_stats(self):
+        """ 
+        Precomputed frame statistics of the world
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            stats: dict
+                "material", "maker", "trusses" and "pits" dataframes of frame counts and date ranges
+        """
+        index = self.frame_index
+        return {
+            "material" : index.by_material,
+            "maker" : index.by_maker,
+            "trusses" : index.by_truss,
+            "pits" : index.by_pits,
+        }
+
+    @property
+    def tower_graph(self):
+        """ 
+        Neighbour graph of the towers, each linked to its 16 nearest towers and every tower within 16 km.
+        Loaded from graph_file when it matches the towers, otherwise built and saved there.
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            graph: TowerGraph class instance
+                neighbour graph, rows in the same order as world.towers
+        """
+        if "graph" not in self.indexes:
+            ids = np.array([t.dove_id for t in self.towers])
+            lat = np.array([np.nan if t.coordinates is None else t.coordinates.lat for t in self.towers], dtype=float)
+            long = np.array([np.nan if t.coordinates is None else t.coordinates.long for t in self.towers], dtype=float)
+            graph = None
+            if self.graph_file is not None and os.path.exists(self.graph_file):
+                graph = TowerGraph.load(self.graph_file)
+                if not (np.array_equal(graph.ids, ids) and np.allclose(graph.lat, lat, equal_nan=True) and np.allclose(graph.long, long, equal_nan=True)):
+                    print("Saved tower graph is out of date, rebuilding")
+                    graph = None
+            if graph is None:
+                graph = TowerGraph(ids, lat, long)
+                if self.graph_file is not None:
+                    graph.save(self.graph_file)
+            self.indexes["graph"] = graph
+        return self.indexes["graph"]
+
+    def neighbours(self, dove_id, k=None, radius=None):
+        """ 
+        Towers nearest to a tower
+        
+        Parameters
+        ----------
+            dove_id: int
+                dove tower id number
+            k: int
+                number of nearest towers, at most 16 unless within the graph radius
+            radius: float
+                distance limit in km
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the neighbouring towers, nearest first
+        """
+        dove_id = self.resolve_ids([dove_id])[0]
+        if dove_id not in self.positions:
+            print(f"No tower with dove_id {dove_id}")
+            return World([])
+        graph = self.tower_graph
+        row = self.positions[dove_id]
+        idx = graph.indices[graph.indptr[row]:graph.indptr[row+1]]
+        dist = graph.distances[graph.indptr[row]:graph.indptr[row+1]]
+        if radius is not None:
+            if radius > graph.radius:
+                print(f"Radius {radius} km is beyond the {graph.radius} km graph, only the {graph.k} nearest are complete")
+            idx = idx[dist <= radius]
+        if k is not None:
+            idx = idx[:k]
+        return World([self.towers[index] for index in idx])
+
+    def tower_components(self, radius=5, min_size=2):
+        """ 
+        Groups of towers linked by hops between neighbouring towers no longer than radius
+        
+        Parameters
+        ----------
+            radius: float
+                hop length in km
+            min_size: int
+                smallest group returned
+
+        Returns
+        -------
+            worlds: WorldGroups class instance
+                list like of the world of each group, largest first, built on first access
+        """
+        labels = self.tower_graph.components(radius)
+        return self.label_worlds(labels, min_size)
+
+    def tower_clusters(self, eps=5, min_samples=3, min_size=2):
+        """ 
+        Density clusters of towers with at least min_samples other towers within eps
+        
+        Parameters
+        ----------
+            eps: float
+                neighbourhood radius in km
+            min_samples: int
+                towers within eps of a core tower
+            min_size: int
+                smallest cluster returned
+
+        Returns
+        -------
+            worlds: WorldGroups class instance
+                list like of the world of each cluster, largest first, built on first access.
+                Towers outside any cluster are left out
+        """
+        labels = self.tower_graph.clusters(eps, min_samples)
+        return self.label_worlds(labels, min_size)
+
+    def label_worlds(self, labels, min_size=1):
+        """ 
+        Split the world by group labels
+        
+        Parameters
+        ----------
+            labels: np.array
+                group of each tower, from 0 largest first, -1 for none
+            min_size: int
+                smallest group returned
+
+        Returns
+        -------
+            worlds: WorldGroups class instance
+                list like of the world of each group, each built on first access
+        """
+        keep = labels >= 0
+        if not keep.any():
+            return WorldGroups(self, [])
+        rows = np.flatnonzero(keep)
+        rows = rows[np.argsort(labels[rows], kind="stable")]
+        counts = np.bincount(labels[rows])
+        groups = np.split(rows, np.cumsum(counts)[:-1])
+        return WorldGroups(self, [g for g in groups if len(g) >= min_size])
+
+    @property
+    def flag_index(self):
+        """ 
+        Bitwise index of the practice nights and facilities of the towers
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            index: FlagIndex class instance
+                flag index, rows in the same order as world.towers
+        """
+        if "flags" not in self.indexes:
+            practices = [t.practice for t in self.towers]
+            #Towers pickled before the flags were parsed at ingest
+            parsed = practice_masks(practices)
+            self.indexes["flags"] = FlagIndex(
+                [getattr(t, "practice_days", p) for t, p in zip(self.towers, parsed)],
+                [getattr(t, "facilities", 0) for t in self.towers],
+                [np.nan if t.coordinates is None else t.coordinates.lat for t in self.towers],
+                [np.nan if t.coordinates is None else t.coordinates.long for t in self.towers],
+            )
+        return self.indexes["flags"]
+
+    def search_flags(self, days=None, has=None, lacks=None, near=None, radius=None):
+        """ 
+        Search towers by practice night, facilities and distance,
+        e.g. search_flags("Wed", has="ground_floor", lacks="unringable", near=12574, radius=16)
+        
+        Parameters
+        ----------
+            days: str or list
+                practice on any of these weekdays, e.g. "Wed"
+            has: str or list
+                facilities required, from "ground_floor", "toilet", "simulator" and "unringable"
+            lacks: str or list
+                facilities excluded, e.g. "unringable" for ringable towers
+            near: Coords, tuple or int
+                centre coordinates, (lat, long) or dove_id
+            radius: float
+                distance from near in km
+
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the matching towers
+        """
+        if isinstance(near, Coords):
+            near = (near.lat, near.long)
+        elif near is not None and not isinstance(near, tuple):
+            dove_id = self.resolve_ids([near])[0]
+            if dove_id not in self.positions:
+                print(f"No tower with dove_id {near}")
+                return World([])
+            near = self.towers[self.positions[dove_id]].coordinates
+            near = (near.lat, near.long)
+        indexes = np.flatnonzero(self.flag_index.mask(days, has, lacks, near, radius))
+        return World([self.towers[index] for index in indexes])
+
+    @property
+    def guild_index(self):
+        """ 
+        Inverted index from guilds to the towers of the world, with per guild rollups
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            index: GuildIndex class instance
+                guild index, rows in the same order as world.towers
+        """
+        if "guilds" not in self.indexes:
+            #Towers pickled before the affiliations were split at ingest
+            guilds = [getattr(t, "guilds", None) for t in self.towers]
+            guilds = [split_affiliations(t.affiliation) if g is None else g for t, g in zip(self.towers, guilds)]
+            self.indexes["guilds"] = GuildIndex(
+                guilds,
+                [len(t.bells) for t in self.towers],
+                [np.nansum([b.cwt for b in t.bells]) if len(t.bells) > 0 else 0 for t in self.towers],
+                [len(t.bells) > 0 and not getattr(t, "facilities", 0) & facility_bits("unringable") for t in self.towers],
+            )
+        return self.indexes["guilds"]
+
+    def search_guild(self, guild):
+        """ 
+        Search towers affiliated to a guild or association
+        
+        Parameters
+        ----------
+            guild: str or list
+                guild names, e.g. "Yorkshire Association", case ignored
 
-        indexes = self.lookup[self.lookup[which].isin(search)].index.values
-        indexes = list(set(indexes)) #Make sure unique
+        Returns
+        -------
+            world: class instance of the world
+                world class instance of the guild towers
+        """
+        indexes = self.guild_index.rows(guild)
         return World([self.towers[index] for index in indexes])
 
-    def create_lookup(self):
+    @property
+    def guild_stats(self):
         """ 
-        Create dictionary lookup table in world class
+        Per guild rollups of the world
         
         Parameters
         ----------
 
         Returns
         -------
-
+            stats: pd.dataframe
+                "guild", "towers", "bells", "ringable" towers and total "cwt", most towers first
         """
-        dat = {
-            "name" : [],
-            "place" : [],
-            "dove_id" : [],
+        return self.guild_index.rollups
 
-            "nbells" : [],
-            "coordinates" : [],
-            "postcode" : [],
+    def add_tower(self, tower):
+        """ 
+        Add a tower to the world, replacing any tower with the same dove_id. The region rollups and neighbour graph are updated in place, other indexes are rebuilt on next use.
+        
+        Parameters
+        ----------
+            tower: Tower class instance
+                tower to add
 
-            "country" : [],
-            "county" : []
-        }
-        for t in self.towers:
-            if t.name is not None:
-                dat["name"].append(str(t.name).lower())
-            else:
-                dat["name"].append(None)
+        Returns
+        -------
 
-            if t.place is not None:
-                dat["place"].append(str(t.place).lower())
-            else:
-                dat["place"].append(None)
+        """
+        self.update_towers([tower])
+        return
 
-            if t.dove_id is not None:
-                dat["dove_id"].append(t.dove_id)
-            else:
-                dat["dove_id"].append(None)
+    def remove_tower(self, dove_id):
+        """ 
+        Remove a tower from the world. The region rollups and neighbour graph are updated in place, other indexes are rebuilt on next use.
+        
+        Parameters
+        ----------
+            dove_id: int
+                dove tower id number
 
-            if t.Nbells is not None:
-                dat["nbells"].append(t.Nbells)
-            else:
-                dat["nbells"].append(None)
+        Returns
+        -------
 
-            if t.coordinates is not None:
-                dat["coordinates"].append(t.coordinates)
-            else:
-                dat["coordinates"].append(None)
+        """
+        if dove_id not in self.positions:
+            print(f"No tower with dove_id {dove_id}")
+            return
+        self.update_towers([], [dove_id])
+        return
 
-            if t.postcode is not None:
-                dat["postcode"].append(t.postcode)
-            else:
-                dat["postcode"].append(None)
+    def update_towers(self, towers, remove=[]):
+        """ 
+        Remove and add towers in one pass, e.g. to apply a changeset. The region rollups and neighbour graph
+        are updated in place, other indexes are rebuilt on next use.
+        
+        Parameters
+        ----------
+            towers: list
+                tower class instances to add, replacing towers with the same dove_id
+            remove: list
+                dove_ids of towers to remove first
 
-            if t.country is not None:
-                dat["country"].append(str(t.country).lower())
-            else:
-                dat["country"].append(None)
+        Returns
+        -------
 
-            if t.county is not None:
-                dat["county"].append(str(t.county).lower())
-            else:
-                dat["county"].append(None)
-            
-        self.lookup = pd.DataFrame(dat)
+        """
+        #One tower per dove_id, the last given
+        towers = list({t.dove_id : t for t in towers}.values())
+        remove = set(remove) | set(t.dove_id for t in towers)
+        removed = [t for t in self.towers if t.dove_id in remove]
+        self.towers = [t for t in self.towers if t.dove_id not in remove] + list(towers)
+        self.bells = [bell for t in self.towers for bell in t.bells]
+        self.create_lookup()
+        self.clear_cache()
+        regions = self.indexes.get("regions")
+        graph = self.indexes.get("graph")
+        self.indexes = {}
+        if regions is not None:
+            for t in removed:
+                regions.remove_tower(t)
+            for t in towers:
+                regions.add_tower(t)
+            self.indexes["regions"] = regions
+        if graph is not None:
+            graph.remove([t.dove_id for t in removed])
+            if len(towers) > 0:
+                graph.add(
+                    [t.dove_id for t in towers],
+                    [np.nan if t.coordinates is None else t.coordinates.lat for t in towers],
+                    [np.nan if t.coordinates is None else t.coordinates.long for t in towers],
+                )
+            self.indexes["graph"] = graph
         return
 
     @property
-    def summary(self):
+    def towercolumns(self):
         """ 
-        Get summary dataframe of world
+        Get columnar dataframe of the towers in the world built in a single pass.
+        Rows are in the same order as world.towers.
         
         Parameters
         ----------
 
         Returns
         -------
-            summary: pd.dataframe
-                summary of world
+            columns: pd.dataframe
+                per tower columns of the world
 
         """
-        return self.summarytowers
+        dat = {
+            "dove_id" : [],
+            "name" : [],
+            "place" : [],
+            "nbells" : [],
+            "cwt" : [],
+            "lat" : [],
+            "long" : [],
+            "x" : [],
+            "y" : [],
+            "postcode" : [],
+            "country" : [],
+            "county" : []
+        }
+        for t in self.towers:
+            dat["dove_id"].append(t.dove_id)
+            dat["name"].append(t.name)
+            dat["place"].append(t.place)
+            dat["nbells"].append(t.Nbells)
+            dat["cwt"].append(t.tenor.cwt)
+            if t.coordinates is not None:
+                dat["lat"].append(t.coordinates.lat)
+                dat["long"].append(t.coordinates.long)
+                dat["x"].append(t.coordinates.x)
+                dat["y"].append(t.coordinates.y)
+            else:
+                dat["lat"].append(np.nan)
+                dat["long"].append(np.nan)
+                dat["x"].append(np.nan)
+                dat["y"].append(np.nan)
+            dat["postcode"].append(t.postcode)
+            dat["country"].append(t.country)
+            dat["county"].append(t.county)
+        return pd.DataFrame(dat)
 
     @property
-    def summarytowers(self):
+    def bellcolumns(self):
         """ 
-        Get summary dataframe of world
+        Get columnar dataframe of the bells in the world built in a single pass.
+        The "tower" column is the position of the parent tower in world.towers.
         
         Parameters
         ----------
 
         Returns
         -------
-            summary: pd.dataframe
-                summary of world
+            columns: pd.dataframe
+                per bell columns of the world
 
         """
-        dfs = []
-        for t in self.towers:
-            dfs.append(t.summary["Tower"])
+        dat = {
+            "tower" : [],
+            "tower_id" : [],
+            "dove_id" : [],
+            "N" : [],
+            "nominal" : [],
+            "cwt" : [],
+            "diameter" : [],
+            "dated" : [],
+            "caster" : [],
+            "founder" : [],
+            "frame_id" : []
+        }
+        for ti, t in enumerate(self.towers):
+            for b in t.bells:
+                dat["tower"].append(ti)
+                dat["tower_id"].append(t.dove_id)
+                dat["dove_id"].append(b.dove_id)
+                dat["N"].append(b.N)
+                dat["nominal"].append(np.nan if b.nominal is None else b.nominal)
+                dat["cwt"].append(b.cwt)
+                dat["diameter"].append(b.diameter)
+                dat["dated"].append(np.nan if b.dated is None else b.dated)
+                dat["caster"].append(b.caster)
+                dat["founder"].append(b.founder)
+                dat["frame_id"].append(b.frame_id)
+        df = pd.DataFrame(dat)
+        for col in ["nominal", "cwt", "diameter", "dated", "frame_id"]:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        for col in ["caster", "founder"]:
+            df[col] = strings.categorical(col, df[col].values)
+        return df
 
-        if len(dfs) != 0:
-            return pd.concat(dfs)
-        else:
-            dat = {
-                "name" : [],
-                "place" : [],
-                "dove_id" : [],
+    @property
+    def framecolumns(self):
+        """ 
+        Get columnar dataframe of the bell frames in the world built in a single pass.
+        The "tower" column is the position of the parent tower in world.towers.
+        
+        Parameters
+        ----------
 
-                "nbells" : [],
-                "coordinates" : [],
-                "postcode" : [],
+        Returns
+        -------
+            columns: pd.dataframe
+                per frame columns of the world
 
-                "country" : [],
-                "county" : []
-            }
-            return pd.DataFrame(dat)
+        """
+        fields = [
+            "tower_id", "number", "dated", "date_flag", "materials", "maker", "maker_uncertain", "listed",
+            "trusses", "truss_group", "truss_subgroup", "truss_type", "truss_variant",
+            "layout", "pits", "arrangement", "resultant_layout", "extensions"
+        ]
+        dat = {"tower" : [], "frame_id" : [], "material" : [], **{f : [] for f in fields}}
+        for ti, t in enumerate(self.towers):
+            for f in t.frames:
+                dat["tower"].append(ti)
+                dat["frame_id"].append(f.dove_id)
+                dat["material"].append(f.material)
+                for field in fields:
+                    dat[field].append(getattr(f, field))
+        df = pd.DataFrame(dat)
+        for col in ["dated", "truss_group", "truss_subgroup", "pits", "extensions"]:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        return df
         
+class WorldGroups:
+    def __init__(
+        self,
+        world,
+        groups,
+    ):
+        """ 
+        Groups of the towers of a world, e.g. its neighbour graph components. Behaves as a list of
+        worlds, building the world of a group only when it is accessed.
+
+        Parameters
+        ----------
+            world: class instance of the world
+                world the groups are taken from
+            groups: list
+                np.array of the positions in world.towers of each group
+
+        """
+        #The tower list at the time of grouping, update_towers replaces rather than edits it
+        self.towers = world.towers
+        self.positions = groups
+        self.worlds = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = range(len(self))[i]
+        if i not in self.worlds:
+            self.worlds[i] = World([self.towers[index] for index in self.positions[i]])
+        return self.worlds[i]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
 
     @property
-    def summarybells(self):
+    def sizes(self):
         """ 
-        Get summary dataframe of bells in the world
-        
+        Number of towers of each group, without building the worlds.
+
         Parameters
         ----------
 
         Returns
         -------
-            summary: pd.dataframe
-                summary of  bells in the world
-
+            sizes: np.array
+                towers per group
         """
-        dfs = {}
+        return np.array([len(g) for g in self.positions], dtype=int)
 
-        bi = 0
-        for b in self.bells:
-            dfs[bi] = b.summary
-            bi += 1
+    def dove_ids(self, i):
+        """ 
+        dove_ids of the towers of a group, without building its world.
+
+        Parameters
+        ----------
+            i: int
+                group number
+
+        Returns
+        -------
+            dove_ids: list
+                tower dove_ids
+        """
+        return [self.towers[index].dove_id for index in self.positions[i]]
 
-        if len(dfs) != 0:
-            df = pd.DataFrame(dfs).T
-            df = df.set_index("dove_id") 
-            df.index.name = None
-            df.index = np.array(df.index.values, dtype=np.dtype(int))
-            return df
-        else:
-            dat = {
-                "N": [],
-                "C": [],
-                "Note": [],
-                "nominal": [],
-                "weight": [],
-                "cwt": [],
-                "diameter": [],
-                "dated" : [],
-                "dove_id" : []
-            }
-            return pd.DataFrame(dat)
-        
 ####################################################################################################
                  ############################ Bell Class ############################ 
 ####################################################################################################
@@ -434,11 +1941,30 @@ class Bell:
         lbs = int(np.round((quaters-int_quarts)*28))
         return f"{int_cwt}-{int_quarts}-{lbs}"
 
+    def tone(self, duration=1, synth=None):
+        """ 
+        Synthesised tone of the bell from its hum, prime, tierce, quint and nominal partials.
+        
+        Parameters
+        ----------
+            duration: float
+                Duration in seconds
+            synth: BellSynth class instance
+                synthesis engine, the shared default engine and its cache if None
+
+        Returns
+        -------
+            samples: np.array
+                float32 samples of the tone
+        """
+        if synth is None:
+            synth = default_synth
+        return synth.render_bells([self], duration)[0]
+
     @property
     def chimebell(self, duration=1):
         """ 
-        Chime the bell. Produce audio output at the nominal frequency.
-        #TODO Make more realistic?
+        Chime the bell. Queue the synthesised bell tone on the shared player and return immediately.
         
         Parameters
         ----------
@@ -449,22 +1975,7 @@ class Bell:
         -------
 
         """
-        p = pyaudio.PyAudio()
-        volume = 0.5     # range [0.0, 1.0]
-        fs = 44100       # sampling rate, Hz, must be integer
-        f = self.nominal      # sine frequency, Hz, may be float
-        # generate samples, note conversion to float32 array
-        samples = (np.sin(2*np.pi*np.arange(fs*duration)*f/fs)).astype(np.float32)
-        # for paFloat32 sample values must be in range [-1.0, 1.0]
-        stream = p.open(format=pyaudio.paFloat32,
-                        channels=1,
-                        rate=fs,
-                        output=True)
-        # play. May repeat with different volume values (if done interactively) 
-        stream.write(volume*samples)
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+        get_player().play(self.tone(duration))
         return
 
     @property
@@ -493,6 +2004,151 @@ class Bell:
             "dove_id" : self.dove_id
         }
         
+####################################################################################################
+                 ############################ Frame Class ############################ 
+####################################################################################################
+
+class Frame:
+    def __init__(
+        self, 
+        dove_id = None,
+        tower_id = None,
+        number = None,
+
+        dated = None,
+        date_flag = None,
+
+        materials = [],
+        maker = None,
+        maker_uncertain = False,
+        listed = False,
+
+        trusses = None,
+        truss_group = None,
+        truss_subgroup = None,
+        truss_type = None,
+        truss_variant = None,
+
+        layout = None,
+        pits = None,
+        arrangement = None,
+        resultant_layout = None,
+
+        extensions = None
+    ):
+        """ 
+        Create bell frame class instance
+        
+        Parameters
+        ----------
+            dove_id: int
+                dove frame id number
+            tower_id: int
+                dove tower id number of the tower the frame is in
+            number: str
+                frame number within the tower
+            dated: int
+                year of the frame
+            date_flag: str
+                "c" circa, "<" before, None if exact
+            materials: list
+                frame materials, e.g. ["cast iron", "steel"]
+            maker: str
+                frame maker
+            maker_uncertain: bool
+                maker attribution is uncertain
+            listed: bool
+                frame is listed
+            trusses: str
+                truss code, e.g. "8.3.A.h"
+            truss_group: int
+                leading number of the truss code
+            truss_subgroup: int
+                second number of the truss code
+            truss_type: str
+                letter of the truss code
+            truss_variant: str
+                trailing letters of the truss code
+            layout: str
+                layout code, e.g. "6.1"
+            pits: int
+                number of bell pits from the layout code
+            arrangement: str
+                arrangement of the pits from the layout code
+            resultant_layout: str
+                layout after extensions
+            extensions: int
+                number of extensions
+
+        Returns
+        -------
+
+        """
+        self.dove_id = dove_id
+        self.tower_id = tower_id
+        self.number = number
+
+        self.dated = dated
+        self.date_flag = date_flag
+
+        self.materials = materials
+        self.maker = maker
+        self.maker_uncertain = maker_uncertain
+        self.listed = listed
+
+        self.trusses = trusses
+        self.truss_group = truss_group
+        self.truss_subgroup = truss_subgroup
+        self.truss_type = truss_type
+        self.truss_variant = truss_variant
+
+        self.layout = layout
+        self.pits = pits
+        self.arrangement = arrangement
+        self.resultant_layout = resultant_layout
+
+        self.extensions = extensions
+
+    @property
+    def material(self):
+        """ 
+        First listed material of the frame
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            material: str
+                frame material, None if unknown
+
+        """
+        return self.materials[0] if len(self.materials) > 0 else None
+
+    @property
+    def summary(self):
+        """ 
+        Get summary dataframe of frame
+        
+        Parameters
+        ----------
+
+        Returns
+        -------
+            summary: pd.dataframe
+                summary of frame
+
+        """
+        return {
+            "number": self.number,
+            "dated": self.dated,
+            "material": self.material,
+            "maker": self.maker,
+            "trusses": self.trusses,
+            "layout": self.layout,
+            "dove_id": self.dove_id
+        }
+
 ####################################################################################################
                  ############################ Tower Class ############################ 
 ####################################################################################################
@@ -513,13 +2169,18 @@ class Tower:
 
         country = None,
         county = None,
+        region = None,
         diocese = None,
         affiliation = None,
 
         practice = None,
         LGrade = None,
 
-        frames = []
+        frames = [],
+
+        practice_days = None,
+        facilities = 0,
+        guilds = None
     ):
         """ 
         Create tower class instance
@@ -537,13 +2198,15 @@ class Tower:
             coordinates: coords class instance
                 coordinates of tower 
             postcode: str
-                postcode of tower
+                postcode of tower, normalised to the "DH1 3EL" form at ingest
             grid_reference: str
                 map grid reference of tower
             country: str
                 country location of tower 
             county: str
                 county location of tower
+            region: str
+                most specific Dove region of tower, e.g. council area
             diocese: str
                 associated diocese of tower
             affiliation: str
@@ -554,6 +2217,12 @@ class Tower:
                 tower listed grade information
             frames: list
                 list of frames in tower
+            practice_days: int
+                weekday bits of the practice nights, Mon = 1 ... Sun = 64, parsed from practice if None
+            facilities: int
+                facility bits, ground floor = 1, toilet = 2, simulator = 4, unringable = 8
+            guilds: tuple
+                guild names, split from affiliation if None
         Returns
         -------
 
@@ -570,6 +2239,7 @@ class Tower:
 
         self.country = country
         self.county = county
+        self.region = region
         self.diocese = diocese
         self.affiliation = affiliation
 
@@ -577,6 +2247,14 @@ class Tower:
         self.LGrade = LGrade
         
         self.frames = frames
+
+        if practice_days is None:
+            practice_days = practice_mask(practice)
+        self.practice_days = practice_days
+        self.facilities = facilities
+        if guilds is None:
+            guilds = split_affiliations(affiliation)
+        self.guilds = guilds
         
         
     def add_bell(self, bell):
@@ -743,28 +2421,86 @@ class Tower:
         """
         return len([bell.N for bell in self.bells])
 
-    def ring_change(self, sequence=[]):
+    def render_change(self, rows, gapsize=0.2, handstroke_gap=1.0, duration=2, synth=None):
         """ 
-        Ring the change in the tower. Produce audio output at the nominal frequencies.
-        #TODO Make more realistic?
+        Render rows of changes into one audio buffer. Rows alternate handstroke and backstroke
+        with an open handstroke lead.
         
         Parameters
         ----------
-            sequence: list
-                integer order of bells
+            rows: np.array
+                (Nrows, Nplaces) bell numbers in striking order
+            gapsize: float
+                gap between blows in seconds
+            handstroke_gap: float
+                handstroke lead in blows
+            duration: float
+                duration of each bell tone in seconds
+            synth: BellSynth class instance
+                synthesis engine, the shared default engine if None
 
         Returns
         -------
-
+            samples: np.array
+                float32 samples of the touch
         """
-        if len(sequence) == 0:
-            sequence = [i for i in range(1,self.Nbells+1)]
+        if synth is None:
+            synth = default_synth
+        rows = np.atleast_2d(np.asarray(rows, dtype=int))
+        numbers = np.unique(rows)
+        bells = [self.get_bell(int(N)) for N in numbers]
+        tones = synth.render_bells([b if b is not None else Bell() for b in bells], duration)
+
+        onsets = strike_times(rows.shape[0], rows.shape[1], gapsize, handstroke_gap)
+        which = np.searchsorted(numbers, rows)
+        return synth.mix_strikes(tones, which.ravel(), onsets.ravel())
+
+    def ring_change(self, sequence=[], method=None, calling=None, gapsize=0.2, handstroke_gap=1.0, play=True):
+        """ 
+        Ring the change in the tower. Produce audio output of the synthesised bells.
+        
+        Parameters
+        ----------
+            sequence: list
+                integer order of bells, or a list of such rows
+            method: str or Method class instance
+                method to ring instead of the sequence, e.g. "plain bob" or "grandsire" on the tower's bells.
+                Grandsire on an even number of bells is rung with the tenor covering
+            calling: str
+                call per lead of the method, e.g. "p-p-ps"
+            gapsize: float
+                gap between blows in seconds
+            handstroke_gap: float
+                handstroke lead in blows
+            play: bool
+                queue the audio on the shared player, returns without waiting for it to finish
 
-        gapsize=0.2 #seconds
-        for place in sequence:
-            bell = self.get_bell(place)
-            bell.chimebell
-        return
+        Returns
+        -------
+            samples: np.array
+                float32 samples of the touch
+        """
+        if method is not None:
+            if isinstance(method, str):
+                stage = self.Nbells
+                if method.lower() == "grandsire" and stage % 2 == 0:
+                    #Rung on the odd stage below, the tenor covering
+                    stage -= 1
+                method = get_method(method, stage)
+            rows = Touch(method, calling=calling).array()
+            if method.stage < self.Nbells:
+                #Covering bells stay at the back
+                cover = np.arange(method.stage+1, self.Nbells+1)
+                rows = np.hstack([rows, np.tile(cover, (len(rows), 1))])
+        else:
+            if len(sequence) == 0:
+                sequence = [i for i in range(1,self.Nbells+1)]
+            rows = np.atleast_2d(sequence)
+
+        samples = self.render_change(rows, gapsize=gapsize, handstroke_gap=handstroke_gap)
+        if play:
+            get_player().play(samples)
+        return samples
 
     @property
     def summary(self):
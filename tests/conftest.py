@@ -0,0 +1,7 @@
+import os
+import sys
+
+#bellpedia reads its config from the parent of the working directory, as when run from Notebooks
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+os.chdir(tests_dir)
+sys.path.insert(0, os.path.dirname(tests_dir))
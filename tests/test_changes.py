@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from bellpedia.changes import ChangeLog, parse_changes
+
+def changes(descriptions):
+    return pd.DataFrame({
+        "Date" : [f"2020-01-{i+1:02d}" for i in range(len(descriptions))],
+        "TowerID" : np.arange(len(descriptions)),
+        "Place" : "Somewhere",
+        "Region" : "Somewhere",
+        "Description of change" : descriptions,
+        "Source" : None,
+        "Route" : None,
+    })
+
+def test_only_completed_augmentations():
+    events = parse_changes(changes([
+        "Augmented from six to eight",
+        "Rehung and augmented to 10",
+        "Ring being augmented from three to four",
+        "Bells will be augmented to eight",
+        "Fundraising to augment to six",
+        "Augmentation to eight planned",
+        "Project completed to augment the ring to 8",
+        "Augmented to 6. Hanging in progress",
+    ]))
+    assert events["kind"].tolist() == ["augmented", "augmented", "project", "project", "project", "project", "augmented", "augmented"]
+    assert events["bells_to"].tolist()[:2] == [8, 10]
+    assert events["bells_to"].isna().values[2:6].all()
+
+def test_ring_counts_undo_completed_augmentations():
+    log = ChangeLog(parse_changes(changes(["Augmented from six to eight", "Ring being augmented from three to four"])))
+    counts = log.ring_counts("2019-12-31", pd.Series([8, 3], index=[0, 1]))
+    assert counts.tolist() == [6, 3]
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from bellpedia.diff import diff_table, row_hashes
+
+def test_int_and_float_columns_hash_the_same():
+    old = pd.DataFrame({"key" : [1, 2], "w" : [6, 7]})
+    new = pd.DataFrame({"key" : [1, 2], "w" : [6.0, 7.0]})
+    assert (row_hashes(old, ["w"]) == row_hashes(new, ["w"])).all()
+
+def test_missing_value_only_changes_its_row():
+    old = pd.DataFrame({"key" : [1, 2], "w" : [6, 7]})
+    new = pd.DataFrame({"key" : [1, 2, 3], "w" : [6, 7, np.nan]})
+    diff = diff_table(old, new, "key", ["w"])
+    assert diff["key"].tolist() == [3]
+    assert diff["change"].tolist() == ["added"]
+
+def test_modified_columns():
+    old = pd.DataFrame({"key" : [1, 2], "w" : [6, 7], "name" : ["a", "b"]})
+    new = pd.DataFrame({"key" : [1, 2], "w" : [6.0, 8.0], "name" : ["a", "b"]})
+    diff = diff_table(old, new, "key", ["w", "name"])
+    assert diff["key"].tolist() == [2]
+    assert diff["columns"].tolist() == [["w"]]
@@ -0,0 +1,18 @@
+import numpy as np
+
+from bellpedia.flags import day_bits, practice_mask, practice_masks
+
+practices = [
+    "Tue (following 1st and 3rd Sunday)",
+    "Fri (Friday before 2nd Sunday: check)",
+    "Mon 19:00 & Tue (2nd)",
+    "Sat (alt) 13:30",
+    None,
+]
+expected = [day_bits("Tue"), day_bits("Fri"), day_bits(["Mon", "Tue"]), day_bits("Sat"), 0]
+
+def test_practice_mask_ignores_notes():
+    assert [practice_mask(p) for p in practices] == expected
+
+def test_practice_masks_match_practice_mask():
+    assert np.array_equal(practice_masks(practices), expected)
@@ -0,0 +1,18 @@
+import numpy as np
+
+from bellpedia.indexes import IntervalIndex
+
+def test_overlap_matches_a_scan():
+    rng = np.random.default_rng(0)
+    starts = rng.integers(1500, 2000, 500).astype(float)
+    ends = starts + rng.integers(0, 80, 500)
+    starts[::50] = np.nan
+    index = IntervalIndex(starts, ends, np.arange(500))
+    for lo, hi in [(1600, None), (1700, 1710), (1400, 1450), (1400, 2100), (2050, None)]:
+        top = lo if hi is None else hi
+        expected = np.flatnonzero(np.isfinite(starts) & (starts <= top) & (ends >= lo))
+        expected = expected[np.argsort(starts[expected], kind="stable")]
+        assert np.array_equal(index.overlap(lo, hi), expected)
+
+def test_empty():
+    assert len(IntervalIndex([], [], []).overlap(1800)) == 0
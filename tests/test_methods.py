@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from bellpedia.methods import Touch, get_method, methods, extent, extent_callings, change_perm
+
+stages = {"plain hunt" : [5, 6, 7, 8], "plain bob" : [5, 6, 7, 8], "grandsire" : [5, 7]}
+#Touches of each method and stage, with plain leads ("p"), bobs ("-") and singles ("s")
+callings = ["p", "-", "s", "ss", "ps", "sp"]
+
+def touches():
+    for name in methods:
+        for stage in stages[name]:
+            for calling in (callings if name != "plain hunt" else [None]):
+                yield name, stage, calling
+
+@pytest.mark.parametrize("name,stage,calling", list(touches()))
+def test_touch_true_and_comes_round(name, stage, calling):
+    touch = Touch(get_method(name, stage), calling=calling)
+    rows = touch.array()
+    assert np.array_equal(rows[-1], rows[0])
+    assert touch.is_true()
+    #No change repeats a row
+    assert (np.diff(rows, axis=0) != 0).any(axis=1).all()
+
+@pytest.mark.parametrize("name,stage", list(extent_callings))
+def test_extents(name, stage):
+    rows = extent(name, stage)
+    assert np.array_equal(rows[-1], rows[0])
+    assert len(np.unique(rows[:-1], axis=0)) == np.prod(np.arange(1, stage+1))
+
+@pytest.mark.parametrize("name,stage", [(n, s) for n in ["plain bob", "grandsire"] for s in stages[n]])
+def test_calls_move_bells(name, stage):
+    method = get_method(name, stage)
+    for call in method.calls:
+        #A change making every place repeats the row
+        for places in method.lead_changes(None, call):
+            assert not np.array_equal(change_perm(places, stage), np.arange(stage))
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from bellpedia.routes import RoutePlanner, plan_days, plan_feasible, practice_windows, to_minutes
+
+def points(N, seed=0):
+    rng = np.random.default_rng(seed)
+    return 54.0 + rng.uniform(0, 0.5, N), -1.5 + rng.uniform(0, 0.8, N)
+
+@pytest.mark.parametrize("start", [None, (54.2, -1.2)])
+def test_order_is_a_permutation(start):
+    lat, long = points(40)
+    order = RoutePlanner(lat, long, start).solve()
+    assert sorted(order) == list(range(40))
+    if start is None:
+        assert order[0] == 0
+
+@pytest.mark.parametrize("seed", range(5))
+def test_never_worse_than_nearest_neighbour(seed):
+    lat, long = points(30, seed)
+    planner = RoutePlanner(lat, long, (54.2, -1.2))
+    tour = planner.construct()
+    assert planner.cost(planner.improve(tour)) <= planner.cost(tour) + 1e-9
+
+def test_time_windows():
+    #Three towers due east of the start, the furthest closes first
+    lat = np.full(3, 54.0)
+    long = np.array([-1.0 + 0.015, -1.0 + 0.03, -1.0 + 0.045])
+    windows = np.array([[np.nan, np.nan], [np.nan, np.nan], [to_minutes("09:00"), to_minutes("09:15")]])
+    planner = RoutePlanner(lat, long, (54.0, -1.0), windows=windows, start_time="09:00")
+    order = planner.solve()
+    assert list(order) == [2, 1, 0]
+    assert planner.itinerary(order)["late"].sum() == 0
+    #Without the window the nearest comes first
+    assert list(RoutePlanner(lat, long, (54.0, -1.0)).solve()) == [0, 1, 2]
+
+def test_plan_feasible_drops_unreachable():
+    lat = np.full(2, 54.0)
+    long = np.array([-0.99, -0.5])
+    windows = np.array([[np.nan, np.nan], [to_minutes("09:00"), to_minutes("09:05")]])
+    keep, order, planner = plan_feasible(lat, long, (54.0, -1.0), windows=windows, start_time="09:00")
+    assert list(keep) == [0]
+
+@pytest.mark.parametrize("windowed", [False, True])
+def test_plan_days_splits_by_per_day(windowed):
+    lat, long = points(10)
+    windows = np.full((10, 2), np.nan) if windowed else None
+    days = plan_days(lat, long, (54.2, -1.2), 3, windows=windows)
+    assert [len(positions) for positions, order, planner in days] == [3, 3, 3, 1]
+    assert sorted(np.concatenate([positions for positions, order, planner in days])) == list(range(10))
+    for positions, order, planner in days:
+        assert sorted(order) == list(range(len(positions)))
+
+def test_no_points():
+    with pytest.raises(ValueError):
+        RoutePlanner([], [])
+    assert len(RoutePlanner([], [], (54.0, -1.0)).solve()) == 0
+    assert plan_days([], [], None, 3) == []
+
+def test_practice_windows():
+    practices = ["Sat (alt) 13:30", "Wed (3rd) 19:00", "Fri (by arrangement) 20:00", "Mon 19:00 & Tue (2nd)", "Thu", None]
+    starts = {
+        "Sat" : [to_minutes("13:30"), np.nan, np.nan, np.nan, np.nan, np.nan],
+        "Wed" : [np.nan, to_minutes("19:00"), np.nan, np.nan, np.nan, np.nan],
+        "Fri" : [np.nan, np.nan, to_minutes("20:00"), np.nan, np.nan, np.nan],
+        "Mon" : [np.nan, np.nan, np.nan, to_minutes("19:00"), np.nan, np.nan],
+        "Tue" : [np.nan, np.nan, np.nan, to_minutes("19:30"), np.nan, np.nan],
+        "Thu" : [np.nan, np.nan, np.nan, np.nan, to_minutes("19:30"), np.nan],
+    }
+    for day, expected in starts.items():
+        windows = practice_windows(practices, day)
+        assert np.array_equal(windows[:,0], expected, equal_nan=True)
+        assert np.array_equal(windows[:,1] - windows[:,0], np.where(np.isnan(expected), np.nan, 120), equal_nan=True)
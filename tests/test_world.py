@@ -0,0 +1,47 @@
+import pytest
+
+from bellpedia.functions import Coords
+from bellpedia.world import World, Tower
+
+def make_world():
+    towers = [
+        Tower(name="S Mary", place="Durham", dove_id=1, bells=[], coordinates=Coords(54.77, -1.57), postcode="DH1 3EL", country="England", county="Durham"),
+        Tower(name="S Oswald", place="Durham", dove_id=2, bells=[], coordinates=Coords(54.77, -1.57), postcode="DH1 3DG", country="England", county="Durham"),
+        Tower(name="S Mary", place="Canterbury", dove_id=3, bells=[], coordinates=Coords(51.28, 1.08), postcode="CT1 2EH", country="England", county="Kent"),
+    ]
+    return World(towers)
+
+def test_search_cache_hit_reuses_lookup(monkeypatch):
+    world = make_world()
+    first = world.search("county", "Durham")
+    def fail(self):
+        raise AssertionError("create_lookup called on a cache hit")
+    monkeypatch.setattr(World, "create_lookup", fail)
+    second = world.search("county", ["DURHAM"])
+    assert world.search_cache.hits == 1
+    assert sorted(t.dove_id for t in second.towers) == sorted(t.dove_id for t in first.towers) == [1, 2]
+
+def test_search_results_are_independent():
+    world = make_world()
+    result = world.search("county", "durham")
+    result.remove_tower(1)
+    assert result.NTowers == 1
+    assert world.search("county", "durham").NTowers == 2
+
+def test_cache_cleared_on_mutation():
+    world = make_world()
+    assert world.search("county", "kent").NTowers == 1
+    world.remove_tower(3)
+    assert world.search("county", "kent").NTowers == 0
+    assert world.search_cache.invalidations == 1
+
+def test_tower_components_are_built_lazily(monkeypatch):
+    world = make_world()
+    groups = world.tower_components(radius=5, min_size=1)
+    assert list(groups.sizes) == [2, 1]
+    assert sorted(groups.dove_ids(0)) == [1, 2]
+    built = []
+    init = World.__init__
+    monkeypatch.setattr(World, "__init__", lambda self, *args, **kwargs: built.append(1) or init(self, *args, **kwargs))
+    assert groups[1].NTowers == 1
+    assert len(built) == 1